@@ -0,0 +1,76 @@
+"""
+Capture daemon against a local static HTTP server: cold vs warm capture and per-route timings.
+Requires Node.js and puppeteer.
+
+	python benchmarks/bench_capture_daemon.py --routes 8 --pool-size 4
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.python.integrations.capture_daemon import CaptureDaemon  # noqa: E402
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+	def log_message(self, *args) -> None:
+		pass
+
+
+def _write_site(root: str, routes: int) -> list[str]:
+	paths = []
+	for i in range(routes):
+		route = "/" if i == 0 else f"/page{i}/"
+		d = os.path.join(root, route.strip("/"))
+		os.makedirs(d, exist_ok=True)
+		items = "".join(f"<li>Item {i}-{k}</li>" for k in range(40))
+		with open(os.path.join(d, "index.html"), "w", encoding="utf-8") as f:
+			f.write(f"<!doctype html><html><body><h1>Page {i}</h1><ul>{items}</ul></body></html>")
+		paths.append(route)
+	return paths
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--routes", type=int, default=6)
+	ap.add_argument("--pool-size", type=int, default=4)
+	args = ap.parse_args()
+	site = tempfile.mkdtemp(prefix="imr-site-")
+	out_dir = tempfile.mkdtemp(prefix="imr-shots-")
+	routes = _write_site(site, args.routes)
+	server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=site))
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	base_url = f"http://127.0.0.1:{server.server_address[1]}"
+	daemon = CaptureDaemon(pool_size=args.pool_size)
+	report: dict = {"benchmark": "capture_daemon", "routes": len(routes), "pool_size": args.pool_size, "runs": []}
+	try:
+		for label in ("cold", "warm"):
+			t0 = time.perf_counter()
+			res = daemon.capture(base_url, routes, out_dir)
+			wall = time.perf_counter() - t0
+			if not res.get("ok"):
+				report["error"] = res.get("error")
+				break
+			report["runs"].append({
+				"run": label,
+				"wall_s": round(wall, 3),
+				"timings": res.get("timings"),
+				"per_route_ms": {f"{r['route']}@{r['viewport']}": r.get("ms") for r in res.get("results", [])},
+				"failures": [r for r in res.get("results", []) if r.get("error")],
+			})
+	finally:
+		daemon.close()
+		server.shutdown()
+	print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+	main()
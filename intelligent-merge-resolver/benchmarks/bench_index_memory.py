@@ -0,0 +1,99 @@
+"""
+Memory of the text index per thousand documents: the previous layout (a token Counter per
+document plus a Counter of document frequencies, whitespace tokens) against InMemoryVectorDB's
+interned ids in flat array columns. The corpus is this repository's own source files, cycled
+until there are --docs documents.
+
+	python benchmarks/bench_index_memory.py --docs 5000
+
+Reports traced allocation bytes per 1000 documents, vocabulary size and query time.
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import typing as t
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.python.context.vector_database import InMemoryVectorDB, tfidf_cosine  # noqa: E402
+
+SOURCE_EXTS = (".py", ".ts", ".tsx", ".js", ".md")
+
+
+class CounterIndex:
+	"""The index before interning: one Counter of raw whitespace tokens per document."""
+
+	def __init__(self) -> None:
+		self.doc_id_to_tokens: t.Dict[str, t.Counter[str]] = {}
+		self.token_to_df: t.Counter[str] = Counter()
+
+	def __len__(self) -> int:
+		return len(self.doc_id_to_tokens)
+
+	def add_document(self, doc_id: str, text: str) -> None:
+		tokens = Counter(tok.lower() for tok in text.split())
+		self.doc_id_to_tokens[doc_id] = tokens
+		self.token_to_df.update(tokens.keys())
+
+	def query(self, text: str, k: int = 5) -> t.List[str]:
+		q = Counter(tok.lower() for tok in text.split())
+		scores = [(doc_id, tfidf_cosine(q, tokens, self.token_to_df)) for doc_id, tokens in self.doc_id_to_tokens.items()]
+		scores.sort(key=lambda x: x[1], reverse=True)
+		return [doc for doc, _ in scores[:k]]
+
+
+def corpus(root: str, docs: int) -> t.List[t.Tuple[str, str]]:
+	texts: t.List[t.Tuple[str, str]] = []
+	for r, dirs, files in os.walk(root):
+		dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in ("__pycache__", "node_modules"))
+		for fn in sorted(files):
+			if fn.endswith(SOURCE_EXTS):
+				with open(os.path.join(r, fn), "r", encoding="utf-8", errors="ignore") as f:
+					texts.append((os.path.relpath(os.path.join(r, fn), root), f.read()))
+	if not texts:
+		raise SystemExit(f"no source files under {root}")
+	return [(f"{texts[i % len(texts)][0]}#{i // len(texts)}", texts[i % len(texts)][1]) for i in range(docs)]
+
+
+def measure(index: t.Any, docs: t.List[t.Tuple[str, str]], query: str) -> t.Dict[str, t.Any]:
+	tracemalloc.start()
+	for doc_id, text in docs:
+		index.add_document(doc_id, text)
+	held, _peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	t0 = time.perf_counter()
+	index.query(query)
+	query_s = time.perf_counter() - t0
+	vocab = len(index.vocab) if hasattr(index, "vocab") else len(index.token_to_df)
+	return {
+		"docs": len(index),
+		"vocab": vocab,
+		"bytes_per_1000_docs": int(held * 1000 / max(1, len(index))),
+		"query_s": round(query_s, 3),
+	}
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--docs", type=int, default=5000)
+	ap.add_argument("--root", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	args = ap.parse_args()
+	docs = corpus(args.root, args.docs)
+	query = docs[len(docs) // 2][1]
+	before = measure(CounterIndex(), docs, query)
+	after = measure(InMemoryVectorDB(), docs, query)
+	report = {
+		"before": before,
+		"after": after,
+		"memory_ratio": round(before["bytes_per_1000_docs"] / max(1, after["bytes_per_1000_docs"]), 1),
+	}
+	print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,84 @@
+"""
+Sequential full-page OCR versus the pooled batch API, with and without diff masks.
+
+	python benchmarks/bench_ocr_batch.py --images 8 --height 3000
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.python.analyzers import ocr_analyzer  # noqa: E402
+from src.python.analyzers.ocr_analyzer import OCRAnalyzer  # noqa: E402
+
+
+def _screenshot(path: str, idx: int, width: int, height: int) -> None:
+	cv2, np = ocr_analyzer.cv2, ocr_analyzer.np
+	img = np.full((height, width, 3), 255, np.uint8)
+	for row, y in enumerate(range(60, height - 20, 48)):
+		cv2.putText(img, f"Screen {idx} row {row} lorem ipsum dolor", (40, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+	cv2.imwrite(path, img)
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--images", type=int, default=8)
+	ap.add_argument("--width", type=int, default=1280)
+	ap.add_argument("--height", type=int, default=3000)
+	ap.add_argument("--changed-fraction", type=float, default=0.1)
+	args = ap.parse_args()
+	if not OCRAnalyzer().available:
+		print(json.dumps({"benchmark": "ocr_batch", "error": "ocr_unavailable"}))
+		return
+	np = ocr_analyzer.np
+	work = tempfile.mkdtemp(prefix="imr-bench-ocr-")
+	try:
+		paths = []
+		for i in range(args.images):
+			p = os.path.join(work, f"shot_{i}.png")
+			_screenshot(p, i, args.width, args.height)
+			paths.append(p)
+		mask = np.zeros((args.height, args.width), np.uint8)
+		mask[: max(1, int(args.height * args.changed_fraction)), :] = 1
+
+		seq = OCRAnalyzer(cache_dir=os.path.join(work, "c1"), max_workers=1)
+		t0 = time.perf_counter()
+		seq.analyze_batch(paths)
+		t1 = time.perf_counter()
+
+		pooled = OCRAnalyzer(cache_dir=os.path.join(work, "c2"))
+		pooled.analyze_batch(paths)
+		t2 = time.perf_counter()
+
+		masked = OCRAnalyzer(cache_dir=os.path.join(work, "c3"))
+		masked.analyze_batch(paths, {p: mask for p in paths})
+		t3 = time.perf_counter()
+
+		pooled.analyze_batch(paths)
+		t4 = time.perf_counter()
+		pooled.close()
+		masked.close()
+		print(json.dumps({
+			"benchmark": "ocr_batch",
+			"images": args.images,
+			"size": [args.width, args.height],
+			"workers": pooled.max_workers,
+			"sequential_s": round(t1 - t0, 3),
+			"pooled_s": round(t2 - t1, 3),
+			"masked_s": round(t3 - t2, 3),
+			"cached_s": round(t4 - t3, 4),
+			"speedup_pooled": round((t1 - t0) / max(t2 - t1, 1e-9), 2),
+			"speedup_masked": round((t1 - t0) / max(t3 - t2, 1e-9), 2),
+		}, indent=2))
+	finally:
+		shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+	main()
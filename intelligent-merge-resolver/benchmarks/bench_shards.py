@@ -0,0 +1,101 @@
+"""
+Context index on a synthetic monorepo: the flat InMemoryVectorDB (index everything, then
+query) against ShardedVectorDB (parallel shard build; cold and warm queries that only map
+the conflict's package and its neighbours).
+
+	python benchmarks/bench_shards.py --packages 40 --files 150
+
+Reports wall time, documents touched and peak RSS growth for each variant.
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import typing as t
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.python.context.vector_database import InMemoryVectorDB  # noqa: E402
+from src.python.context.shard_index import ShardedVectorDB  # noqa: E402
+
+WORDS = ["user", "order", "cart", "price", "render", "fetch", "state", "props", "token", "session", "cache", "route", "query", "schema", "event"]
+
+
+def make_monorepo(root: str, packages: int, files: int, seed: int) -> str:
+	rng = random.Random(seed)
+	for p in range(packages):
+		pkg = os.path.join(root, "packages", f"pkg{p}")
+		os.makedirs(os.path.join(pkg, "src"), exist_ok=True)
+		with open(os.path.join(pkg, "package.json"), "w", encoding="utf-8") as f:
+			json.dump({"name": f"@mono/pkg{p}", "dependencies": {f"@mono/pkg{(p + 1) % packages}": "*"}}, f)
+		for i in range(files):
+			body = "\n".join(f"export function {rng.choice(WORDS)}{i}_{j}({rng.choice(WORDS)}) {{ return {rng.choice(WORDS)}.{rng.choice(WORDS)}({j}); }}" for j in range(30))
+			with open(os.path.join(pkg, "src", f"mod{i}.ts"), "w", encoding="utf-8") as f:
+				f.write(body)
+	return os.path.join(root, "packages", "pkg0", "src", "mod0.ts")
+
+
+def rss_mb() -> float:
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--packages", type=int, default=40)
+	ap.add_argument("--files", type=int, default=150)
+	ap.add_argument("--seed", type=int, default=1)
+	args = ap.parse_args()
+	tmp = tempfile.mkdtemp(prefix="imr-shards-")
+	try:
+		target = make_monorepo(tmp, args.packages, args.files, args.seed)
+		with open(target, "r", encoding="utf-8") as f:
+			text = f.read()
+		report: t.Dict[str, t.Any] = {"packages": args.packages, "files": args.packages * args.files}
+
+		rss0 = rss_mb()
+		t0 = time.perf_counter()
+		sharded = ShardedVectorDB(tmp)
+		build = sharded.build()
+		t1 = time.perf_counter()
+		sharded.close()
+		sharded = ShardedVectorDB(tmp)
+		sharded.query(text, near=target)
+		t2 = time.perf_counter()
+		sharded.query(text, near=target)
+		t3 = time.perf_counter()
+		report["sharded"] = {
+			"build_s": round(t1 - t0, 3),
+			"shards_built": build["built"],
+			"cold_query_s": round(t2 - t1, 3),
+			"warm_query_s": round(t3 - t2, 3),
+			"docs_searched": len(sharded),
+			"rss_growth_mb": round(rss_mb() - rss0, 1),
+		}
+
+		rss0 = rss_mb()
+		t0 = time.perf_counter()
+		flat = InMemoryVectorDB()
+		paths = [os.path.join(r, fn) for r, _d, fs in os.walk(os.path.join(tmp, "packages")) for fn in fs]
+		flat.add_files(paths)
+		t1 = time.perf_counter()
+		flat.query(text)
+		t2 = time.perf_counter()
+		report["flat"] = {
+			"index_s": round(t1 - t0, 3),
+			"query_s": round(t2 - t1, 3),
+			"docs_searched": len(flat),
+			"rss_growth_mb": round(rss_mb() - rss0, 1),
+		}
+		print(json.dumps(report, indent=2))
+	finally:
+		shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+	main()
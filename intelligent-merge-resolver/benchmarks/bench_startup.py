@@ -0,0 +1,88 @@
+"""
+CLI startup time and heavy-import check, with a regression budget.
+
+	python benchmarks/bench_startup.py --runs 10 --budget-ms 150
+
+Exits non-zero when the median cost of `imr status` over a bare interpreter exceeds the
+budget, or when a cheap command imports a module that should only load on demand.
+Git hooks run the CLI on every merge, so this is what keeps them fast.
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported by status/analyze/hooks
+HEAVY_MODULES = ("cv2", "numpy", "skimage", "pytesseract", "google.generativeai", "asyncio")
+
+_RUN_CLI = (
+	"import sys, json\n"
+	"watch = json.loads(sys.argv[2])\n"
+	"sys.argv = ['imr'] + json.loads(sys.argv[1])\n"
+	"from {module} import main\n"
+	"try:\n"
+	"    main()\n"
+	"except SystemExit:\n"
+	"    pass\n"
+	"heavy = [m for m in watch if m in sys.modules]\n"
+	"sys.stderr.write('\\nIMR_HEAVY=' + json.dumps(heavy) + '\\n')\n"
+)
+
+
+def _time(cmd: list[str], runs: int) -> tuple[list[float], subprocess.CompletedProcess]:
+	samples = []
+	cp = None
+	for _ in range(runs):
+		t0 = time.perf_counter()
+		cp = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True)
+		samples.append((time.perf_counter() - t0) * 1000)
+	assert cp is not None
+	return samples, cp
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--runs", type=int, default=10)
+	ap.add_argument("--budget-ms", type=float, default=150.0, help="Allowed median overhead over `python -c pass`")
+	ap.add_argument("--module", default="src.python.cli.main")
+	ap.add_argument("--command", nargs="*", default=["status"])
+	args = ap.parse_args()
+
+	base, _ = _time([sys.executable, "-c", "pass"], args.runs)
+	code = _RUN_CLI.format(module=args.module)
+	cli, cp = _time([sys.executable, "-c", code, json.dumps(args.command), json.dumps(HEAVY_MODULES)], args.runs)
+	heavy = None
+	for line in cp.stderr.splitlines():
+		if line.startswith("IMR_HEAVY="):
+			heavy = json.loads(line[len("IMR_HEAVY="):])
+	report = {
+		"benchmark": "startup",
+		"command": args.command,
+		"runs": args.runs,
+		"interpreter_ms": round(statistics.median(base), 1),
+		"cli_ms": round(statistics.median(cli), 1),
+		"overhead_ms": round(statistics.median(cli) - statistics.median(base), 1),
+		"budget_ms": args.budget_ms,
+		"heavy_modules": heavy,
+	}
+	failures = []
+	if heavy is None:
+		failures.append("cli_failed: " + cp.stderr.strip().splitlines()[-1] if cp.stderr.strip() else "cli_failed")
+	elif heavy:
+		failures.append("heavy_imports: " + ", ".join(heavy))
+	if report["overhead_ms"] > args.budget_ms:
+		failures.append("over_budget")
+	report["ok"] = not failures
+	report["failures"] = failures
+	print(json.dumps(report, indent=2))
+	sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,60 @@
+"""
+Drive one reasoning chain through a server that answers like server.js ({raw, credits}) and
+fail unless the engine reaches the side the server recommends.
+
+	python benchmarks/check_server_protocol.py            # starts its own stub
+	python benchmarks/check_server_protocol.py --url http://127.0.0.1:3939
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import argparse
+import tempfile
+import typing as t
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import StubModelServer  # noqa: E402
+
+CONFLICT = "\n".join([
+	"def total(items):",
+	"<<<<<<< HEAD",
+	"    return sum(i.price for i in items)",
+	"=======",
+	"    return sum(i.cost for i in items)",
+	">>>>>>> feature",
+	"",
+])
+
+
+def run_chain(url: str) -> t.Dict[str, t.Any]:
+	"""Reason about CONFLICT with the CLI's own engine, in a scratch directory, against `url`."""
+	os.environ["IMR_SERVER_URL"] = url
+	os.chdir(tempfile.mkdtemp(prefix="imr-protocol-"))
+	from src.core.prompt_window import conflict_payload
+	from src.python.cli.main import _reason
+	result = _reason(conflict_payload("pricing.py", CONFLICT), threshold=0.6)
+	return {"decision": result.decision, "confidence": round(result.confidence, 3), "layers_run": result.layers_run, "votes": result.votes}
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--url", default=None, help="Server to check (default: a stub speaking the server.js protocol)")
+	ap.add_argument("--expect", default="keep_current", help="Decision the server's answers should lead to")
+	args = ap.parse_args()
+	if args.url:
+		out = run_chain(args.url)
+	else:
+		with StubModelServer(latency_ms=0, confidence=0.9, recommendation="current") as stub:
+			out = run_chain(stub.url)
+	print(json.dumps(out, indent=2))
+	if out["decision"] != args.expect or out["confidence"] <= 0:
+		print(f"chain ended in {out['decision']} ({out['confidence']}), expected {args.expect}", file=sys.stderr)
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,73 @@
+"""
+Compare two run_suite.py result files and flag regressions.
+
+	python benchmarks/compare.py baseline.json candidate.json --tolerance 0.10
+
+Exits 1 when any timing metric is worse than the baseline by more than the tolerance.
+"""
+from __future__ import annotations
+import sys
+import json
+import argparse
+import typing as t
+
+# Metric name suffix -> whether a larger value is better
+_DIRECTIONS = (("_per_s", True), ("_s", False), ("_ms", False), ("_ms_each", False), ("_bytes", False))
+
+
+def _direction(metric: str) -> t.Optional[bool]:
+	for suffix, higher_is_better in _DIRECTIONS:
+		if metric.endswith(suffix):
+			return higher_is_better
+	return None
+
+
+def compare(base: t.Dict[str, t.Any], cand: t.Dict[str, t.Any], tolerance: float) -> t.List[t.Dict[str, t.Any]]:
+	rows = []
+	for bench, cur in cand.get("results", {}).items():
+		old = base.get("results", {}).get(bench, {})
+		for metric, value in cur.items():
+			higher_is_better = _direction(metric)
+			prev = old.get(metric)
+			if higher_is_better is None or not isinstance(value, (int, float)) or not isinstance(prev, (int, float)) or prev == 0:
+				continue
+			change = (value - prev) / prev
+			worse = -change if higher_is_better else change
+			rows.append({
+				"benchmark": bench,
+				"metric": metric,
+				"baseline": prev,
+				"candidate": value,
+				"change": round(change, 4),
+				"regression": worse > tolerance,
+			})
+		if "error" in cur and "error" not in old:
+			rows.append({"benchmark": bench, "metric": "error", "baseline": None, "candidate": cur["error"], "change": None, "regression": True})
+	return rows
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("baseline")
+	ap.add_argument("candidate")
+	ap.add_argument("--tolerance", type=float, default=0.10)
+	ap.add_argument("--json", action="store_true", help="Print rows as JSON")
+	args = ap.parse_args()
+	with open(args.baseline, "r", encoding="utf-8") as f:
+		base = json.load(f)
+	with open(args.candidate, "r", encoding="utf-8") as f:
+		cand = json.load(f)
+	rows = compare(base, cand, args.tolerance)
+	if args.json:
+		print(json.dumps({"baseline": base.get("git_rev"), "candidate": cand.get("git_rev"), "rows": rows}, indent=2))
+	else:
+		print(f"baseline {base.get('git_rev')}  candidate {cand.get('git_rev')}  tolerance {args.tolerance:.0%}")
+		for r in rows:
+			change = "" if r["change"] is None else f"{r['change']:+.1%}"
+			flag = "REGRESSION" if r["regression"] else ""
+			print(f"{r['benchmark']:<28} {r['metric']:<16} {str(r['baseline']):>14} {str(r['candidate']):>14} {change:>9} {flag}")
+	sys.exit(1 if any(r["regression"] for r in rows) else 0)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,230 @@
+"""
+Benchmark suite: conflict extraction, text resolution, vector index build/query,
+context selection and end-to-end `resolve --auto` against a stub model server. Before the
+e2e run, one reasoning chain must settle through the stub (check_server_protocol.py).
+
+	python benchmarks/run_suite.py --files 40 --hunks 6 --latency-ms 150 --out results.json
+	python benchmarks/compare.py baseline.json results.json
+	python benchmarks/run_suite.py --cassette bench.cassette.jsonl --cassette-mode record   # once
+	python benchmarks/run_suite.py --cassette bench.cassette.jsonl                          # offline, reproducible
+
+Results are a single JSON document; compare.py diffs two of them. If any benchmark fails the
+suite prints the errors and exits 1 without writing a results file.
+"""
+from __future__ import annotations
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import types
+import typing as t
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_repo import generate_repo  # noqa: E402
+from stub_server import StubModelServer  # noqa: E402
+
+SCHEMA_VERSION = 1
+
+
+def _timed(fn: t.Callable[[], t.Any], repeat: int) -> t.Tuple[t.Dict[str, float], t.Any]:
+	samples = []
+	out = None
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		out = fn()
+		samples.append(time.perf_counter() - t0)
+	return {"median_s": round(statistics.median(samples), 6), "min_s": round(min(samples), 6)}, out
+
+
+def _read(paths: t.List[str]) -> t.List[str]:
+	texts = []
+	for p in paths:
+		with open(p, "r", encoding="utf-8", errors="ignore") as f:
+			texts.append(f.read())
+	return texts
+
+
+def bench_extract_conflicts(texts: t.List[str], repeat: int) -> t.Dict[str, t.Any]:
+	from src.core.merge_detector import extract_conflicts
+	timing, hunks = _timed(lambda: sum(len(extract_conflicts(x)) for x in texts), repeat)
+	total_bytes = sum(len(x) for x in texts)
+	return {**timing, "files": len(texts), "hunks": hunks, "bytes": total_bytes, "hunks_per_s": round(hunks / max(timing["median_s"], 1e-9))}
+
+
+def bench_resolve_text(texts: t.List[str], repeat: int) -> t.Dict[str, t.Any]:
+	from src.core.resolution import resolve_conflicts_in_text
+	timing, _ = _timed(lambda: [resolve_conflicts_in_text(x, "current") for x in texts], repeat)
+	return {**timing, "files": len(texts), "files_per_s": round(len(texts) / max(timing["median_s"], 1e-9))}
+
+
+def bench_vector_db(paths: t.List[str], queries: t.List[str], repeat: int) -> t.Dict[str, t.Any]:
+	from src.python.context.vector_database import InMemoryVectorDB
+	holder: t.Dict[str, t.Any] = {}
+
+	def build() -> None:
+		db = InMemoryVectorDB()
+		db.add_files(paths)
+		holder["db"] = db
+
+	index, _ = _timed(build, repeat)
+	query, _ = _timed(lambda: [holder["db"].query(q, k=5) for q in queries], repeat)
+	return {
+		"docs": len(paths),
+		"index_s": index["median_s"],
+		"query_s": query["median_s"],
+		"queries": len(queries),
+		"query_ms_each": round(query["median_s"] / max(1, len(queries)) * 1000, 3),
+	}
+
+
+def bench_context_selector(repo: str, conflicted: t.List[str], repeat: int) -> t.Dict[str, t.Any]:
+	from src.python.context.vector_database import InMemoryVectorDB
+	from src.python.context.context_selector import ContextSelector
+	db = InMemoryVectorDB()
+	db.add_files([p for p in glob.glob(os.path.join(repo, "**", "*.*"), recursive=True) if os.path.isfile(p)])
+	manager = types.SimpleNamespace(repo_path=repo, vector_db=db, code_graph=types.SimpleNamespace(neighbors=lambda _p: []))
+	selector = ContextSelector(manager)
+	timing, counts = _timed(lambda: [len(selector.select_candidates(p)) for p in conflicted], repeat)
+	return {**timing, "files": len(conflicted), "avg_candidates": round(sum(counts) / max(1, len(counts)), 2), "ms_per_file": round(timing["median_s"] / max(1, len(conflicted)) * 1000, 3)}
+
+
+def bench_e2e_resolve(repo_args: t.Dict[str, t.Any], stub: StubModelServer, repeat: int, timeout: float, cassette: t.Optional[t.Dict[str, str]] = None) -> t.Dict[str, t.Any]:
+	"""With `cassette` ({path, mode, latency}) model calls are recorded or replayed by the CLI itself."""
+	samples = []
+	remaining = 0
+	requests = 0
+	for _ in range(repeat):
+		info = generate_repo(**repo_args)
+		env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, IMR_SERVER_URL=stub.url)
+		if cassette:
+			env.update(IMR_CASSETTE=cassette["path"], IMR_CASSETTE_MODE=cassette["mode"], IMR_REPLAY_LATENCY=cassette["latency"])
+		before = stub.requests
+		t0 = time.perf_counter()
+		cp = subprocess.run([sys.executable, "-m", "src.python.cli.main", "resolve", "--auto"], cwd=info["path"], env=env, capture_output=True, text=True, timeout=timeout)
+		samples.append(time.perf_counter() - t0)
+		if cp.returncode != 0:
+			tail = (cp.stderr or cp.stdout).strip().splitlines()
+			raise RuntimeError(tail[-1] if tail else f"resolve exited {cp.returncode}")
+		requests = stub.requests - before
+		remaining = sum(1 for p in info["conflicted_files"] if "<<<<<<<" in _read([os.path.join(info["path"], p)])[0])
+	return {
+		"median_s": round(statistics.median(samples), 4),
+		"min_s": round(min(samples), 4),
+		"files": len(info["conflicted_files"]),
+		"model_requests": requests,
+		"files_with_markers_left": remaining,
+		"stub_latency_ms": stub.latency_ms,
+		"cassette_mode": cassette["mode"] if cassette else None,
+	}
+
+
+def check_server_protocol(stub: StubModelServer, timeout: float) -> t.Dict[str, t.Any]:
+	"""One reasoning chain through the stub must reach the side it recommends (check_server_protocol.py)."""
+	script = os.path.join(PROJECT_ROOT, "benchmarks", "check_server_protocol.py")
+	cp = subprocess.run([sys.executable, script, "--url", stub.url], capture_output=True, text=True, timeout=timeout)
+	if cp.returncode != 0:
+		tail = (cp.stderr or cp.stdout).strip().splitlines()
+		raise RuntimeError(tail[-1] if tail else f"protocol check exited {cp.returncode}")
+	return json.loads(cp.stdout)
+
+
+def _git_rev() -> str:
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True).stdout.strip() or "unknown"
+	except Exception:
+		return "unknown"
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--files", type=int, default=40)
+	ap.add_argument("--hunks", type=int, default=6)
+	ap.add_argument("--types", default="py,ts,md,json")
+	ap.add_argument("--clean-files", type=int, default=200, help="Unconflicted files used as index/context corpus")
+	ap.add_argument("--seed", type=int, default=0)
+	ap.add_argument("--repeat", type=int, default=3)
+	ap.add_argument("--e2e-repeat", type=int, default=1)
+	ap.add_argument("--latency-ms", type=float, default=100.0)
+	ap.add_argument("--timeout", type=float, default=600.0)
+	ap.add_argument("--only", default="", help="Comma-separated subset of benchmarks to run")
+	ap.add_argument("--cassette", default=None, help="Model cassette for the e2e run (see `imr --record/--replay`)")
+	ap.add_argument("--cassette-mode", default="replay", choices=("record", "replay", "auto"))
+	ap.add_argument("--replay-latency", default="recorded", help="'recorded' or a delay in ms per replayed call")
+	ap.add_argument("--out", default=None)
+	args = ap.parse_args()
+
+	work = tempfile.mkdtemp(prefix="imr-suite-")
+	repo_args = {
+		"path": os.path.join(work, "repo"),
+		"files": args.files,
+		"hunks": args.hunks,
+		"types": [x for x in args.types.split(",") if x],
+		"seed": args.seed,
+		"clean_files": args.clean_files,
+	}
+	only = {x for x in args.only.split(",") if x}
+	results: t.Dict[str, t.Any] = {}
+	errors: t.Dict[str, str] = {}
+
+	def run(name: str, fn: t.Callable[[], t.Dict[str, t.Any]]) -> None:
+		if only and name not in only:
+			return
+		try:
+			results[name] = fn()
+		except Exception as e:
+			errors[name] = f"{type(e).__name__}: {e}"
+
+	try:
+		info = generate_repo(**repo_args)
+		repo = info["path"]
+		conflicted = [os.path.join(repo, p) for p in info["conflicted_files"]]
+		texts = _read(conflicted)
+		corpus = [p for p in glob.glob(os.path.join(repo, "**", "*.*"), recursive=True) if os.path.isfile(p)]
+		queries = texts[: min(20, len(texts))]
+		run("extract_conflicts", lambda: bench_extract_conflicts(texts, args.repeat))
+		run("resolve_conflicts_in_text", lambda: bench_resolve_text(texts, args.repeat))
+		run("vector_db", lambda: bench_vector_db(corpus, queries, args.repeat))
+		run("context_selector", lambda: bench_context_selector(repo, conflicted, args.repeat))
+		with StubModelServer(latency_ms=args.latency_ms) as stub:
+			cassette = {"path": os.path.abspath(args.cassette), "mode": args.cassette_mode, "latency": args.replay_latency} if args.cassette else None
+			run("server_protocol", lambda: check_server_protocol(stub, args.timeout))
+			run("e2e_resolve_auto", lambda: bench_e2e_resolve(repo_args, stub, args.e2e_repeat, args.timeout, cassette))
+	finally:
+		shutil.rmtree(work, ignore_errors=True)
+
+	if errors:
+		# A failed benchmark must not end up in a results file that later serves as a baseline
+		for name, err in errors.items():
+			print(f"{name}: {err}", file=sys.stderr)
+		sys.exit(1)
+
+	doc = {
+		"schema": SCHEMA_VERSION,
+		"git_rev": _git_rev(),
+		"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"cpus": os.cpu_count(),
+		"params": {k: v for k, v in vars(args).items() if k != "out"},
+		"results": results,
+	}
+	out = args.out or os.path.join(PROJECT_ROOT, "benchmarks", "results", f"{doc['git_rev']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+	os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+	with open(out, "w", encoding="utf-8") as f:
+		json.dump(doc, f, indent=2)
+	print(json.dumps(doc, indent=2))
+	print(f"\nwrote {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
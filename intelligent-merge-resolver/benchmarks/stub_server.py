@@ -0,0 +1,107 @@
+"""
+Stand-in for server.js with a configurable latency, so benchmarks exercise the model
+round trip without network or credits.
+
+	python benchmarks/stub_server.py --port 3940 --latency-ms 250
+"""
+from __future__ import annotations
+import json
+import time
+import random
+import argparse
+import threading
+import typing as t
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubModelServer:
+	"""
+	Answers /status and /ai/generate-json like server.js, after sleeping latency_ms (+/- jitter_ms).
+	As with server.js, the model's JSON comes back as text in `raw` next to `credits`; it carries
+	`confidence` and, unless it is None, `recommendation`.
+	"""
+
+	def __init__(self, port: int = 0, latency_ms: float = 200.0, jitter_ms: float = 0.0, confidence: float = 0.7, recommendation: t.Optional[str] = "current") -> None:
+		self.latency_ms = latency_ms
+		self.jitter_ms = jitter_ms
+		self.confidence = confidence
+		self.recommendation = recommendation
+		self.requests = 0
+		self._lock = threading.Lock()
+		stub = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def log_message(self, *args: t.Any) -> None:
+				pass
+
+			def _send(self, status: int, obj: dict) -> None:
+				body = json.dumps(obj).encode("utf-8")
+				self.send_response(status)
+				self.send_header("Content-Type", "application/json")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def do_GET(self) -> None:
+				if self.path == "/status":
+					return self._send(200, {"credits": 10**6, "hasKey": True, "stub": True, "requests": stub.requests})
+				return self._send(404, {"error": "not_found"})
+
+			def do_POST(self) -> None:
+				if self.path != "/ai/generate-json":
+					return self._send(404, {"error": "not_found"})
+				length = int(self.headers.get("Content-Length") or 0)
+				self.rfile.read(length)
+				with stub._lock:
+					stub.requests += 1
+				delay = stub.latency_ms + random.uniform(-stub.jitter_ms, stub.jitter_ms)
+				time.sleep(max(0.0, delay) / 1000.0)
+				answer: t.Dict[str, t.Any] = {"summary": "stub", "confidence": stub.confidence}
+				if stub.recommendation:
+					answer["recommendation"] = stub.recommendation
+				# Same shape as server.js callUpstream + sendJson: nothing but the model text and credits
+				return self._send(200, {"raw": json.dumps(answer), "credits": 10**6})
+
+		self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+		self.httpd.daemon_threads = True
+		self._thread: t.Optional[threading.Thread] = None
+
+	@property
+	def url(self) -> str:
+		host, port = self.httpd.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def start(self) -> "StubModelServer":
+		self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		self.httpd.shutdown()
+		self.httpd.server_close()
+
+	def __enter__(self) -> "StubModelServer":
+		return self.start()
+
+	def __exit__(self, *exc: t.Any) -> None:
+		self.stop()
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("--port", type=int, default=3940)
+	ap.add_argument("--latency-ms", type=float, default=200.0)
+	ap.add_argument("--jitter-ms", type=float, default=0.0)
+	ap.add_argument("--confidence", type=float, default=0.7)
+	ap.add_argument("--recommendation", default="current", help="Side every answer recommends ('' for none)")
+	args = ap.parse_args()
+	stub = StubModelServer(args.port, args.latency_ms, args.jitter_ms, args.confidence, args.recommendation or None)
+	print(f"[stub-server] listening on {stub.url} (latency={args.latency_ms}ms)")
+	try:
+		stub.httpd.serve_forever()
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,141 @@
+"""
+Synthetic conflicted git repositories for benchmarks.
+
+	python benchmarks/synthetic_repo.py /tmp/imr-synth --files 50 --hunks 8 --types py,ts,md,json
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import subprocess
+import typing as t
+
+FILE_TYPES = ("py", "ts", "md", "json")
+GAP = 5  # unchanged lines between hunks so git keeps them as separate conflicts
+
+_GIT_ENV = {
+	"GIT_AUTHOR_NAME": "bench",
+	"GIT_AUTHOR_EMAIL": "bench@example.com",
+	"GIT_COMMITTER_NAME": "bench",
+	"GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+
+def _line(ext: str, name: str, value: str) -> str:
+	if ext == "py":
+		return f"{name} = {value}"
+	if ext == "ts":
+		return f"export const {name} = {value};"
+	if ext == "json":
+		return f'  "{name}": {value},'
+	return f"- {name}: {value}"
+
+
+def _render(ext: str, lines: t.List[str]) -> str:
+	if ext == "json":
+		# Last member carries no trailing comma
+		return "{\n" + "\n".join(lines) + '\n  "_end": 0\n}\n'
+	return "\n".join(lines) + "\n"
+
+
+def _versions(ext: str, file_idx: int, hunks: int, rng: random.Random, trivial_fraction: float) -> t.Tuple[str, str, str]:
+	base: t.List[str] = []
+	ours: t.List[str] = []
+	theirs: t.List[str] = []
+	for h in range(hunks):
+		for g in range(GAP):
+			same = _line(ext, f"keep_{file_idx}_{h}_{g}", str(g))
+			base.append(same)
+			ours.append(same)
+			theirs.append(same)
+		name = f"value_{file_idx}_{h}"
+		base.append(_line(ext, name, "0"))
+		ours.append(_line(ext, name, str(rng.randint(1, 10**6))))
+		if rng.random() < trivial_fraction:
+			# Incoming keeps our edit and adds a line: resolvable by the subset rule
+			theirs.append(ours[-1])
+			theirs.append(_line(ext, f"extra_{file_idx}_{h}", "1"))
+		else:
+			theirs.append(_line(ext, name, str(-rng.randint(1, 10**6))))
+	return _render(ext, base), _render(ext, ours), _render(ext, theirs)
+
+
+def _git(repo: str, *args: str, check: bool = True) -> subprocess.CompletedProcess:
+	env = dict(os.environ, **_GIT_ENV)
+	return subprocess.run(["git", *args], cwd=repo, env=env, capture_output=True, text=True, check=check)
+
+
+def _write_all(repo: str, files: t.Dict[str, str]) -> None:
+	for rel, text in files.items():
+		path = os.path.join(repo, rel)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with open(path, "w", encoding="utf-8") as f:
+			f.write(text)
+
+
+def generate_repo(path: str, files: int = 20, hunks: int = 5, types: t.Sequence[str] = FILE_TYPES, seed: int = 0, trivial_fraction: float = 0.25, clean_files: int = 0) -> t.Dict[str, t.Any]:
+	"""
+	Create a git repo at `path` whose `main` branch is mid-merge with `theirs`, leaving
+	`files` conflicted files of the given types with `hunks` conflicts each, plus
+	`clean_files` untouched files that only serve as context.
+	"""
+	rng = random.Random(seed)
+	if os.path.exists(path):
+		shutil.rmtree(path)
+	os.makedirs(path)
+	_git(path, "init", "-q", "-b", "main")
+	base: t.Dict[str, str] = {}
+	ours: t.Dict[str, str] = {}
+	theirs: t.Dict[str, str] = {}
+	for i in range(files):
+		ext = types[i % len(types)]
+		rel = os.path.join(f"pkg{i % 10}", f"module_{i}.{ext}")
+		base[rel], ours[rel], theirs[rel] = _versions(ext, i, hunks, rng, trivial_fraction)
+	for i in range(clean_files):
+		ext = types[i % len(types)]
+		rel = os.path.join("lib", f"context_{i}.{ext}")
+		base[rel] = _render(ext, [_line(ext, f"ctx_{i}_{k}", str(k)) for k in range(40)])
+	_write_all(path, base)
+	_git(path, "add", "-A")
+	_git(path, "commit", "-qm", "base")
+	_git(path, "checkout", "-qb", "theirs")
+	_write_all(path, theirs)
+	_git(path, "commit", "-qam", "theirs")
+	_git(path, "checkout", "-q", "main")
+	_write_all(path, ours)
+	_git(path, "commit", "-qam", "ours")
+	_git(path, "merge", "theirs", check=False)
+	conflicted = [p for p in _git(path, "diff", "--name-only", "--diff-filter=U").stdout.splitlines() if p]
+	return {
+		"path": path,
+		"files": files,
+		"hunks_per_file": hunks,
+		"types": list(types),
+		"seed": seed,
+		"trivial_fraction": trivial_fraction,
+		"clean_files": clean_files,
+		"conflicted_files": conflicted,
+	}
+
+
+def main() -> None:
+	ap = argparse.ArgumentParser()
+	ap.add_argument("path")
+	ap.add_argument("--files", type=int, default=20)
+	ap.add_argument("--hunks", type=int, default=5)
+	ap.add_argument("--types", default=",".join(FILE_TYPES))
+	ap.add_argument("--seed", type=int, default=0)
+	ap.add_argument("--trivial-fraction", type=float, default=0.25)
+	ap.add_argument("--clean-files", type=int, default=0)
+	args = ap.parse_args()
+	info = generate_repo(args.path, args.files, args.hunks, [x for x in args.types.split(",") if x], args.seed, args.trivial_fraction, args.clean_files)
+	info["conflicted_files"] = len(info["conflicted_files"])
+	json.dump(info, sys.stdout, indent=2)
+	print()
+
+
+if __name__ == "__main__":
+	main()
@@ -1,8 +1,7 @@
 from __future__ import annotations
 import os
-import shutil
 
-def install(repo_path: str) -> None:
+def install(repo_path: str, budget_ms: float = 1500.0) -> None:
 	hooks_src = os.path.dirname(__file__)
 	hooks_dest = os.path.join(repo_path, ".git", "hooks")
 	os.makedirs(hooks_dest, exist_ok=True)
@@ -10,5 +9,13 @@ def install(repo_path: str) -> None:
 		src = os.path.join(hooks_src, name)
 		dst = os.path.join(hooks_dest, name)
 		if os.path.isfile(src):
-			shutil.copyfile(src, dst)
+			# Keep a foreign hook; the imr hook runs it first
+			if os.path.isfile(dst):
+				with open(dst, "r", encoding="utf-8", errors="ignore") as f:
+					if "Intelligent Merge Resolver" not in f.read():
+						os.replace(dst, dst + ".pre-imr")
+			with open(src, "r", encoding="utf-8") as rf:
+				script = rf.read().replace("@IMR_BUDGET_MS@", str(int(budget_ms)))
+			with open(dst, "w", encoding="utf-8") as wf:
+				wf.write(script)
 			os.chmod(dst, 0o755)
\ No newline at end of file
@@ -2,6 +2,7 @@ const http = require('http');
 const url = require('url');
 const fs = require('fs');
 const path = require('path');
+const crypto = require('crypto');
 
 const PORT = process.env.IMR_SERVER_PORT ? Number(process.env.IMR_SERVER_PORT) : 3939;
 
@@ -27,52 +28,277 @@ function loadEnvLocal(cwd = process.cwd()) {
 
 const ENV = loadEnvLocal();
 const GEMINI_API_KEY = process.env.GEMINI_API_KEY || ENV.GEMINI_API_KEY || '';
+const MODEL_NAME = 'gemini-2.0-flash-exp';
+const MAX_BODY_BYTES = 8 * 1024 * 1024;
+// How long an oversized upload is drained before the 413 goes out anyway
+const DISCARD_MS = 5000;
 let credits = 100;
 
-function sendJson(res, status, obj) {
-	const body = JSON.stringify(obj);
-	res.writeHead(status, { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) });
-	res.end(body);
+class LruCache {
+	constructor({ maxEntries = 500, maxBytes = 16 * 1024 * 1024, ttlMs = 10 * 60 * 1000 } = {}) {
+		this.maxEntries = maxEntries;
+		this.maxBytes = maxBytes;
+		this.ttlMs = ttlMs;
+		this.map = new Map();
+		this.bytes = 0;
+		this.evictions = 0;
+	}
+
+	get(key) {
+		const entry = this.map.get(key);
+		if (!entry) return undefined;
+		if (Date.now() - entry.at > this.ttlMs) {
+			this.delete(key);
+			return undefined;
+		}
+		// Re-insert to mark as most recently used
+		this.map.delete(key);
+		this.map.set(key, entry);
+		return entry.value;
+	}
+
+	set(key, value) {
+		const size = Buffer.byteLength(JSON.stringify(value));
+		if (size > this.maxBytes) return;
+		this.delete(key);
+		this.map.set(key, { value, size, at: Date.now() });
+		this.bytes += size;
+		while (this.map.size > this.maxEntries || this.bytes > this.maxBytes) {
+			this.delete(this.map.keys().next().value);
+			this.evictions += 1;
+		}
+	}
+
+	delete(key) {
+		const entry = this.map.get(key);
+		if (!entry) return;
+		this.bytes -= entry.size;
+		this.map.delete(key);
+	}
 }
 
-function notFound(res) { sendJson(res, 404, { error: 'not_found' }); }
+class LatencyStats {
+	constructor(window = 256) {
+		this.window = window;
+		this.samples = [];
+		this.count = 0;
+		this.totalMs = 0;
+		this.maxMs = 0;
+	}
 
-async function handleGenerateJson(req, res, body) {
-	if (!GEMINI_API_KEY) return sendJson(res, 500, { error: 'missing_gemini_api_key' });
-	if (credits <= 0) return sendJson(res, 429, { error: 'rate_limit_exceeded', credits });
-	let payload = {};
-	try { payload = JSON.parse(body || '{}'); } catch (_) { payload = {}; }
-	const prompt = String(payload.prompt || '');
-	const systemInstruction = payload.system_instruction || undefined;
-	if (!prompt) return sendJson(res, 400, { error: 'missing_prompt' });
+	record(ms) {
+		this.count += 1;
+		this.totalMs += ms;
+		this.maxMs = Math.max(this.maxMs, ms);
+		this.samples.push(ms);
+		if (this.samples.length > this.window) this.samples.shift();
+	}
+
+	summary() {
+		const sorted = [...this.samples].sort((a, b) => a - b);
+		const pct = (p) => (sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))] : null);
+		return {
+			count: this.count,
+			avg_ms: this.count ? Math.round(this.totalMs / this.count) : null,
+			p50_ms: pct(0.5),
+			p95_ms: pct(0.95),
+			max_ms: this.maxMs,
+		};
+	}
+}
+
+const cache = new LruCache({
+	maxEntries: Number(process.env.IMR_CACHE_MAX_ENTRIES || 500),
+	maxBytes: Number(process.env.IMR_CACHE_MAX_BYTES || 16 * 1024 * 1024),
+	ttlMs: Number(process.env.IMR_CACHE_TTL_MS || 10 * 60 * 1000),
+});
+const inflight = new Map();
+const counters = { requests: 0, cache_hits: 0, coalesced: 0, upstream_calls: 0, upstream_errors: 0 };
+const latency = { request: new LatencyStats(), upstream: new LatencyStats() };
+
+let genAIPromise = null;
+const models = new Map();
+
+async function getModel(systemInstruction) {
+	// One client per process and one model per system instruction
+	if (!genAIPromise) {
+		genAIPromise = import('@google/generative-ai').then(({ GoogleGenerativeAI }) => new GoogleGenerativeAI(GEMINI_API_KEY));
+		genAIPromise.catch(() => { genAIPromise = null; });
+	}
+	const genAI = await genAIPromise;
+	const key = systemInstruction || '';
+	let model = models.get(key);
+	if (!model) {
+		model = genAI.getGenerativeModel({ model: MODEL_NAME, systemInstruction });
+		if (models.size >= 32) models.delete(models.keys().next().value);
+		models.set(key, model);
+	}
+	return model;
+}
+
+function promptKey(prompt, systemInstruction) {
+	return crypto.createHash('sha256').update(JSON.stringify([MODEL_NAME, systemInstruction || '', prompt])).digest('hex');
+}
+
+async function callUpstream(prompt, systemInstruction) {
+	const started = Date.now();
+	counters.upstream_calls += 1;
 	try {
-		const { GoogleGenerativeAI } = await import('@google/generative-ai');
-		const genAI = new GoogleGenerativeAI(GEMINI_API_KEY);
-		const model = genAI.getGenerativeModel({ model: 'gemini-2.0-flash-exp', systemInstruction });
+		const model = await getModel(systemInstruction);
 		const response = await model.generateContent(prompt);
 		credits -= 1;
 		const text = response.response && response.response.text ? response.response.text() : (response.text ? response.text() : '');
-		return sendJson(res, 200, { raw: text, credits });
+		return { raw: text };
 	} catch (err) {
-		return sendJson(res, 500, { error: String(err && err.message || err) });
+		counters.upstream_errors += 1;
+		throw err;
+	} finally {
+		latency.upstream.record(Date.now() - started);
 	}
 }
 
+function sendJson(res, status, obj, headers = {}) {
+	const body = JSON.stringify(obj);
+	res.writeHead(status, { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body), ...headers });
+	res.end(body);
+}
+
+function notFound(res) { sendJson(res, 404, { error: 'not_found' }); }
+
+async function handleGenerateJson(req, res, body) {
+	const started = Date.now();
+	counters.requests += 1;
+	try {
+		if (!GEMINI_API_KEY) return sendJson(res, 500, { error: 'missing_gemini_api_key' });
+		let payload = {};
+		try { payload = JSON.parse(body || '{}'); } catch (_) { payload = {}; }
+		const prompt = String(payload.prompt || '');
+		const systemInstruction = payload.system_instruction || undefined;
+		if (!prompt) return sendJson(res, 400, { error: 'missing_prompt' });
+		const key = promptKey(prompt, systemInstruction);
+		const cached = cache.get(key);
+		if (cached) {
+			counters.cache_hits += 1;
+			return sendJson(res, 200, { ...cached, credits, cached: true });
+		}
+		// Single-flight: identical prompts already in flight share one upstream call and one credit
+		let pending = inflight.get(key);
+		if (pending) {
+			counters.coalesced += 1;
+		} else {
+			if (credits <= 0) return sendJson(res, 429, { error: 'rate_limit_exceeded', credits });
+			pending = callUpstream(prompt, systemInstruction)
+				.then((result) => { cache.set(key, result); return result; })
+				.finally(() => { inflight.delete(key); });
+			inflight.set(key, pending);
+		}
+		try {
+			const result = await pending;
+			return sendJson(res, 200, { ...result, credits });
+		} catch (err) {
+			return sendJson(res, 500, { error: String(err && err.message || err) });
+		}
+	} finally {
+		latency.request.record(Date.now() - started);
+	}
+}
+
+function statusPayload() {
+	return {
+		credits,
+		hasKey: Boolean(GEMINI_API_KEY),
+		cache: {
+			entries: cache.map.size,
+			bytes: cache.bytes,
+			max_entries: cache.maxEntries,
+			max_bytes: cache.maxBytes,
+			ttl_ms: cache.ttlMs,
+			evictions: cache.evictions,
+			inflight: inflight.size,
+		},
+		counters,
+		latency: { request: latency.request.summary(), upstream: latency.upstream.summary() },
+	};
+}
+
+function bodyError(status, message) {
+	const err = new Error(message);
+	err.status = status;
+	return err;
+}
+
+// Rejects with err.status set: 413 past MAX_BODY_BYTES, 400 when the client aborts, 500 otherwise.
+// An oversized body is only paused, so the caller can still answer on the socket.
+function readBody(req) {
+	return new Promise((resolve, reject) => {
+		if (Number(req.headers['content-length'] || 0) > MAX_BODY_BYTES) {
+			return reject(bodyError(413, 'body_too_large'));
+		}
+		const chunks = [];
+		let size = 0;
+		let settled = false;
+		const fail = (err) => {
+			if (settled) return;
+			settled = true;
+			req.pause();
+			req.unpipe();
+			reject(err);
+		};
+		req.on('data', (chunk) => {
+			if (settled) return;
+			size += chunk.length;
+			if (size > MAX_BODY_BYTES) return fail(bodyError(413, 'body_too_large'));
+			chunks.push(chunk);
+		});
+		req.on('end', () => {
+			if (settled) return;
+			settled = true;
+			resolve(Buffer.concat(chunks).toString('utf8'));
+		});
+		req.on('aborted', () => fail(bodyError(400, 'request_aborted')));
+		req.on('error', (err) => fail(bodyError(err && err.code === 'ECONNRESET' ? 400 : 500, String(err && err.message || err))));
+	});
+}
+
+function discardBody(req, ms) {
+	return new Promise((resolve) => {
+		if (req.readableEnded || req.destroyed) return resolve();
+		const timer = setTimeout(resolve, ms);
+		const done = () => { clearTimeout(timer); resolve(); };
+		req.on('end', done);
+		req.on('close', done);
+		req.on('error', done);
+		req.resume();
+	});
+}
+
 async function requestListener(req, res) {
 	const { pathname } = url.parse(req.url);
 	if (req.method === 'GET' && pathname === '/status') {
-		return sendJson(res, 200, { credits, hasKey: Boolean(GEMINI_API_KEY) });
+		return sendJson(res, 200, statusPayload());
 	}
 	if (req.method === 'POST' && pathname === '/ai/generate-json') {
-		let body = '';
-		req.on('data', chunk => { body += chunk; });
-		req.on('end', () => { handleGenerateJson(req, res, body); });
-		return;
+		let body;
+		try {
+			body = await readBody(req);
+		} catch (err) {
+			const status = err.status || 500;
+			// Clients read the answer only once their upload is sent, and closing with unread data
+			// resets the connection: discard the rest of an oversized body (for a bounded time) first
+			if (status === 413) await discardBody(req, DISCARD_MS);
+			res.on('finish', () => req.destroy());
+			return sendJson(res, status, { error: String(err && err.message || err) }, { Connection: 'close' });
+		}
+		return handleGenerateJson(req, res, body);
 	}
 	return notFound(res);
 }
 
-const server = http.createServer(requestListener);
-server.listen(PORT, () => {
-	console.log(`[imr-server] listening on http://127.0.0.1:${PORT} (credits=${credits})`);
-});
\ No newline at end of file
+if (require.main === module) {
+	const server = http.createServer(requestListener);
+	server.listen(PORT, () => {
+		console.log(`[imr-server] listening on http://127.0.0.1:${PORT} (credits=${credits})`);
+	});
+}
+
+module.exports = { LruCache, LatencyStats, requestListener };
@@ -63,9 +63,7 @@ def visual(base_url: str, routes: tuple[str, ...], out_dir: str) -> None:
 	console.print(json.dumps(res, indent=2))
 	if 'results' in res:
 		ocr = OCRAnalyzer()
-		ocr_results = {}
-		for r in res['results']:
-			ocr_results[r['file']] = ocr.analyze(r['file'])
+		ocr_results = ocr.analyze_batch([r['file'] for r in res['results'] if r.get('file')])
 		console.print(json.dumps(ocr_results, indent=2))
 
 @cli.command()
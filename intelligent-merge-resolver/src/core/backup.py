@@ -1,6 +1,7 @@
 from __future__ import annotations
 import os
 import json
+import shutil
 import time
 import typing as t
 
@@ -15,7 +16,7 @@ class BackupManager:
 		stamp = time.strftime("%Y%m%d-%H%M%S")
 		dst = os.path.join(self.backup_dir, f"{base}.{stamp}.bak")
 		with open(file_path, 'rb') as rf, open(dst, 'wb') as wf:
-			wf.write(rf.read())
+			shutil.copyfileobj(rf, wf)
 		return dst
 
 class DecisionLogger:
@@ -27,4 +28,44 @@ class DecisionLogger:
 		record = dict(record)
 		record.setdefault("ts", time.time())
 		with open(self.log_path, 'a', encoding='utf-8') as f:
-			f.write(json.dumps(record) + "\n")
\ No newline at end of file
+			f.write(json.dumps(record) + "\n")
+
+class PendingHunks:
+	"""
+	Files whose hunks a git hook could not resolve locally, kept in .imr/pending.json until a
+	`resolve` pass handles them. `hunks` lists unresolved hunk indices (None: file not reached).
+	"""
+
+	def __init__(self, repo_path: str) -> None:
+		self.path = os.path.join(repo_path, ".imr", "pending.json")
+
+	def load(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+		if not os.path.isfile(self.path):
+			return {}
+		try:
+			with open(self.path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			return data if isinstance(data, dict) else {}
+		except Exception:
+			return {}
+
+	def _save(self, data: t.Dict[str, t.Dict[str, t.Any]]) -> None:
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		tmp = self.path + ".tmp"
+		with open(tmp, 'w', encoding='utf-8') as f:
+			json.dump(data, f, indent=2)
+		os.replace(tmp, self.path)
+
+	def record(self, entries: t.Dict[str, t.Dict[str, t.Any]]) -> None:
+		if not entries:
+			return
+		data = self.load()
+		for file_path, entry in entries.items():
+			data[file_path] = {**entry, "ts": time.time()}
+		self._save(data)
+
+	def clear(self, file_paths: t.Iterable[str]) -> None:
+		data = self.load()
+		removed = [p for p in file_paths if data.pop(p, None) is not None]
+		if removed:
+			self._save(data)
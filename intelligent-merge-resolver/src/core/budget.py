@@ -0,0 +1,118 @@
+from __future__ import annotations
+import math
+import time
+import typing as t
+from dataclasses import dataclass
+
+from .prompt_window import conflict_section
+
+CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+	return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+@dataclass
+class Estimate:
+	calls: float = 0.0
+	tokens: int = 0
+	seconds: float = 0.0
+
+	def __add__(self, other: "Estimate") -> "Estimate":
+		return Estimate(self.calls + other.calls, self.tokens + other.tokens, self.seconds + other.seconds)
+
+	def to_dict(self) -> t.Dict[str, t.Any]:
+		return {"calls": round(self.calls, 2), "tokens": self.tokens, "seconds": round(self.seconds, 2)}
+
+
+@dataclass
+class CostModel:
+	"""
+	Expected cost of one reasoning chain. Every layer prompt carries a fixed template, the
+	conflict section and the output of the layers before it; the chain length and call latency
+	come from the scheduler's LayerStats when there is history.
+	"""
+	layers: int = 6
+	calls_per_chain: float = 6.0
+	seconds_per_call: float = 1.5
+	template_tokens: int = 180
+	output_tokens: int = 220
+	token_scale: float = 1.0
+
+	@classmethod
+	def from_stats(cls, store: t.Any, layers: int) -> "CostModel":
+		model = cls(layers=layers, calls_per_chain=float(layers), token_scale=getattr(store, "token_scale", 1.0))
+		runs = sum(s.runs for s in store.layers.values())
+		chains = getattr(store, "chains", 0)
+		if chains and runs:
+			model.calls_per_chain = min(float(layers), runs / chains)
+			model.seconds_per_call = sum(s.latency_s * s.runs for s in store.layers.values()) / runs
+		return model
+
+	def call_tokens(self, conflict_tokens: int, prior_layers: int) -> int:
+		return int((self.template_tokens + conflict_tokens + (prior_layers + 1) * self.output_tokens) * self.token_scale)
+
+	def chain(self, conflict_data: t.Mapping[str, t.Any]) -> Estimate:
+		conflict_tokens = estimate_tokens(conflict_section(conflict_data))
+		calls = self.calls_per_chain
+		whole = int(math.ceil(calls))
+		tokens = sum(self.call_tokens(conflict_tokens, k) for k in range(whole))
+		# A fractional expected chain length scales the last call's share
+		tokens -= int((whole - calls) * self.call_tokens(conflict_tokens, max(0, whole - 1)))
+		return Estimate(calls, tokens, calls * self.seconds_per_call)
+
+
+class Budget:
+	"""
+	Caps on model calls, tokens and wall-clock seconds for one run. `meter` returns the calls
+	and tokens actually spent so far (e.g. GeminiClient.usage), so estimates only decide
+	whether to start something, while the caps are checked against real spending.
+	"""
+
+	def __init__(self, max_calls: t.Optional[int] = None, max_tokens: t.Optional[int] = None, max_seconds: t.Optional[float] = None, meter: t.Optional[t.Callable[[], t.Tuple[int, int]]] = None) -> None:
+		self.max_calls = max_calls
+		self.max_tokens = max_tokens
+		self.max_seconds = max_seconds
+		self.meter = meter or (lambda: (0, 0))
+		self._start_usage = self.meter()
+		self._t0 = time.perf_counter()
+
+	@property
+	def limited(self) -> bool:
+		return any(v is not None for v in (self.max_calls, self.max_tokens, self.max_seconds))
+
+	def spent(self) -> Estimate:
+		calls, tokens = self.meter()
+		return Estimate(calls - self._start_usage[0], tokens - self._start_usage[1], time.perf_counter() - self._t0)
+
+	def remaining(self) -> Estimate:
+		s = self.spent()
+		inf = float("inf")
+		return Estimate(
+			(self.max_calls - s.calls) if self.max_calls is not None else inf,
+			(self.max_tokens - s.tokens) if self.max_tokens is not None else inf,  # type: ignore[arg-type]
+			(self.max_seconds - s.seconds) if self.max_seconds is not None else inf,
+		)
+
+	def fits(self, est: Estimate) -> bool:
+		r = self.remaining()
+		return est.calls <= r.calls and est.tokens <= r.tokens and est.seconds <= r.seconds
+
+	def allows_call(self, tokens: int) -> bool:
+		"""Whether one more model call of about `tokens` tokens stays inside every cap."""
+		r = self.remaining()
+		return r.calls >= 1 and tokens <= r.tokens and r.seconds > 0
+
+	def to_dict(self) -> t.Dict[str, t.Any]:
+		return {
+			"max_calls": self.max_calls,
+			"max_tokens": self.max_tokens,
+			"max_seconds": self.max_seconds,
+			"spent": self.spent().to_dict(),
+		}
+
+
+def by_value(items: t.Sequence[t.Tuple[t.Any, float, Estimate]]) -> t.List[t.Any]:
+	"""Keys of (key, value, estimate) ordered by value per token, the greedy order for a token or call budget."""
+	return [key for key, value, est in sorted(items, key=lambda x: (-x[1] / max(1, x[2].tokens), x[2].tokens))]
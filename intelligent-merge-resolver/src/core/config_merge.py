@@ -0,0 +1,224 @@
+from __future__ import annotations
+import os
+import re
+import json
+import typing as t
+from dataclasses import dataclass, field
+
+_UNSET: t.Any = object()
+_yaml: t.Any = _UNSET
+
+
+def _load_yaml() -> t.Any:
+	"""Import PyYAML on first use (None when it is missing); most commands never parse YAML."""
+	global _yaml
+	if _yaml is _UNSET:
+		try:
+			import yaml  # type: ignore
+		except Exception:  # pragma: no cover
+			yaml = None  # type: ignore
+		_yaml = yaml
+	return _yaml
+
+_MISSING: t.Any = object()
+KeyPath = t.Tuple[str, ...]
+_YAML_TOP_KEY = re.compile(r"^([^\s#\-][^:]*?):(?:\s|$)")
+
+
+@dataclass
+class KeyConflict:
+	path: KeyPath
+	base: t.Any
+	current: t.Any
+	incoming: t.Any
+
+	def to_dict(self) -> t.Dict[str, t.Any]:
+		def _plain(v: t.Any) -> t.Any:
+			return None if v is _MISSING else v
+		return {"key": ".".join(self.path), "base": _plain(self.base), "current": _plain(self.current), "incoming": _plain(self.incoming)}
+
+
+@dataclass
+class StructuralMergeResult:
+	"""Key-level merge of a config file; overlapping keys hold the current value until decided."""
+	format: str
+	merged: t.Any
+	conflicts: t.List[KeyConflict]
+	current_text: str
+	current_obj: t.Any
+	incoming_text: str = ""
+	incoming_obj: t.Any = None
+	indent: t.Union[int, str, None] = 2
+	auto_merged: t.List[str] = field(default_factory=list)
+
+	def render(self, decisions: t.Optional[t.Dict[KeyPath, str]] = None) -> str:
+		"""Serialize the merge. decisions maps a conflicting key path to 'current' or 'incoming'."""
+		obj = self.merged
+		for c in self.conflicts:
+			if (decisions or {}).get(c.path) == "incoming":
+				obj = _set_path(obj, c.path, c.incoming)
+		if obj == self.current_obj:
+			# Nothing to change on our side; keep the file byte-for-byte
+			return self.current_text
+		trailing = "\n" if self.current_text.endswith("\n") else ""
+		if self.format == "json":
+			return json.dumps(obj, indent=self.indent, ensure_ascii=False) + trailing
+		text = self._render_yaml_blocks(obj)
+		if text is None:
+			text = _load_yaml().safe_dump(obj, sort_keys=False, default_flow_style=False, allow_unicode=True)
+		return text if trailing else text.rstrip("\n")
+
+	def _render_yaml_blocks(self, obj: t.Any) -> t.Optional[str]:
+		# Reuse the original text of every top-level key whose value one side already has,
+		# so comments and flow style survive; only re-dump keys whose value is new
+		if not isinstance(obj, dict) or not isinstance(self.current_obj, dict):
+			return None
+		current_blocks = _yaml_blocks(self.current_text, self.current_obj)
+		if current_blocks is None:
+			return None
+		incoming_blocks = _yaml_blocks(self.incoming_text, self.incoming_obj) if isinstance(self.incoming_obj, dict) else None
+		parts = [current_blocks.get(None, "")]
+		for key, value in obj.items():
+			if key in current_blocks and self.current_obj.get(key, _MISSING) == value:
+				parts.append(current_blocks[key])
+			elif incoming_blocks and key in incoming_blocks and self.incoming_obj.get(key, _MISSING) == value:
+				parts.append(incoming_blocks[key])
+			else:
+				parts.append(_load_yaml().safe_dump({key: value}, sort_keys=False, default_flow_style=False, allow_unicode=True))
+		return "".join(p if p.endswith("\n") or not p else p + "\n" for p in parts)
+
+
+def detect_format(file_path: str) -> t.Optional[str]:
+	ext = os.path.splitext(file_path)[1].lower()
+	if ext == ".json":
+		return "json"
+	if ext in {".yml", ".yaml"} and _load_yaml() is not None:
+		return "yaml"
+	return None
+
+
+def _parse(fmt: str, text: t.Optional[str]) -> t.Any:
+	if text is None:
+		return _MISSING
+	if fmt == "json":
+		return json.loads(text) if text.strip() else _MISSING
+	return _load_yaml().safe_load(text)
+
+
+def _yaml_blocks(text: str, obj: t.Dict[str, t.Any]) -> t.Optional[t.Dict[t.Optional[str], str]]:
+	"""Split a YAML mapping into per-top-level-key text blocks; the None key holds any preamble."""
+	blocks: t.Dict[t.Optional[str], t.List[str]] = {None: []}
+	key: t.Optional[str] = None
+	pending: t.List[str] = []
+	for line in text.splitlines(keepends=True):
+		m = _YAML_TOP_KEY.match(line)
+		if m:
+			try:
+				key = _load_yaml().safe_load(m.group(1))
+			except Exception:
+				return None
+			if key not in obj or key in blocks:
+				return None
+			# Comments and blank lines directly above a key belong to it
+			blocks[key] = pending + [line]
+			pending = []
+		elif not line.strip() or line.lstrip().startswith("#"):
+			pending.append(line)
+		else:
+			blocks[key].extend(pending + [line])
+			pending = []
+	blocks[key].extend(pending)
+	if len(blocks) - 1 != len(obj):
+		return None
+	return {k: "".join(v) for k, v in blocks.items()}
+
+
+def _json_indent(text: str) -> t.Union[str, None]:
+	for line in text.splitlines()[1:]:
+		stripped = line.lstrip()
+		if stripped and len(stripped) != len(line):
+			return line[:len(line) - len(stripped)]
+	return None
+
+
+def _set_path(obj: t.Any, path: KeyPath, value: t.Any) -> t.Any:
+	if not path:
+		return value
+	out = dict(obj)
+	head, rest = path[0], path[1:]
+	if rest:
+		out[head] = _set_path(out.get(head, {}), rest, value)
+	elif value is _MISSING:
+		out.pop(head, None)
+	else:
+		out[head] = value
+	return out
+
+
+def _ordered_keys(current: dict, incoming: dict) -> t.List[str]:
+	# Current order first; keys only the incoming side added go after their predecessor there
+	order = list(current.keys())
+	seen = set(order)
+	prev: t.Optional[str] = None
+	for key in incoming.keys():
+		if key not in seen:
+			pos = order.index(prev) + 1 if prev in seen else 0
+			order.insert(pos, key)
+			seen.add(key)
+		prev = key
+	return order
+
+
+def three_way_merge(base: t.Any, current: t.Any, incoming: t.Any, path: KeyPath = ()) -> t.Tuple[t.Any, t.List[KeyConflict], t.List[str]]:
+	"""Merge three parsed values; returns (merged, conflicts, auto-merged key paths)."""
+	if current == incoming:
+		return current, [], []
+	if current == base:
+		return incoming, [], [".".join(path) or "<root>"]
+	if incoming == base:
+		return current, [], []
+	if isinstance(current, dict) and isinstance(incoming, dict):
+		base_dict = base if isinstance(base, dict) else {}
+		merged: t.Dict[str, t.Any] = {}
+		conflicts: t.List[KeyConflict] = []
+		auto: t.List[str] = []
+		for key in _ordered_keys(current, incoming):
+			value, sub_conflicts, sub_auto = three_way_merge(
+				base_dict.get(key, _MISSING), current.get(key, _MISSING), incoming.get(key, _MISSING), path + (key,)
+			)
+			conflicts.extend(sub_conflicts)
+			auto.extend(sub_auto)
+			if value is not _MISSING:
+				merged[key] = value
+		return merged, conflicts, auto
+	# Scalars, lists and type changes are atomic: both sides changed them differently
+	return current, [KeyConflict(path=path, base=base, current=current, incoming=incoming)], []
+
+
+def merge_config_text(file_path: str, base_text: t.Optional[str], current_text: str, incoming_text: str) -> t.Optional[StructuralMergeResult]:
+	"""Three-way merge of JSON/YAML file versions. Returns None when the file cannot be parsed."""
+	fmt = detect_format(file_path)
+	if fmt is None:
+		return None
+	try:
+		current = _parse(fmt, current_text)
+		incoming = _parse(fmt, incoming_text)
+		base = _parse(fmt, base_text)
+	except Exception:
+		return None
+	if current is _MISSING or incoming is _MISSING:
+		return None
+	if base is _MISSING and isinstance(current, dict):
+		base = {}
+	merged, conflicts, auto = three_way_merge(base, current, incoming)
+	return StructuralMergeResult(
+		format=fmt,
+		merged=merged,
+		conflicts=conflicts,
+		current_text=current_text,
+		current_obj=current,
+		incoming_text=incoming_text,
+		incoming_obj=incoming,
+		indent=_json_indent(current_text) if fmt == "json" else None,
+		auto_merged=auto,
+	)
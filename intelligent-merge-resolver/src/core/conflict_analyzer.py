@@ -3,6 +3,7 @@ import os
 import typing as t
 from dataclasses import dataclass
 from .merge_detector import extract_conflicts
+from .lockfile_merge import lockfile_kind
 
 @dataclass
 class ConflictMetadata:
@@ -14,6 +15,14 @@ class ConflictMetadata:
 
 class ConflictAnalyzer:
 	def analyze_conflict(self, file_path: str) -> ConflictMetadata:
+		if lockfile_kind(file_path):
+			# Lockfile hunks can number in the thousands; count markers instead of building snippets
+			hunks = 0
+			with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+				for line in f:
+					hunks += line.startswith("<<<<<<< ")
+			complexity = "low" if hunks <= 1 else ("medium" if hunks <= 3 else "high")
+			return ConflictMetadata(file_path=file_path, conflict_type="lockfile", complexity=complexity, snippets=[])
 		with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
 			content = f.read()
 		conflicts = extract_conflicts(content)
@@ -23,6 +32,8 @@ class ConflictAnalyzer:
 		return ConflictMetadata(file_path=file_path, conflict_type=conflict_type, complexity=complexity, snippets=snippets)
 
 	def _classify_type(self, file_path: str) -> str:
+		if lockfile_kind(file_path):
+			return "lockfile"
 		ext = os.path.splitext(file_path)[1].lower()
 		if ext in {".js", ".jsx", ".ts", ".tsx"}:
 			return "ui" if "component" in file_path.lower() else "code"
@@ -1,14 +1,33 @@
 from __future__ import annotations
+import os
+import json
+import time
 import typing as t
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
+from .tracing import span
+from .prompt_window import conflict_section
+from .budget import CostModel, estimate_tokens
+
+# Layer recommendation -> engine decision
+DECISIONS = {"current": "keep_current", "incoming": "keep_incoming", "merged": "merge_both"}
+_ALIASES = {
+	"current": "current", "keep_current": "current", "ours": "current", "head": "current",
+	"incoming": "incoming", "keep_incoming": "incoming", "theirs": "incoming",
+	"merged": "merged", "merge": "merged", "both": "merged", "merge_both": "merged", "combine": "merged",
+}
 
 @dataclass
 class ReasoningContext:
 	layers: t.Dict[str, t.Any] = field(default_factory=dict)
+	conflict: t.Dict[str, t.Any] = field(default_factory=dict)
 
 	def get_previous_reasoning(self) -> t.Dict[str, t.Any]:
 		return self.layers
 
+	def conflict_prompt(self) -> str:
+		"""The hunk windows (or structural conflicts) being decided, as prompt text."""
+		return conflict_section(self.conflict)
+
 	def add_reasoning_layer(self, layer_name: str, result: t.Any) -> None:
 		self.layers[layer_name] = result
 
@@ -18,41 +37,210 @@ class DecisionSynthesisResult:
 	confidence: float
 	justification: str
 	context_snapshot: t.Dict[str, t.Any]
+	votes: t.Dict[str, float] = field(default_factory=dict)
+	layers_run: t.List[str] = field(default_factory=list)
+
+@dataclass
+class LayerStats:
+	"""Running record of one layer: latency (EWMA), how often it votes and how often it agrees."""
+	runs: int = 0
+	votes: int = 0
+	agreements: int = 0
+	judged: int = 0
+	latency_s: float = 1.0
+
+	def observe(self, latency_s: float, voted: bool, alpha: float = 0.2) -> None:
+		self.latency_s = latency_s if self.runs == 0 else (1 - alpha) * self.latency_s + alpha * latency_s
+		self.runs += 1
+		self.votes += int(voted)
+
+	@property
+	def vote_rate(self) -> float:
+		return (self.votes + 1) / (self.runs + 2)
+
+	@property
+	def reliability(self) -> float:
+		"""Laplace-smoothed rate at which this layer's vote matched the final decision."""
+		return (self.agreements + 1) / (self.judged + 2)
+
+	def information_per_second(self) -> float:
+		informativeness = self.vote_rate * max(0.05, 2 * self.reliability - 1)
+		return informativeness / max(0.01, self.latency_s)
+
+class LayerStatsStore:
+	"""Per-layer stats persisted as JSON (e.g. .imr/layer_stats.json) so scheduling improves across runs."""
+
+	def __init__(self, path: t.Optional[str] = None) -> None:
+		self.path = path
+		self.layers: t.Dict[str, LayerStats] = {}
+		# Chains reasoned so far; runs / chains is the mean chain length the cost model plans with
+		self.chains = 0
+		# Metered / estimated tokens per chain (EWMA); scales the cost model's token estimates
+		self.token_scale = 1.0
+		if path and os.path.isfile(path):
+			try:
+				with open(path, "r", encoding="utf-8") as f:
+					raw = json.load(f)
+				self.layers = {k: LayerStats(**v) for k, v in raw.get("layers", {}).items()}
+				self.chains = int(raw.get("chains", 0))
+				self.token_scale = float(raw.get("token_scale", 1.0))
+			except Exception:
+				self.layers = {}
+
+	def get(self, name: str) -> LayerStats:
+		return self.layers.setdefault(name, LayerStats())
+
+	def save(self) -> None:
+		if not self.path:
+			return
+		os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+		tmp = self.path + ".tmp"
+		with open(tmp, "w", encoding="utf-8") as f:
+			json.dump({"chains": self.chains, "token_scale": round(self.token_scale, 4), "layers": {k: asdict(v) for k, v in self.layers.items()}}, f, indent=2)
+		os.replace(tmp, self.path)
 
 class MergeReasoningEngine:
-	def __init__(self, layers: t.Optional[t.List[t.Any]] = None) -> None:
+	"""
+	Runs reasoning layers in order of expected information per second (from LayerStats), tallies
+	each layer's recommendation weighted by confidence and reliability, and stops once the
+	remaining layers can no longer overturn the leading choice. Layers named in `pin_last`
+	read everything before them and always run at the end.
+	"""
+
+	def __init__(self, layers: t.Optional[t.List[t.Any]] = None, stats_path: t.Optional[str] = None, pin_last: t.Sequence[str] = ("meta",), min_votes: int = 2) -> None:
 		self.reasoning_chain = layers or []
+		self.stats = LayerStatsStore(stats_path)
+		self.pin_last = tuple(pin_last)
+		self.min_votes = min_votes
+
+	def schedule(self) -> t.List[t.Any]:
+		"""Layers sorted by information per second; ties keep the configured order."""
+		free = [l for l in self.reasoning_chain if l.layer_name not in self.pin_last]
+		pinned = [l for l in self.reasoning_chain if l.layer_name in self.pin_last]
+		free.sort(key=lambda l: -self.stats.get(l.layer_name).information_per_second())
+		return free + pinned
+
+	def cost_model(self) -> CostModel:
+		return CostModel.from_stats(self.stats, len(self.reasoning_chain))
+
+	async def reason_through_merge(self, conflict_data: t.Dict[str, t.Any], threshold: float = 0.85, budget: t.Any = None) -> DecisionSynthesisResult:
+		"""`budget` (core.budget.Budget) stops the chain before a layer call it cannot afford."""
+		with span("engine.reason", file=conflict_data.get("file"), layers=len(self.reasoning_chain)) as sp:
+			result = await self._run_chain(conflict_data, threshold, budget)
+			sp.set(decision=result.decision, confidence=result.confidence, layers_run=len(result.layers_run))
+			return result
 
-	async def reason_through_merge(self, conflict_data: t.Dict[str, t.Any], threshold: float = 0.85) -> DecisionSynthesisResult:
-		ctx = ReasoningContext()
-		aggregate_conf = 0.0
-		count = 0
-		for layer in self.reasoning_chain:
-			ctx = await layer.analyze(ctx)  # type: ignore
-			conf = self._extract_confidence(layer.layer_name, ctx.layers.get(layer.layer_name))
+	async def _run_chain(self, conflict_data: t.Dict[str, t.Any], threshold: float, budget: t.Any = None) -> DecisionSynthesisResult:
+		ctx = ReasoningContext(conflict=conflict_data)
+		order = self.schedule()
+		cost = self.cost_model()
+		conflict_tokens = estimate_tokens(ctx.conflict_prompt()) if budget is not None else 0
+		spent_before = budget.spent().tokens if budget is not None else 0
+		tally: t.Dict[str, float] = {}
+		voters: t.Dict[str, t.List[float]] = {}
+		recs: t.Dict[str, str] = {}
+		confs: t.List[float] = []
+		run: t.List[str] = []
+		stopped = ""
+		for i, layer in enumerate(order):
+			if budget is not None and not budget.allows_call(cost.call_tokens(conflict_tokens, i)):
+				stopped = "budget"
+				break
+			stats = self.stats.get(layer.layer_name)
+			with span(f"layer.{layer.layer_name}") as sp:
+				t0 = time.perf_counter()
+				ctx = await layer.analyze(ctx)  # type: ignore
+				out = ctx.layers.get(layer.layer_name)
+				conf = self._extract_confidence(layer.layer_name, out)
+				rec = self._extract_recommendation(layer.layer_name, out)
+				stats.observe(time.perf_counter() - t0, rec is not None)
+				sp.set(confidence=conf, recommendation=rec)
+			run.append(layer.layer_name)
 			if conf is not None:
-				aggregate_conf += conf
-				count += 1
-			# Early exit if consistently high
-			if count >= 2 and (aggregate_conf / max(1, count)) >= threshold:
-				return DecisionSynthesisResult(
-					decision="keep_current",
-					confidence=min(1.0, aggregate_conf / max(1, count)),
-					justification=f"High confidence after {layer.layer_name}",
-					context_snapshot=ctx.layers,
-				)
-		avg_conf = aggregate_conf / max(1, count)
+				confs.append(conf)
+			if rec is not None:
+				recs[layer.layer_name] = rec
+				weight = (conf if conf is not None else 0.5) * stats.reliability
+				tally[rec] = tally.get(rec, 0.0) + weight
+				voters.setdefault(rec, []).append(conf if conf is not None else 0.5)
+			stopped = self._settled(tally, voters, order[i + 1:], threshold)
+			if stopped:
+				break
+		result = self._synthesize(tally, voters, confs, ctx, run, stopped)
+		if budget is not None and run:
+			# Calibrate token estimates against what the meter actually saw for this chain
+			estimated = sum(cost.call_tokens(conflict_tokens, k) for k in range(len(run))) / cost.token_scale
+			actual = budget.spent().tokens - spent_before
+			if actual > 0 and estimated > 0:
+				ratio = min(10.0, max(0.1, actual / estimated))
+				self.stats.token_scale = 0.8 * self.stats.token_scale + 0.2 * ratio
+		# A chain cut short by the budget says nothing about how long chains normally run
+		self._learn(result, recs, count_chain=stopped != "budget")
+		return result
+
+	def _settled(self, tally: t.Dict[str, float], voters: t.Dict[str, t.List[float]], remaining: t.Sequence[t.Any], threshold: float) -> str:
+		"""Why the chain can stop now, or "" to keep going."""
+		if not tally or not remaining:
+			return ""
+		ranked = sorted(tally.values(), reverse=True)
+		lead = ranked[0] - (ranked[1] if len(ranked) > 1 else 0.0)
+		# A remaining layer can add at most its reliability (confidence <= 1) to a rival choice
+		if lead > sum(self.stats.get(l.layer_name).reliability for l in remaining):
+			return "decided"
+		if len(voters) == 1:
+			confs = next(iter(voters.values()))
+			if len(confs) >= self.min_votes and sum(confs) / len(confs) >= threshold:
+				return "unanimous"
+		return ""
+
+	def _synthesize(self, tally: t.Dict[str, float], voters: t.Dict[str, t.List[float]], confs: t.List[float], ctx: ReasoningContext, run: t.List[str], stopped: str) -> DecisionSynthesisResult:
+		if not tally:
+			avg = sum(confs) / len(confs) if confs else 0.0
+			return DecisionSynthesisResult(
+				decision="manual_review",
+				confidence=avg,
+				justification=f"No layer recommended a side ({len(run)} layers run)",
+				context_snapshot=ctx.layers,
+				layers_run=run,
+			)
+		best = max(tally, key=lambda k: tally[k])
+		share = tally[best] / sum(tally.values())
+		mean_conf = sum(voters[best]) / len(voters[best])
+		how = {"decided": "remaining layers cannot change it", "unanimous": "unanimous above threshold", "budget": "budget exhausted"}.get(stopped, "all layers run")
 		return DecisionSynthesisResult(
-			decision="keep_current" if avg_conf >= 0.5 else "manual_review",
-			confidence=avg_conf,
-			justification="Aggregated confidence across layers",
+			decision=DECISIONS[best],
+			confidence=min(1.0, share * mean_conf),
+			justification=f"{best} by {len(voters[best])}/{sum(len(v) for v in voters.values())} votes after {', '.join(run)} ({how})",
 			context_snapshot=ctx.layers,
+			votes={k: round(v, 4) for k, v in tally.items()},
+			layers_run=run,
 		)
 
+	def _learn(self, result: DecisionSynthesisResult, recs: t.Dict[str, str], count_chain: bool = True) -> None:
+		self.stats.chains += int(count_chain)
+		final = next((k for k, v in DECISIONS.items() if v == result.decision), None)
+		if final is not None:
+			for name, rec in recs.items():
+				st = self.stats.get(name)
+				st.judged += 1
+				st.agreements += int(rec == final)
+		try:
+			self.stats.save()
+		except OSError:
+			pass
+
 	def _extract_confidence(self, layer_name: str, result: t.Any) -> t.Optional[float]:
 		if isinstance(result, dict):
 			for key in (f"{layer_name}_confidence", "confidence"):
 				val = result.get(key)
 				if isinstance(val, (int, float)):
 					return float(val)
-		return None
\ No newline at end of file
+		return None
+
+	def _extract_recommendation(self, layer_name: str, result: t.Any) -> t.Optional[str]:
+		if isinstance(result, dict) and not result.get("error"):
+			for key in (f"{layer_name}_recommendation", "recommendation"):
+				val = result.get(key)
+				if isinstance(val, str):
+					return _ALIASES.get(val.strip().lower())
+		return None
@@ -0,0 +1,262 @@
+from __future__ import annotations
+import os
+import json
+import math
+import re
+import typing as t
+from dataclasses import dataclass, field
+from .merge_detector import MergeConflict
+
+LABELS = ("current", "incoming")
+# Hunk sources in the learning history that count as labels (see cli.main._hunk_source)
+TRAINING_SOURCES = ("reasoning", "user")
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|\S")
+
+
+def _bucket(n: int) -> str:
+	# 0, 1, 2-3, 4-7, ... capped so large hunks share a bucket
+	return str(min(n.bit_length(), 6))
+
+
+def path_pattern(file_path: str) -> str:
+	norm = file_path.replace(os.sep, "/")
+	if norm.startswith("./"):
+		norm = norm[2:]
+	top = norm.split("/", 1)[0] if "/" in norm else ""
+	ext = os.path.splitext(norm)[1].lower() or os.path.basename(norm)
+	return f"{top}/*{ext}" if top else f"*{ext}"
+
+
+def hunk_features(file_path: str, conflict: MergeConflict, conflict_type: str) -> t.List[str]:
+	cur_lines = conflict.current.splitlines() if conflict.current else []
+	inc_lines = conflict.incoming.splitlines() if conflict.incoming else []
+	cur_tokens = set(_TOKEN.findall(conflict.current))
+	inc_tokens = set(_TOKEN.findall(conflict.incoming))
+	union = cur_tokens | inc_tokens
+	overlap = len(cur_tokens & inc_tokens) / len(union) if union else 1.0
+	if not cur_lines and not inc_lines:
+		empty = "both"
+	elif not cur_lines:
+		empty = "current"
+	elif not inc_lines:
+		empty = "incoming"
+	else:
+		empty = "none"
+	delta = len(inc_lines) - len(cur_lines)
+	return [
+		f"pattern:{path_pattern(file_path)}",
+		f"ext:{os.path.splitext(file_path)[1].lower()}",
+		f"type:{conflict_type}",
+		f"cur_lines:{_bucket(len(cur_lines))}",
+		f"inc_lines:{_bucket(len(inc_lines))}",
+		f"delta:{'grow' if delta > 0 else ('shrink' if delta < 0 else 'same')}",
+		f"empty:{empty}",
+		f"overlap:{int(overlap * 10)}",
+	]
+
+
+@dataclass
+class Prediction:
+	choice: str
+	confidence: float
+	pattern: str
+
+
+@dataclass
+class PatternStats:
+	predicted: int = 0
+	correct: int = 0
+
+	@property
+	def precision(self) -> float:
+		return self.correct / self.predicted if self.predicted else 0.0
+
+
+@dataclass
+class LearnedResolver:
+	"""
+	Naive Bayes over categorical hunk features, trained incrementally from
+	.imr/learning.jsonl. Predictions are only returned when both the posterior
+	and the measured precision of the hunk's path pattern clear their gates.
+	Precision is scored at `threshold`, the same posterior gate predictions are served at.
+	"""
+	label_counts: t.Dict[str, int] = field(default_factory=dict)
+	feature_counts: t.Dict[str, t.Dict[str, int]] = field(default_factory=dict)
+	pattern_stats: t.Dict[str, PatternStats] = field(default_factory=dict)
+	offset: int = 0
+	min_samples: int = 20
+	min_pattern_predictions: int = 5
+	min_precision: float = 0.95
+	threshold: float = 0.85
+
+	# -- persistence --------------------------------------------------------
+	@staticmethod
+	def model_path(repo_path: str) -> str:
+		return os.path.join(repo_path, ".imr", "fast_path_model.json")
+
+	@staticmethod
+	def history_path(repo_path: str) -> str:
+		return os.path.join(repo_path, ".imr", "learning.jsonl")
+
+	@classmethod
+	def load(cls, repo_path: str, threshold: float = 0.85) -> "LearnedResolver":
+		"""The saved model, synced with new history. A different threshold rebuilds it from the history."""
+		model = cls(threshold=threshold)
+		path = cls.model_path(repo_path)
+		if os.path.isfile(path):
+			try:
+				with open(path, "r", encoding="utf-8") as f:
+					raw = json.load(f)
+				if float(raw.get("threshold", 0.85)) != threshold:
+					# Pattern precision was scored at another threshold and says nothing about this one
+					raise ValueError("threshold changed")
+				model.label_counts = dict(raw.get("label_counts", {}))
+				model.feature_counts = {k: dict(v) for k, v in raw.get("feature_counts", {}).items()}
+				model.pattern_stats = {k: PatternStats(**v) for k, v in raw.get("pattern_stats", {}).items()}
+				model.offset = int(raw.get("offset", 0))
+			except Exception:
+				model = cls(threshold=threshold)
+		if model.sync(cls.history_path(repo_path)):
+			model.save(repo_path)
+		return model
+
+	def save(self, repo_path: str) -> None:
+		path = self.model_path(repo_path)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		data = {
+			"label_counts": self.label_counts,
+			"feature_counts": self.feature_counts,
+			"pattern_stats": {k: v.__dict__ for k, v in self.pattern_stats.items()},
+			"offset": self.offset,
+			"threshold": self.threshold,
+		}
+		tmp = path + ".tmp"
+		with open(tmp, "w", encoding="utf-8") as f:
+			json.dump(data, f)
+		os.replace(tmp, path)
+
+	def sync(self, history_path: str) -> int:
+		"""Consume history lines appended since the last sync; returns samples learned."""
+		if not os.path.isfile(history_path):
+			return 0
+		if os.path.getsize(history_path) < self.offset:
+			# History was truncated or rotated; start over
+			self.reset()
+		learned = 0
+		with open(history_path, "rb") as f:
+			f.seek(self.offset)
+			for raw in f:
+				if not raw.endswith(b"\n"):
+					break  # partially written line; pick it up next time
+				self.offset += len(raw)
+				for features, choice in _samples_from_record(raw):
+					self.observe(features, choice)
+					learned += 1
+		return learned
+
+	def reset(self) -> None:
+		self.label_counts = {}
+		self.feature_counts = {}
+		self.pattern_stats = {}
+		self.offset = 0
+
+	# -- model --------------------------------------------------------------
+	def _posterior(self, features: t.Sequence[str]) -> t.Dict[str, float]:
+		total = sum(self.label_counts.values())
+		scores: t.Dict[str, float] = {}
+		for label, count in self.label_counts.items():
+			counts = self.feature_counts.get(label, {})
+			denom = count + 2.0
+			s = math.log(count / total)
+			for feat in features:
+				s += math.log((counts.get(feat, 0) + 1.0) / denom)
+			scores[label] = s
+		if not scores:
+			return {}
+		top = max(scores.values())
+		exp = {k: math.exp(v - top) for k, v in scores.items()}
+		norm = sum(exp.values())
+		return {k: v / norm for k, v in exp.items()}
+
+	def _raw_predict(self, features: t.Sequence[str]) -> t.Optional[t.Tuple[str, float]]:
+		if sum(self.label_counts.values()) < self.min_samples:
+			return None
+		post = self._posterior(features)
+		if not post:
+			return None
+		label = max(post, key=post.get)  # type: ignore[arg-type]
+		return label, post[label]
+
+	def observe(self, features: t.Sequence[str], choice: str) -> None:
+		# Prequential scoring: judge the prediction before learning from the sample
+		pattern = _pattern_of(features)
+		guess = self._raw_predict(features)
+		if guess is not None and guess[1] >= self.threshold:
+			stats = self.pattern_stats.setdefault(pattern, PatternStats())
+			stats.predicted += 1
+			stats.correct += int(guess[0] == choice)
+		self.label_counts[choice] = self.label_counts.get(choice, 0) + 1
+		counts = self.feature_counts.setdefault(choice, {})
+		for feat in features:
+			counts[feat] = counts.get(feat, 0) + 1
+
+	def predict(self, features: t.Sequence[str]) -> t.Optional[Prediction]:
+		guess = self._raw_predict(features)
+		if guess is None or guess[1] < self.threshold:
+			return None
+		pattern = _pattern_of(features)
+		stats = self.pattern_stats.get(pattern)
+		if not stats or stats.predicted < self.min_pattern_predictions or stats.precision < self.min_precision:
+			return None
+		return Prediction(choice=guess[0], confidence=guess[1], pattern=pattern)
+
+	@classmethod
+	def replay(cls, history_path: str, threshold: float = 0.85) -> t.Dict[str, t.Any]:
+		"""Offline evaluation: replay the whole history through a fresh model."""
+		model = cls(threshold=threshold)
+		samples = 0
+		served = 0
+		served_correct = 0
+		if os.path.isfile(history_path):
+			with open(history_path, "rb") as f:
+				for raw in f:
+					for features, choice in _samples_from_record(raw):
+						samples += 1
+						pred = model.predict(features)
+						if pred is not None:
+							served += 1
+							served_correct += int(pred.choice == choice)
+						model.observe(features, choice)
+		return {
+			"samples": samples,
+			"fast_path_served": served,
+			"fast_path_precision": served_correct / served if served else 0.0,
+			"coverage": served / samples if samples else 0.0,
+			"patterns": {
+				k: {"predicted": v.predicted, "correct": v.correct, "precision": round(v.precision, 4)}
+				for k, v in sorted(model.pattern_stats.items())
+			},
+		}
+
+
+def _pattern_of(features: t.Sequence[str]) -> str:
+	for feat in features:
+		if feat.startswith("pattern:"):
+			return feat[len("pattern:"):]
+	return "*"
+
+
+def _samples_from_record(raw: bytes) -> t.Iterator[t.Tuple[t.List[str], str]]:
+	try:
+		rec = json.loads(raw)
+	except Exception:
+		return
+	for hunk in rec.get("hunks") or []:
+		# Only a model verdict for one side and a side the user named are ground truth.
+		# The --choice default and the local tiers' own output would self-reinforce
+		if hunk.get("source") not in TRAINING_SOURCES:
+			continue
+		choice = hunk.get("choice")
+		features = hunk.get("features")
+		if choice in LABELS and isinstance(features, list):
+			yield features, choice
@@ -0,0 +1,50 @@
+from __future__ import annotations
+import time
+import typing as t
+from dataclasses import dataclass
+from .merge_detector import MergeConflict
+from .trivial_rules import resolve_trivial
+from .learned_resolver import LearnedResolver, hunk_features
+
+
+@dataclass
+class HunkDecision:
+	"""A hunk resolved without the reasoning chain."""
+	source: str
+	text: str
+	choice: t.Optional[str] = None
+	confidence: float = 1.0
+
+
+def resolve_hunks_locally(
+	file_path: str,
+	hunks: t.Sequence[MergeConflict],
+	conflict_type: str,
+	model: t.Optional[LearnedResolver] = None,
+	deadline: t.Optional[float] = None,
+) -> t.Tuple[t.List[t.List[str]], t.List[t.Optional[HunkDecision]]]:
+	"""
+	Run the local tiers over every hunk: trivial rules first, then the learned fast path.
+	Returns per-hunk features and decisions (None where the hunk still needs reasoning).
+	Hunks reached after `deadline` (a time.perf_counter() value) are left undecided, with no features.
+	"""
+	features: t.List[t.List[str]] = []
+	decisions: t.List[t.Optional[HunkDecision]] = []
+	for hunk in hunks:
+		if deadline is not None and time.perf_counter() >= deadline:
+			features.append([])
+			decisions.append(None)
+			continue
+		fv = hunk_features(file_path, hunk, conflict_type)
+		features.append(fv)
+		trivial = resolve_trivial(hunk, file_path)
+		if trivial is not None:
+			decisions.append(HunkDecision(source=f"trivial:{trivial.rule}", text=trivial.text))
+			continue
+		pred = model.predict(fv) if model else None
+		if pred is not None:
+			text = hunk.current if pred.choice == "current" else hunk.incoming
+			decisions.append(HunkDecision(source="fast_path", text=text, choice=pred.choice, confidence=pred.confidence))
+			continue
+		decisions.append(None)
+	return features, decisions
@@ -0,0 +1,366 @@
+from __future__ import annotations
+import os
+import re
+import json
+import tempfile
+import typing as t
+from dataclasses import dataclass, field
+
+# Lockfiles are merged entry by entry and never sent to the model
+LOCKFILE_KINDS = {
+	"package-lock.json": "npm",
+	"npm-shrinkwrap.json": "npm",
+	"yarn.lock": "yarn",
+	"poetry.lock": "poetry",
+}
+
+_NPM_SECTION = re.compile(r'^  "([^"]+)": \{\s*$')
+_NPM_ENTRY = re.compile(r'^    "([^"]*)": \{')
+_NPM_VERSION = re.compile(r'^      "version": "([^"]+)"')
+_YARN_VERSION = re.compile(r'^  version:? "?([^"\s]+)"?\s*$')
+_POETRY_NAME = re.compile(r'^name = "([^"]+)"')
+_POETRY_VERSION = re.compile(r'^version = "([^"]+)"')
+
+# The npm root package entry ("" under "packages") lists the project's direct dependencies
+_NPM_ROOT = "packages/"
+_ROOT_DEP_MAPS = ("dependencies", "devDependencies", "optionalDependencies", "peerDependencies")
+
+
+def lockfile_kind(file_path: str) -> t.Optional[str]:
+	return LOCKFILE_KINDS.get(os.path.basename(file_path))
+
+
+@dataclass
+class Entry:
+	key: str
+	version: t.Optional[str]
+	lines: t.List[str]
+
+
+@dataclass
+class LockfileMergeResult:
+	kind: str
+	entries: int = 0
+	from_incoming: int = 0
+	added_from_incoming: int = 0
+	version_clashes: int = 0
+	errors: t.List[str] = field(default_factory=list)
+
+	@property
+	def ok(self) -> bool:
+		return not self.errors
+
+
+def version_key(version: t.Optional[str]) -> t.Tuple[t.Any, ...]:
+	"""Order versions numerically; pre-releases sort below the matching release."""
+	if not version:
+		return ((), 0, "")
+	core, _, pre = version.split("+", 1)[0].partition("-")
+	release = re.match(r"v?(\d+(?:\.\d+)*)(.*)$", core)
+	if not release:
+		return ((), 0, version)
+	nums = tuple(int(n) for n in release.group(1).split("."))
+	# PEP 440 style pre-releases (1.0rc1, 2.0b2) carry a suffix on the release itself
+	suffix = release.group(2)
+	is_pre = bool(pre) or bool(re.match(r"\.?(a|b|c|rc|dev|alpha|beta|pre)", suffix))
+	pre = pre or suffix
+	return (nums, 0 if is_pre else 1, pre)
+
+
+# -- streaming entry readers ----------------------------------------------------
+# Readers yield ("raw", line) for text outside entries, ("entry", Entry) for each
+# package entry and ("end", section) where a run of entries closes.
+
+Item = t.Tuple[str, t.Any]
+
+
+def _iter_npm(lines: t.Iterable[str]) -> t.Iterator[Item]:
+	section: t.Optional[str] = None
+	entry: t.Optional[Entry] = None
+	for line in lines:
+		if entry is not None:
+			entry.lines.append(line)
+			m = _NPM_VERSION.match(line)
+			if m and entry.version is None:
+				entry.version = m.group(1)
+			if line.rstrip().rstrip(",") == "    }":
+				yield ("entry", entry)
+				entry = None
+			continue
+		if section is not None:
+			m = _NPM_ENTRY.match(line)
+			if m:
+				entry = Entry(key=f"{section}/{m.group(1)}", version=None, lines=[line])
+				if line.rstrip().rstrip(",").endswith("{}"):
+					yield ("entry", entry)
+					entry = None
+				continue
+			if line.rstrip().rstrip(",") == "  }":
+				yield ("end", section)
+				section = None
+			yield ("raw", line)
+			continue
+		m = _NPM_SECTION.match(line)
+		if m and m.group(1) in ("packages", "dependencies"):
+			section = m.group(1)
+		yield ("raw", line)
+	if entry is not None or section is not None:
+		raise ValueError("truncated package-lock")
+
+
+def _iter_yarn(lines: t.Iterable[str]) -> t.Iterator[Item]:
+	entry: t.Optional[Entry] = None
+	for line in lines:
+		if entry is not None:
+			if line.strip() and line[0].isspace():
+				entry.lines.append(line)
+				m = _YARN_VERSION.match(line)
+				if m and entry.version is None:
+					entry.version = m.group(1)
+				continue
+			yield ("entry", entry)
+			entry = None
+		if line.strip() and not line[0].isspace() and not line.startswith("#") and line.rstrip().endswith(":"):
+			entry = Entry(key="/" + line.strip(), version=None, lines=[line])
+			continue
+		yield ("raw", line)
+	if entry is not None:
+		yield ("entry", entry)
+	yield ("end", "")
+
+
+def _iter_poetry(lines: t.Iterable[str]) -> t.Iterator[Item]:
+	entry: t.Optional[Entry] = None
+	in_packages = False
+	for line in lines:
+		if line.startswith("[") and not line.startswith("[package."):
+			if entry is not None:
+				yield ("entry", _strip_blank_tail(entry))
+				entry = None
+			if line.strip() == "[[package]]":
+				in_packages = True
+				entry = Entry(key="", version=None, lines=[line])
+				continue
+			if in_packages:
+				yield ("end", "")
+				in_packages = False
+		if entry is not None:
+			entry.lines.append(line)
+			m = _POETRY_NAME.match(line)
+			if m and not entry.key:
+				entry.key = "/" + m.group(1).lower()
+			m = _POETRY_VERSION.match(line)
+			if m and entry.version is None:
+				entry.version = m.group(1)
+			continue
+		yield ("raw", line)
+	if entry is not None:
+		yield ("entry", _strip_blank_tail(entry))
+	if in_packages:
+		yield ("end", "")
+
+
+def _strip_blank_tail(entry: Entry) -> Entry:
+	while len(entry.lines) > 1 and not entry.lines[-1].strip():
+		entry.lines.pop()
+	return entry
+
+
+_READERS: t.Dict[str, t.Callable[[t.Iterable[str]], t.Iterator[Item]]] = {
+	"npm": _iter_npm,
+	"yarn": _iter_yarn,
+	"poetry": _iter_poetry,
+}
+
+
+class _Writer:
+	"""Holds back one entry so separators (npm commas, blank lines) can be fixed up."""
+
+	def __init__(self, kind: str, out: t.TextIO) -> None:
+		self.kind = kind
+		self.out = out
+		self.pending: t.Optional[t.List[str]] = None
+
+	def entry(self, lines: t.List[str]) -> None:
+		self._flush(more=True)
+		self.pending = lines
+
+	def raw(self, line: str) -> None:
+		self._flush(more=False)
+		self.out.write(line)
+
+	def close(self) -> None:
+		self._flush(more=False)
+
+	def _flush(self, more: bool) -> None:
+		if self.pending is None:
+			return
+		lines, self.pending = self.pending, None
+		if self.kind == "npm":
+			last = lines[-1]
+			body = last.rstrip("\r\n")
+			lines = lines[:-1] + [body.rstrip(",") + ("," if more else "") + (last[len(body):] or "\n")]
+		self.out.writelines(lines)
+		if self.kind == "poetry" or (self.kind == "yarn" and more):
+			self.out.write("\n")
+
+
+class _SpilledSide:
+	"""Incoming entries spilled to a temp file; only keys, versions and offsets stay in memory."""
+
+	def __init__(self, items: t.Iterator[Item]) -> None:
+		self.file = tempfile.TemporaryFile(mode="w+", encoding="utf-8", newline="")
+		self.index: t.Dict[str, t.Tuple[int, int, t.Optional[str]]] = {}
+		self.order: t.List[str] = []
+		for kind, value in items:
+			if kind != "entry":
+				continue
+			pos = self.file.tell()
+			text = "".join(value.lines)
+			self.file.write(text)
+			self.index[value.key] = (pos, len(text), value.version)
+			self.order.append(value.key)
+
+	def read(self, key: str) -> t.List[str]:
+		pos, length, _version = self.index[key]
+		self.file.seek(pos)
+		return self.file.read(length).splitlines(keepends=True)
+
+	def close(self) -> None:
+		self.file.close()
+
+
+def _npm_root(lines: t.List[str]) -> t.Dict[str, t.Any]:
+	return json.loads("{" + "".join(lines).rstrip().rstrip(",") + "}")[""]
+
+
+def _read_npm_root(open_side: t.Callable[[], t.Iterable[str]]) -> t.Optional[t.Dict[str, t.Any]]:
+	"""The root entry of one side, or None when the side is missing or unreadable."""
+	try:
+		for kind, value in _iter_npm(open_side()):
+			if kind == "entry" and value.key == _NPM_ROOT:
+				return _npm_root(value.lines)
+	except ValueError:
+		return None
+	return None
+
+
+def _merge_npm_root(base: t.Optional[t.Dict[str, t.Any]], current: t.List[str], incoming: t.List[str], chosen: t.List[str], result: LockfileMergeResult) -> t.List[str]:
+	"""
+	Three-way merge of the root entry's dependency maps, key by key: a requirement added or
+	changed on one side is taken, additions on both sides are unioned, and both sides changing
+	the same requirement differently is a conflict. Other fields come from the chosen entry.
+	"""
+	sides = (base or {}, _npm_root(current), _npm_root(incoming))
+	original = _npm_root(chosen)
+	root = dict(original)
+	for name in _ROOT_DEP_MAPS:
+		b, c, i = (side.get(name) or {} for side in sides)
+		merged: t.Dict[str, t.Any] = {}
+		for dep in sorted(set(b) | set(c) | set(i)):
+			bv, cv, iv = b.get(dep), c.get(dep), i.get(dep)
+			if cv == iv or iv == bv:
+				value = cv
+			elif cv == bv:
+				value = iv
+			else:
+				result.errors.append(f"root {name} {dep}: {cv or 'removed'} (current) vs {iv or 'removed'} (incoming)")
+				value = cv
+			if value is not None:
+				merged[dep] = value
+		if merged:
+			root[name] = merged
+		else:
+			root.pop(name, None)
+	if root == original:
+		return chosen
+	newline = "\r\n" if chosen[0].endswith("\r\n") else "\n"
+	body = json.dumps({"": root}, indent=2, ensure_ascii=False).splitlines()[1:-1]
+	return ["  " + ln + newline for ln in body]
+
+
+def merge_lockfile_streams(
+	kind: str,
+	open_current: t.Callable[[], t.Iterable[str]],
+	open_incoming: t.Callable[[], t.Iterable[str]],
+	out: t.TextIO,
+	open_base: t.Optional[t.Callable[[], t.Iterable[str]]] = None,
+) -> LockfileMergeResult:
+	"""
+	Merge two lockfile versions entry by entry: the union of entries, the higher version
+	on clashes. The current side's layout is kept and incoming-only entries are slotted
+	in at their incoming position. Memory holds one entry at a time plus key indexes.
+	The npm root entry is merged against the base instead (see _merge_npm_root).
+	"""
+	reader = _READERS[kind]
+	result = LockfileMergeResult(kind=kind)
+	current_keys = {value.key for k, value in reader(open_current()) if k == "entry"}
+	incoming = _SpilledSide(reader(open_incoming()))
+	position = {key: i for i, key in enumerate(incoming.order)}
+	writer = _Writer(kind, out)
+	cursor = 0
+
+	def _add_incoming_only(limit: int, section: str) -> None:
+		nonlocal cursor
+		while cursor < limit:
+			key = incoming.order[cursor]
+			cursor += 1
+			if key in current_keys or key.split("/", 1)[0] != section:
+				continue
+			writer.entry(incoming.read(key))
+			result.entries += 1
+			result.added_from_incoming += 1
+
+	try:
+		for item, value in reader(open_current()):
+			if item == "raw":
+				writer.raw(value)
+				continue
+			if item == "end":
+				_add_incoming_only(len(incoming.order), value)
+				cursor = 0
+				continue
+			section = value.key.split("/", 1)[0]
+			lines = value.lines
+			if value.key in incoming.index:
+				_add_incoming_only(position[value.key], section)
+				incoming_version = incoming.index[value.key][2]
+				if incoming_version != value.version:
+					result.version_clashes += 1
+					if version_key(incoming_version) > version_key(value.version):
+						lines = incoming.read(value.key)
+						result.from_incoming += 1
+				if kind == "npm" and value.key == _NPM_ROOT:
+					base = _read_npm_root(open_base) if open_base is not None else None
+					lines = _merge_npm_root(base, value.lines, incoming.read(value.key), lines, result)
+			writer.entry(lines)
+			result.entries += 1
+		writer.close()
+	finally:
+		incoming.close()
+	return result
+
+
+def merge_lockfile(
+	file_path: str,
+	open_current: t.Callable[[], t.Iterable[str]],
+	open_incoming: t.Callable[[], t.Iterable[str]],
+	open_base: t.Optional[t.Callable[[], t.Iterable[str]]] = None,
+) -> t.Optional[LockfileMergeResult]:
+	"""Stream-merge both sides into file_path via a temp file; None when the format is not recognised."""
+	kind = lockfile_kind(file_path)
+	if kind is None:
+		return None
+	fd, tmp = tempfile.mkstemp(prefix=".imr-lock-", dir=os.path.dirname(os.path.abspath(file_path)))
+	try:
+		with os.fdopen(fd, "w", encoding="utf-8", newline="") as out:
+			result = merge_lockfile_streams(kind, open_current, open_incoming, out, open_base)
+		if result.entries == 0:
+			os.unlink(tmp)
+			return None
+		os.replace(tmp, file_path)
+		return result
+	except (ValueError, OSError, UnicodeDecodeError) as e:
+		if os.path.exists(tmp):
+			os.unlink(tmp)
+		return LockfileMergeResult(kind=kind, errors=[str(e)])
@@ -3,11 +3,12 @@ import re
 import typing as t
 
 CONFLICT_START = re.compile(r"^<<<<<<< ")
+CONFLICT_BASE = re.compile(r"^\|\|\|\|\|\|\|( |$)")
 CONFLICT_SEP = re.compile(r"^=======\s*$")
 CONFLICT_END = re.compile(r"^>>>>>>> ")
 
 class MergeConflict:
-	def __init__(self, base: str, current: str, incoming: str) -> None:
+	def __init__(self, base: t.Optional[str], current: str, incoming: str) -> None:
 		self.base = base
 		self.current = current
 		self.incoming = incoming
@@ -21,8 +22,15 @@ def extract_conflicts(text: str) -> t.List[MergeConflict]:
 		if CONFLICT_START.match(lines[i] or ""):
 			i += 1
 			current_lines = []
+			base_lines: t.Optional[t.List[str]] = None
 			while i < len(lines) and not CONFLICT_SEP.match(lines[i] or ""):
-				current_lines.append(lines[i])
+				if CONFLICT_BASE.match(lines[i] or ""):
+					# diff3 style: the merge base sits between ||||||| and =======
+					base_lines = []
+				elif base_lines is not None:
+					base_lines.append(lines[i])
+				else:
+					current_lines.append(lines[i])
 				i += 1
 			# skip sep
 			i += 1
@@ -32,7 +40,8 @@ def extract_conflicts(text: str) -> t.List[MergeConflict]:
 				i += 1
 			# skip end
 			i += 1
-			conflicts.append(MergeConflict(base="", current="\n".join(current_lines), incoming="\n".join(incoming_lines)))
+			base = "\n".join(base_lines) if base_lines is not None else None
+			conflicts.append(MergeConflict(base=base, current="\n".join(current_lines), incoming="\n".join(incoming_lines)))
 		else:
 			i += 1
 	return conflicts
\ No newline at end of file
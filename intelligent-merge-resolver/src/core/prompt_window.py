@@ -0,0 +1,186 @@
+from __future__ import annotations
+import os
+import re
+import typing as t
+from dataclasses import dataclass, field
+
+from .merge_detector import CONFLICT_START, CONFLICT_BASE, CONFLICT_SEP, CONFLICT_END
+
+DEFAULT_CONTEXT_LINES = 3
+DEFAULT_MAX_HUNK_LINES = 200
+
+_GENERATED_NAMES = re.compile(r"(\.min\.(js|css|mjs)$|\.bundle\.js$|\.map$|_pb2(_grpc)?\.py$|\.pb\.go$|\.g\.dart$|\.generated\.\w+$|\.designer\.cs$)")
+_GENERATED_DIRS = {"dist", "build", "generated", "__generated__", "node_modules", "vendor"}
+_GENERATED_MARKERS = re.compile(r"@generated|do not edit|code generated by|auto-?generated|this file (was|is) generated", re.IGNORECASE)
+
+
+def generated_reason(path: str, text: str) -> t.Optional[str]:
+	"""Why a file should not be shown to the model ("minified" / "generated"), or None."""
+	norm = path.replace(os.sep, "/")
+	if _GENERATED_NAMES.search(norm) or any(seg in _GENERATED_DIRS for seg in norm.split("/")[:-1]):
+		return "generated"
+	lines = text.splitlines()
+	if any(_GENERATED_MARKERS.search(ln) for ln in lines[:8]):
+		return "generated"
+	if lines:
+		code = [ln for ln in lines if ln.strip()]
+		longest = max((len(ln) for ln in code), default=0)
+		average = sum(len(ln) for ln in code) / max(1, len(code))
+		if longest > 5000 or average > 300:
+			return "minified"
+	return None
+
+
+@dataclass
+class HunkWindow:
+	"""One conflict hunk with the lines around it (line numbers are 1-based in the marked-up file)."""
+	index: int
+	start: int
+	before: t.List[str]
+	base: t.Optional[t.List[str]]
+	current: t.List[str]
+	incoming: t.List[str]
+	after: t.List[str]
+	shared_before: t.List[str] = field(default_factory=list)
+	shared_after: t.List[str] = field(default_factory=list)
+	before_from_previous: bool = False
+
+
+def _common_edges(sides: t.List[t.List[str]]) -> t.Tuple[int, int]:
+	"""Lines every side starts / ends with; they are context, not conflict."""
+	shortest = min(len(s) for s in sides)
+	head = 0
+	while head < shortest and all(s[head] == sides[0][head] for s in sides):
+		head += 1
+	tail = 0
+	while tail < shortest - head and all(s[-1 - tail] == sides[0][-1 - tail] for s in sides):
+		tail += 1
+	return head, tail
+
+
+def hunk_windows(text: str, context_lines: int = DEFAULT_CONTEXT_LINES, only: t.Optional[t.Collection[int]] = None) -> t.List[HunkWindow]:
+	"""
+	Each hunk (or those listed in `only`) with up to `context_lines` unconflicted lines on either
+	side. Lines all sides agree on are moved out of the sides into shared context, and context
+	already shown after the previous window is not repeated.
+	"""
+	lines = text.splitlines()
+	spans: t.List[t.Tuple[int, int, t.Optional[t.List[str]], t.List[str], t.List[str]]] = []
+	i = 0
+	while i < len(lines):
+		if not CONFLICT_START.match(lines[i]):
+			i += 1
+			continue
+		start = i
+		i += 1
+		current: t.List[str] = []
+		base: t.Optional[t.List[str]] = None
+		while i < len(lines) and not CONFLICT_SEP.match(lines[i]):
+			if CONFLICT_BASE.match(lines[i]):
+				base = []
+			elif base is not None:
+				base.append(lines[i])
+			else:
+				current.append(lines[i])
+			i += 1
+		i += 1
+		incoming: t.List[str] = []
+		while i < len(lines) and not CONFLICT_END.match(lines[i]):
+			incoming.append(lines[i])
+			i += 1
+		spans.append((start, i, base, current, incoming))
+		i += 1
+	windows: t.List[HunkWindow] = []
+	shown_until = -1
+	for idx, (start, end, base, current, incoming) in enumerate(spans):
+		if only is not None and idx not in only:
+			continue
+		prev_end = spans[idx - 1][1] + 1 if idx > 0 else 0
+		next_start = spans[idx + 1][0] if idx + 1 < len(spans) else len(lines)
+		lo = max(prev_end, start - context_lines)
+		from_previous = lo <= shown_until
+		lo = max(lo, shown_until)
+		hi = min(next_start, end + 1 + context_lines)
+		sides = [s for s in (base, current, incoming) if s is not None]
+		head, tail = _common_edges(sides) if all(sides) else (0, 0)
+		cut = lambda s: s[head:len(s) - tail] if s is not None else None  # noqa: E731
+		windows.append(HunkWindow(
+			index=idx,
+			start=start + 1,
+			before=lines[lo:start],
+			base=cut(base),
+			current=cut(current) or [],
+			incoming=cut(incoming) or [],
+			after=lines[end + 1:hi],
+			shared_before=current[:head],
+			shared_after=current[len(current) - tail:] if tail else [],
+			before_from_previous=from_previous,
+		))
+		shown_until = hi
+	return windows
+
+
+def _clip(lines: t.List[str], max_lines: int) -> t.List[str]:
+	if len(lines) <= max_lines:
+		return lines
+	keep = max_lines // 2
+	return lines[:keep] + [f"... {len(lines) - 2 * keep} lines elided ..."] + lines[-keep:]
+
+
+def render_window(w: HunkWindow, max_hunk_lines: int = DEFAULT_MAX_HUNK_LINES) -> str:
+	out = [f"--- hunk {w.index + 1} (line {w.start}) ---"]
+	if w.before_from_previous and not w.before:
+		out.append("(continues from the previous hunk's context)")
+	if w.before or w.shared_before:
+		out.append("context before:")
+		out.extend("  " + ln for ln in w.before + w.shared_before)
+	if w.base is not None:
+		if w.base == w.current:
+			out.append("base: same as current")
+		elif w.base == w.incoming:
+			out.append("base: same as incoming")
+		else:
+			out.append("base:")
+			out.extend("  " + ln for ln in _clip(w.base, max_hunk_lines))
+	out.append("current:")
+	out.extend("  " + ln for ln in _clip(w.current, max_hunk_lines))
+	if w.incoming == w.current:
+		out.append("incoming: same as current")
+	else:
+		out.append("incoming:")
+		out.extend("  " + ln for ln in _clip(w.incoming, max_hunk_lines))
+	if w.shared_after or w.after:
+		out.append("context after:")
+		out.extend("  " + ln for ln in w.shared_after + w.after)
+	return "\n".join(out)
+
+
+def conflict_payload(path: str, text: str, context_lines: int = DEFAULT_CONTEXT_LINES, max_hunk_lines: int = DEFAULT_MAX_HUNK_LINES, only: t.Optional[t.Collection[int]] = None) -> t.Dict[str, t.Any]:
+	"""
+	The conflict as the reasoning layers see it: windows around the hunks still to decide, never
+	the whole file. Minified and generated files carry only the reason they were left out.
+	"""
+	payload: t.Dict[str, t.Any] = {"file": path}
+	reason = generated_reason(path, text)
+	if reason:
+		payload["skipped"] = reason
+		return payload
+	windows = hunk_windows(text, context_lines, only)
+	payload["hunks"] = [w.index for w in windows]
+	payload["conflict"] = "\n".join(render_window(w, max_hunk_lines) for w in windows)
+	return payload
+
+
+def conflict_section(conflict_data: t.Mapping[str, t.Any]) -> str:
+	"""Prompt text for a conflict payload, shared by every reasoning layer."""
+	lines = [f"File: {conflict_data.get('file', '?')}"]
+	if conflict_data.get("skipped"):
+		lines.append(f"(content not shown: {conflict_data['skipped']} file)")
+	if conflict_data.get("conflict"):
+		lines.append(conflict_data["conflict"])
+	for k in conflict_data.get("structural_conflicts") or []:
+		lines.append(f"--- definition {k['definition']} ---" if "definition" in k else f"--- key {k.get('key')} ---")
+		for side in ("base", "current", "incoming"):
+			if side in k:
+				lines.append(f"{side}: {k[side]}")
+	return "\n".join(lines)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+import ast
+import typing as t
+from dataclasses import dataclass, field
+from src.python.analyzers.code_analyzer import CodeAnalyzer, Segment
+
+IMPORTS_KEY = "<imports>"
+# (module or None for plain imports, name, asname)
+ImportAtom = t.Tuple[t.Optional[str], str, t.Optional[str]]
+
+
+@dataclass
+class DefinitionConflict:
+	path: t.Tuple[str, ...]
+	base: t.Optional[str]
+	current: t.Optional[str]
+	incoming: t.Optional[str]
+
+	def to_dict(self) -> t.Dict[str, t.Any]:
+		return {"definition": self.path[0], "base": self.base, "current": self.current, "incoming": self.incoming}
+
+
+@dataclass
+class PythonMergeResult:
+	"""Definition-level merge of a Python module; conflicting definitions hold the current text until decided."""
+	order: t.List[str]
+	chosen: t.Dict[str, t.Optional[str]]
+	imports: t.Dict[str, str]
+	conflicts: t.List[DefinitionConflict]
+	auto_merged: t.List[str] = field(default_factory=list)
+	format: str = "python"
+
+	def render(self, decisions: t.Optional[t.Dict[t.Tuple[str, ...], str]] = None) -> str:
+		chosen = dict(self.chosen)
+		for c in self.conflicts:
+			if (decisions or {}).get(c.path) == "incoming":
+				chosen[c.path[0]] = c.incoming
+		parts: t.List[str] = []
+		for key in self.order:
+			text = self.imports.get(key) if key.startswith(IMPORTS_KEY) else chosen.get(key)
+			if text:
+				parts.append(text if text.endswith("\n") else text + "\n")
+		return "".join(parts)
+
+
+def _atoms(node: ast.stmt) -> t.List[ImportAtom]:
+	if isinstance(node, ast.ImportFrom):
+		module = "." * node.level + (node.module or "")
+		return [(module, a.name, a.asname) for a in node.names]
+	if isinstance(node, ast.Import):
+		return [(None, a.name, a.asname) for a in node.names]
+	return []
+
+
+def _render_atoms(atoms: t.List[ImportAtom]) -> str:
+	names = ", ".join(f"{n} as {a}" if a else n for _m, n, a in atoms)
+	module = atoms[0][0]
+	return f"import {names}\n" if module is None else f"from {module} import {names}\n"
+
+
+def _import_segments(segments: t.List[Segment]) -> t.List[t.Tuple[Segment, t.List[ImportAtom]]]:
+	return [(s, _atoms(s.node)) for s in segments if s.kind == "import" and s.node is not None]
+
+
+def _merge_imports(base: t.List[Segment], current: t.List[Segment], incoming: t.List[Segment]) -> str:
+	"""Union import blocks per imported name; a name removed on either side stays removed."""
+	base_atoms = {a for _s, atoms in _import_segments(base) for a in atoms}
+	cur_stmts = _import_segments(current)
+	inc_stmts = _import_segments(incoming)
+	cur_atoms = {a for _s, atoms in cur_stmts for a in atoms}
+	inc_atoms = {a for _s, atoms in inc_stmts for a in atoms}
+	merged = (cur_atoms | inc_atoms) - (base_atoms - cur_atoms) - (base_atoms - inc_atoms)
+	added = [a for _s, atoms in inc_stmts for a in atoms if a in merged and a not in cur_atoms]
+	out: t.List[str] = []
+	covered: t.Set[ImportAtom] = set()
+	for seg, atoms in cur_stmts:
+		keep = [a for a in atoms if a in merged]
+		# New names from a module we already import from join that statement
+		extra = [a for a in added if a[0] is not None and a[0] == atoms[0][0] and a not in covered and a not in keep]
+		if keep == atoms and not extra:
+			out.append(seg.text)
+		elif keep or extra:
+			out.append(_render_atoms(keep + extra))
+		covered.update(keep + extra)
+	for seg, atoms in inc_stmts:
+		new = [a for a in atoms if a in merged and a not in covered]
+		if not new:
+			continue
+		out.append(seg.text if new == atoms else _render_atoms(new))
+		covered.update(new)
+	return "".join(s if s.endswith("\n") else s + "\n" for s in out)
+
+
+def _ordered_keys(current: t.List[str], incoming: t.List[str]) -> t.List[str]:
+	order = list(current)
+	seen = set(order)
+	prev: t.Optional[str] = None
+	for key in incoming:
+		if key not in seen:
+			pos = order.index(prev) + 1 if prev in seen else 0
+			order.insert(pos, key)
+			seen.add(key)
+		prev = key
+	return order
+
+
+def _by_key(segments: t.List[Segment]) -> t.Tuple[t.List[str], t.Dict[str, str], t.Dict[str, t.List[Segment]]]:
+	"""
+	Segment keys in order with their texts, plus the import runs. Each run of consecutive
+	imports is one key anchored to the statement above it, so an import block below e.g.
+	`sys.path.insert(...)` or a `try:` import stays below it.
+	"""
+	order: t.List[str] = []
+	texts: t.Dict[str, str] = {}
+	runs: t.Dict[str, t.List[Segment]] = {}
+	anchor: t.Optional[str] = None
+	run: t.Optional[str] = None
+	for s in segments:
+		if s.kind == "import":
+			if run is None:
+				run = IMPORTS_KEY if anchor is None else f"{IMPORTS_KEY}@{anchor}"
+				order.append(run)
+				runs[run] = []
+			runs[run].append(s)
+			continue
+		run = None
+		if s.kind != "docstring":
+			anchor = s.key
+		order.append(s.key)
+		texts[s.key] = s.text
+	return order, texts, runs
+
+
+def _same(a: t.Optional[str], b: t.Optional[str]) -> bool:
+	if a is None or b is None:
+		return a is b
+	return [ln.rstrip() for ln in a.strip("\n").splitlines()] == [ln.rstrip() for ln in b.strip("\n").splitlines()]
+
+
+def merge_python_text(base_text: t.Optional[str], current_text: str, incoming_text: str, analyzer: t.Optional[CodeAnalyzer] = None) -> t.Optional[PythonMergeResult]:
+	"""
+	Three-way merge of a Python module at top-level definition granularity.
+	Returns None when a version does not parse or the merge would not parse.
+	"""
+	analyzer = analyzer or CodeAnalyzer()
+	current = analyzer.top_level_segments(current_text)
+	incoming = analyzer.top_level_segments(incoming_text)
+	base = analyzer.top_level_segments(base_text) if base_text else []
+	if current is None or incoming is None or base is None:
+		return None
+	_base_order, base_texts, base_runs = _by_key(base)
+	cur_order, cur_texts, cur_runs = _by_key(current)
+	inc_order, inc_texts, inc_runs = _by_key(incoming)
+	chosen: t.Dict[str, t.Optional[str]] = {}
+	conflicts: t.List[DefinitionConflict] = []
+	auto: t.List[str] = []
+	order = _ordered_keys(cur_order, inc_order)
+	for key in order:
+		if key.startswith(IMPORTS_KEY):
+			continue
+		b, c, i = base_texts.get(key), cur_texts.get(key), inc_texts.get(key)
+		if _same(c, i):
+			chosen[key] = c
+		elif _same(c, b):
+			chosen[key] = i
+			auto.append(key)
+		elif _same(i, b):
+			chosen[key] = c
+		else:
+			chosen[key] = c
+			conflicts.append(DefinitionConflict(path=(key,), base=b, current=c, incoming=i))
+	imports = {key: _merge_imports(base_runs.get(key, []), cur_runs.get(key, []), inc_runs.get(key, [])) for key in order if key.startswith(IMPORTS_KEY)}
+	result = PythonMergeResult(order=order, chosen=chosen, imports=imports, conflicts=conflicts, auto_merged=auto)
+	try:
+		ast.parse(result.render())
+	except SyntaxError:
+		return None
+	return result
@@ -1,14 +1,16 @@
 from __future__ import annotations
 import re
+import typing as t
 
 START = re.compile(r"^<<<<<<< .*$", re.M)
 SEP = re.compile(r"^=======\s*$", re.M)
 END = re.compile(r"^>>>>>>> .*$", re.M)
+BASE = re.compile(r"^\|\|\|\|\|\|\|( .*)?$")
 
 
 def resolve_conflicts_in_text(text: str, choice: str = "current") -> str:
 	"""
-	choice: 'current' or 'incoming'
+	choice: 'current', 'incoming' or 'both' (current followed by incoming)
 	"""
 	lines = text.splitlines(keepends=True)
 	out = []
@@ -17,8 +19,12 @@ def resolve_conflicts_in_text(text: str, choice: str = "current") -> str:
 		if lines[i].startswith("<<<<<<< "):
 			i += 1
 			cur = []
+			in_base = False
 			while i < len(lines) and not SEP.match(lines[i]):
-				cur.append(lines[i])
+				# diff3 style hunks carry the merge base between ||||||| and =======
+				in_base = in_base or bool(BASE.match(lines[i].rstrip("\r\n")))
+				if not in_base:
+					cur.append(lines[i])
 				i += 1
 			i += 1  # skip sep
 			inc = []
@@ -26,8 +32,51 @@ def resolve_conflicts_in_text(text: str, choice: str = "current") -> str:
 				inc.append(lines[i])
 				i += 1
 			i += 1  # skip end
-			out.extend(cur if choice == "current" else inc)
+			out.extend(cur if choice == "current" else (cur + inc if choice == "both" else inc))
 		else:
 			out.append(lines[i])
 			i += 1
-	return "".join(out)
\ No newline at end of file
+	return "".join(out)
+
+def apply_hunk_resolutions(text: str, resolutions: t.Sequence[t.Optional[str]], choice: str = "current") -> str:
+	"""
+	Resolve hunks individually. resolutions[i] is the replacement text for the
+	i-th hunk, or None to fall back to `choice` ('current', 'incoming', 'both') for that
+	hunk; choice 'keep' leaves those hunks in place, markers included.
+	"""
+	lines = text.splitlines(keepends=True)
+	out = []
+	i = 0
+	idx = 0
+	while i < len(lines):
+		if lines[i].startswith("<<<<<<< "):
+			start = i
+			i += 1
+			cur = []
+			in_base = False
+			while i < len(lines) and not SEP.match(lines[i]):
+				# diff3 style hunks carry the merge base between ||||||| and =======
+				in_base = in_base or bool(BASE.match(lines[i].rstrip("\r\n")))
+				if not in_base:
+					cur.append(lines[i])
+				i += 1
+			i += 1  # skip sep
+			inc = []
+			while i < len(lines) and not lines[i].startswith(">>>>>>> "):
+				inc.append(lines[i])
+				i += 1
+			i += 1  # skip end
+			replacement = resolutions[idx] if idx < len(resolutions) else None
+			idx += 1
+			if replacement is None and choice == "keep":
+				out.extend(lines[start:i])
+			elif replacement is None:
+				out.extend(cur if choice == "current" else (cur + inc if choice == "both" else inc))
+			elif replacement:
+				newline = "\r\n" if (cur or inc or [""])[0].endswith("\r\n") else "\n"
+				body = newline.join(replacement.splitlines())
+				out.append(body + newline)
+		else:
+			out.append(lines[i])
+			i += 1
+	return "".join(out)
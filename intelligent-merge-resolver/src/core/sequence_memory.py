@@ -0,0 +1,215 @@
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import hashlib
+import typing as t
+from dataclasses import dataclass, field, asdict
+
+_TOKEN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|\S")
+_WS = re.compile(r"\s+")
+
+
+def normalize_side(text: str) -> str:
+	"""Hunk side without indentation or blank-line differences."""
+	return "\n".join(_WS.sub(" ", ln).strip() for ln in (text or "").splitlines() if ln.strip())
+
+
+def simhash(text: str, bits: int = 64) -> int:
+	"""64-bit SimHash over token bigrams (literals masked); near-identical hunks land a few bits apart."""
+	tokens = ["<num>" if tok.isdigit() else tok for tok in _TOKEN.findall(text)]
+	grams = [" ".join(tokens[i:i + 2]) for i in range(max(1, len(tokens) - 1))] if tokens else [""]
+	acc = [0] * bits
+	for g in grams:
+		h = int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+		for b in range(bits):
+			acc[b] += 1 if (h >> b) & 1 else -1
+	return sum(1 << b for b in range(bits) if acc[b] > 0)
+
+
+def _shape_tokens(text: str) -> t.Set[str]:
+	# Literals drift from commit to commit (versions, counters); match on the code's shape
+	return {"<num>" if tok.isdigit() else tok for tok in _TOKEN.findall(text)}
+
+
+def token_jaccard(a: str, b: str) -> float:
+	ta, tb = _shape_tokens(a), _shape_tokens(b)
+	union = ta | tb
+	return len(ta & tb) / len(union) if union else 1.0
+
+
+@dataclass
+class HunkFingerprint:
+	exact: str
+	current_hash: int
+	incoming_hash: int
+	current: str
+	incoming: str
+
+	@classmethod
+	def of(cls, current: str, incoming: str) -> "HunkFingerprint":
+		cur, inc = normalize_side(current), normalize_side(incoming)
+		exact = hashlib.sha1((cur + "\0" + inc).encode("utf-8")).hexdigest()
+		return cls(exact, simhash(cur), simhash(inc), cur, inc)
+
+	def similarity(self, other: "HunkFingerprint") -> float:
+		if self.exact == other.exact:
+			return 1.0
+		# SimHash prefilter; the token overlap of both sides decides
+		if bin(self.current_hash ^ other.current_hash).count("1") > 24 or bin(self.incoming_hash ^ other.incoming_hash).count("1") > 24:
+			return 0.0
+		return min(token_jaccard(self.current, other.current), token_jaccard(self.incoming, other.incoming))
+
+
+@dataclass
+class RememberedHunk:
+	file: str
+	key: str
+	exact: str
+	current_hash: int
+	incoming_hash: int
+	current: str
+	incoming: str
+	choice: t.Optional[str]
+	text: t.Optional[str]
+	source: str
+	confidence: float
+	step: t.Optional[int] = None
+	reused: int = 0
+
+	def fingerprint(self) -> HunkFingerprint:
+		return HunkFingerprint(self.exact, self.current_hash, self.incoming_hash, self.current, self.incoming)
+
+
+@dataclass
+class SequenceMatch:
+	choice: t.Optional[str]
+	text: t.Optional[str]
+	similarity: float
+	confidence: float
+	source: str
+	step: t.Optional[int]
+
+
+@dataclass
+class SequenceMemory:
+	"""
+	Decisions made at earlier stops of one rebase / cherry-pick series, kept in
+	.imr/sequence/<session>.json. New hunks are matched to remembered ones of the same file
+	(or, failing that, any file with the same name) by exact normalised content or by token
+	overlap of both sides; a match reuses the earlier side choice, or the earlier text when
+	the hunk is unchanged.
+	"""
+
+	path: str
+	session: str
+	kind: str = ""
+	hunks: t.List[RememberedHunk] = field(default_factory=list)
+	stats: t.Dict[str, int] = field(default_factory=dict)
+	updated_at: float = 0.0
+
+	@staticmethod
+	def dir_for(repo_path: str) -> str:
+		return os.path.join(repo_path, ".imr", "sequence")
+
+	@classmethod
+	def load(cls, repo_path: str, session: str, kind: str = "") -> "SequenceMemory":
+		path = os.path.join(cls.dir_for(repo_path), f"{session}.json")
+		mem = cls(path=path, session=session, kind=kind)
+		if os.path.isfile(path):
+			try:
+				with open(path, "r", encoding="utf-8") as f:
+					raw = json.load(f)
+				mem.hunks = [RememberedHunk(**h) for h in raw.get("hunks", [])]
+				mem.stats = dict(raw.get("stats", {}))
+				mem.kind = raw.get("kind", kind)
+			except Exception:
+				pass
+		return mem
+
+	def save(self) -> None:
+		self.updated_at = time.time()
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		tmp = self.path + ".tmp"
+		with open(tmp, "w", encoding="utf-8") as f:
+			json.dump({
+				"session": self.session,
+				"kind": self.kind,
+				"updated_at": self.updated_at,
+				"stats": self.stats,
+				"hunks": [asdict(h) for h in self.hunks],
+			}, f)
+		os.replace(tmp, self.path)
+
+	def _bump(self, name: str, n: int = 1) -> None:
+		self.stats[name] = self.stats.get(name, 0) + n
+
+	def lookup(self, file_path: str, current: str, incoming: str, key: str = "", min_similarity: float = 0.6) -> t.Optional[SequenceMatch]:
+		fp = HunkFingerprint.of(current, incoming)
+		base = os.path.basename(file_path)
+		best: t.Optional[RememberedHunk] = None
+		best_sim = 0.0
+		for h in self.hunks:
+			if h.key != key:
+				continue
+			same_file = h.file == file_path
+			if not same_file and os.path.basename(h.file) != base:
+				continue
+			sim = fp.similarity(h.fingerprint())
+			if not same_file:
+				sim *= 0.9
+			if sim > best_sim:
+				best, best_sim = h, sim
+		if best is None or best_sim < min_similarity:
+			self._bump("misses")
+			return None
+		exact = best.exact == fp.exact and best.file == file_path
+		# Earlier text only fits an unchanged hunk; otherwise carry the side over to the new content
+		text = best.text if exact else None
+		if text is None and best.choice is None:
+			self._bump("misses")
+			return None
+		best.reused += 1
+		self._bump("exact_hits" if exact else "fuzzy_hits")
+		return SequenceMatch(best.choice, text, best_sim, best.confidence * best_sim, best.source, best.step)
+
+	def remember(self, file_path: str, current: str, incoming: str, choice: t.Optional[str], text: t.Optional[str], source: str, confidence: float, step: t.Optional[int] = None, key: str = "") -> None:
+		fp = HunkFingerprint.of(current, incoming)
+		# Newest decision for the same content replaces the older one
+		self.hunks = [h for h in self.hunks if not (h.file == file_path and h.key == key and h.exact == fp.exact)]
+		self.hunks.append(RememberedHunk(
+			file=file_path,
+			key=key,
+			exact=fp.exact,
+			current_hash=fp.current_hash,
+			incoming_hash=fp.incoming_hash,
+			current=fp.current,
+			incoming=fp.incoming,
+			choice=choice,
+			text=text,
+			source=source,
+			confidence=confidence,
+			step=step,
+		))
+		self._bump("remembered")
+
+	@classmethod
+	def prune(cls, repo_path: str, keep: t.Optional[str] = None, max_age_s: float = 14 * 86400) -> int:
+		"""Drop memories of finished sequences older than max_age_s."""
+		root = cls.dir_for(repo_path)
+		if not os.path.isdir(root):
+			return 0
+		removed = 0
+		now = time.time()
+		for name in os.listdir(root):
+			path = os.path.join(root, name)
+			if keep and name == f"{keep}.json":
+				continue
+			try:
+				if now - os.path.getmtime(path) > max_age_s:
+					os.remove(path)
+					removed += 1
+			except OSError:
+				continue
+		return removed
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+import typing as t
+from dataclasses import dataclass, field
+
+_current: contextvars.ContextVar[t.Optional[int]] = contextvars.ContextVar("imr_span", default=None)
+
+
+@dataclass
+class Span:
+	name: str
+	id: int
+	parent: t.Optional[int]
+	start_us: float
+	tid: int
+	attrs: t.Dict[str, t.Any] = field(default_factory=dict)
+	dur_us: float = 0.0
+
+	def set(self, **attrs: t.Any) -> None:
+		self.attrs.update(attrs)
+
+	def to_dict(self) -> t.Dict[str, t.Any]:
+		return {
+			"name": self.name,
+			"id": self.id,
+			"parent": self.parent,
+			"start_us": round(self.start_us, 1),
+			"dur_us": round(self.dur_us, 1),
+			"tid": self.tid,
+			"attrs": self.attrs,
+		}
+
+
+class _NullSpan:
+	"""Returned while tracing is off: entering, exiting and set() cost a method call each."""
+
+	def set(self, **attrs: t.Any) -> None:
+		pass
+
+	def __enter__(self) -> "_NullSpan":
+		return self
+
+	def __exit__(self, *exc: t.Any) -> None:
+		pass
+
+
+_NULL = _NullSpan()
+
+
+class _SpanScope:
+	def __init__(self, tracer: "Tracer", name: str, attrs: t.Dict[str, t.Any]) -> None:
+		self.tracer = tracer
+		self.name = name
+		self.attrs = attrs
+		self.span: t.Optional[Span] = None
+		self.token: t.Optional[contextvars.Token] = None
+
+	def __enter__(self) -> Span:
+		tr = self.tracer
+		self.span = Span(self.name, next(tr._ids), _current.get(), (time.perf_counter() - tr._t0) * 1e6, threading.get_ident(), dict(self.attrs))
+		self.token = _current.set(self.span.id)
+		return self.span
+
+	def __exit__(self, exc_type: t.Any, exc: t.Any, tb: t.Any) -> None:
+		span = self.span
+		assert span is not None and self.token is not None
+		span.dur_us = (time.perf_counter() - self.tracer._t0) * 1e6 - span.start_us
+		if exc_type is not None:
+			span.attrs["error"] = exc_type.__name__
+		_current.reset(self.token)
+		with self.tracer._lock:
+			self.tracer.spans.append(span)
+
+
+class Tracer:
+	"""
+	In-process span recorder. Spans nest through a context variable, so async layers and
+	threads get the right parent. Export as JSONL (one span per line) or Chrome trace JSON.
+	"""
+
+	def __init__(self, enabled: bool = False) -> None:
+		self.enabled = enabled
+		self.spans: t.List[Span] = []
+		self._ids = itertools.count(1)
+		self._lock = threading.Lock()
+		self._t0 = time.perf_counter()
+		self.started_at = time.time()
+
+	def span(self, name: str, **attrs: t.Any) -> t.Any:
+		if not self.enabled:
+			return _NULL
+		return _SpanScope(self, name, attrs)
+
+	def export_jsonl(self, path: str) -> None:
+		os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+		with open(path, "w", encoding="utf-8") as f:
+			f.write(json.dumps({"trace_start": self.started_at, "pid": os.getpid()}) + "\n")
+			for s in sorted(self.spans, key=lambda s: s.start_us):
+				f.write(json.dumps(s.to_dict(), default=str) + "\n")
+
+	def export_chrome(self, path: str) -> None:
+		"""Chrome trace event format (complete events); open in chrome://tracing or Perfetto."""
+		pid = os.getpid()
+		events = [
+			{"name": s.name, "cat": s.name.split(".", 1)[0], "ph": "X", "ts": s.start_us, "dur": s.dur_us, "pid": pid, "tid": s.tid, "args": s.attrs}
+			for s in sorted(self.spans, key=lambda s: s.start_us)
+		]
+		os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+		with open(path, "w", encoding="utf-8") as f:
+			json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+	def save(self, repo_path: str) -> t.Optional[str]:
+		"""Write .imr/traces/<stamp>.jsonl and .trace.json; returns the JSONL path."""
+		if not self.spans:
+			return None
+		stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at)) + f"-{os.getpid()}"
+		base = os.path.join(repo_path, ".imr", "traces", stamp)
+		self.export_jsonl(base + ".jsonl")
+		self.export_chrome(base + ".trace.json")
+		return base + ".jsonl"
+
+
+_tracer = Tracer(enabled=os.getenv("IMR_TRACE", "") not in ("", "0", "false"))
+
+
+def get_tracer() -> Tracer:
+	return _tracer
+
+
+def enable_tracing() -> Tracer:
+	_tracer.enabled = True
+	return _tracer
+
+
+def span(name: str, **attrs: t.Any) -> t.Any:
+	"""`with span("layer.semantic", file=path) as s: ... s.set(confidence=0.9)`"""
+	return _tracer.span(name, **attrs)
+
+
+def load_spans(path: str) -> t.List[t.Dict[str, t.Any]]:
+	spans = []
+	with open(path, "r", encoding="utf-8") as f:
+		for line in f:
+			rec = json.loads(line)
+			if "name" in rec:
+				spans.append(rec)
+	return spans
+
+
+def latest_trace(repo_path: str) -> t.Optional[str]:
+	root = os.path.join(repo_path, ".imr", "traces")
+	if not os.path.isdir(root):
+		return None
+	runs = sorted(p for p in os.listdir(root) if p.endswith(".jsonl"))
+	return os.path.join(root, runs[-1]) if runs else None
+
+
+def summarize(spans: t.List[t.Dict[str, t.Any]], top: int = 15) -> t.Dict[str, t.Any]:
+	"""Slowest individual spans plus per-name totals; self time excludes child spans."""
+	child_time: t.Dict[int, float] = {}
+	for s in spans:
+		if s.get("parent") is not None:
+			child_time[s["parent"]] = child_time.get(s["parent"], 0.0) + s["dur_us"]
+	by_name: t.Dict[str, t.Dict[str, t.Any]] = {}
+	for s in spans:
+		agg = by_name.setdefault(s["name"], {"count": 0, "total_us": 0.0, "self_us": 0.0, "max_us": 0.0, "cache_hits": 0, "prompt_bytes": 0, "response_bytes": 0})
+		agg["count"] += 1
+		agg["total_us"] += s["dur_us"]
+		agg["self_us"] += max(0.0, s["dur_us"] - child_time.get(s["id"], 0.0))
+		agg["max_us"] = max(agg["max_us"], s["dur_us"])
+		attrs = s.get("attrs", {})
+		if attrs.get("cache_hit"):
+			agg["cache_hits"] += 1
+		agg["prompt_bytes"] += int(attrs.get("prompt_bytes", 0) or 0)
+		agg["response_bytes"] += int(attrs.get("response_bytes", 0) or 0)
+	roots = [s for s in spans if s.get("parent") is None]
+	return {
+		"spans": len(spans),
+		"wall_us": sum(s["dur_us"] for s in roots),
+		"slowest": sorted(spans, key=lambda s: s["dur_us"], reverse=True)[:top],
+		"by_name": dict(sorted(by_name.items(), key=lambda kv: kv[1]["self_us"], reverse=True)),
+	}
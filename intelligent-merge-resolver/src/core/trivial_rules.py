@@ -0,0 +1,106 @@
+from __future__ import annotations
+import re
+import typing as t
+from dataclasses import dataclass
+from .merge_detector import MergeConflict
+
+_IMPORT_LINE = re.compile(r"^\s*(import\s+[\w.]+(\s+as\s+\w+)?(\s*,\s*[\w.]+(\s+as\s+\w+)?)*|from\s+[\w.]+\s+import\s+[\w., ]+|import\s+.+\s+from\s+['\"][^'\"]+['\"];?|import\s+['\"][^'\"]+['\"];?)\s*$")
+_LIST_ITEM = re.compile(r"^\s*(['\"])[\w./@-]+\1,\s*$")
+_INDENT_SENSITIVE = (".py", ".yml", ".yaml", ".mk", "Makefile")
+
+
+@dataclass
+class TrivialResolution:
+	rule: str
+	text: str
+
+
+def _lines(text: str) -> t.List[str]:
+	return text.splitlines() if text else []
+
+
+def _identical(c: MergeConflict, _path: str) -> t.Optional[str]:
+	return c.current if c.current == c.incoming else None
+
+
+def _unchanged_side(c: MergeConflict, _path: str) -> t.Optional[str]:
+	# Needs the diff3 base: if one side kept the base, the other side's edit wins
+	if c.base is None:
+		return None
+	if c.current == c.base:
+		return c.incoming
+	if c.incoming == c.base:
+		return c.current
+	return None
+
+
+def _whitespace(c: MergeConflict, path: str) -> t.Optional[str]:
+	cur = [ln.rstrip() for ln in _lines(c.current) if ln.strip()]
+	inc = [ln.rstrip() for ln in _lines(c.incoming) if ln.strip()]
+	if cur == inc:
+		return c.current
+	if path.endswith(_INDENT_SENSITIVE):
+		return None
+	if [" ".join(ln.split()) for ln in cur] == [" ".join(ln.split()) for ln in inc]:
+		return c.current
+	return None
+
+
+def _is_subsequence(short: t.List[str], long: t.List[str]) -> bool:
+	it = iter(long)
+	return all(any(s == x for x in it) for s in short)
+
+
+def _subset(c: MergeConflict, _path: str) -> t.Optional[str]:
+	cur, inc = _lines(c.current), _lines(c.incoming)
+	# An empty side may be a deliberate deletion; leave that to the base-aware rule
+	if not cur or not inc:
+		return None
+	# With a diff3 base the shorter side may have deleted base lines on purpose; taking the
+	# longer side is only safe when the shorter one is the base itself
+	base = _lines(c.base) if c.base is not None else None
+	if len(cur) < len(inc) and _is_subsequence(cur, inc) and (base is None or base == cur):
+		return c.incoming
+	if len(inc) < len(cur) and _is_subsequence(inc, cur) and (base is None or base == inc):
+		return c.current
+	return None
+
+
+def _union(c: MergeConflict, _path: str) -> t.Optional[str]:
+	cur, inc = _lines(c.current), _lines(c.incoming)
+	items = [ln for ln in cur + inc if ln.strip()]
+	if not cur or not inc or not items:
+		return None
+	if not (all(_IMPORT_LINE.match(ln) for ln in items) or all(_LIST_ITEM.match(ln) for ln in items)):
+		return None
+	base = {ln.strip() for ln in _lines(c.base or "")}
+	cur_keys = {ln.strip() for ln in cur}
+	inc_keys = {ln.strip() for ln in inc}
+	out: t.List[str] = []
+	seen: t.Set[str] = set()
+	for ln in cur + inc:
+		key = ln.strip()
+		# An entry one side removed from the base stays removed
+		if not key or key in seen or (key in base and (key not in cur_keys or key not in inc_keys)):
+			continue
+		seen.add(key)
+		out.append(ln)
+	return "\n".join(out)
+
+
+RULES: t.List[t.Tuple[str, t.Callable[[MergeConflict, str], t.Optional[str]]]] = [
+	("identical", _identical),
+	("unchanged_side", _unchanged_side),
+	("whitespace", _whitespace),
+	("subset", _subset),
+	("unordered_union", _union),
+]
+
+
+def resolve_trivial(conflict: MergeConflict, file_path: str = "") -> t.Optional[TrivialResolution]:
+	"""Run the cheap local rules in order and return the first that resolves the hunk."""
+	for name, rule in RULES:
+		text = rule(conflict, file_path)
+		if text is not None:
+			return TrivialResolution(rule=name, text=text)
+	return None
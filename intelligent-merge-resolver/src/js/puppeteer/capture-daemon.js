@@ -0,0 +1,153 @@
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+
+const DEFAULT_VIEWPORTS = [{ width: 1280, height: 800, name: 'desktop' }, { width: 375, height: 812, name: 'mobile' }];
+
+class PagePool {
+	constructor(browser, size) {
+		this.browser = browser;
+		this.size = Math.max(1, size);
+		this.idle = [];
+		this.created = 0;
+		this.waiters = [];
+	}
+
+	async acquire() {
+		if (this.idle.length) return this.idle.pop();
+		if (this.created < this.size) {
+			this.created += 1;
+			try {
+				return await this.browser.newPage();
+			} catch (e) {
+				// Free the slot, and let a queued request try to open a page in it
+				this.created -= 1;
+				const next = this.waiters.shift();
+				if (next) next(this.acquire());
+				throw e;
+			}
+		}
+		return new Promise((resolve) => this.waiters.push(resolve));
+	}
+
+	release(page) {
+		const next = this.waiters.shift();
+		if (next) next(page); else this.idle.push(page);
+	}
+
+	async close() {
+		await Promise.all(this.idle.map((p) => p.close().catch(() => {})));
+		this.idle = [];
+		this.created = 0;
+	}
+}
+
+class CaptureSession {
+	constructor({ poolSize = 4, launchOptions = {} } = {}) {
+		this.poolSize = poolSize;
+		this.launchOptions = launchOptions;
+		this.browser = null;
+		this.pool = null;
+	}
+
+	async ensureBrowser() {
+		if (this.browser && this.browser.isConnected()) return;
+		const puppeteer = require('puppeteer');
+		this.browser = await puppeteer.launch({ headless: 'new', ...this.launchOptions });
+		this.pool = new PagePool(this.browser, this.poolSize);
+	}
+
+	async settle(page) {
+		// Wait for fonts and two animation frames instead of a fixed sleep
+		await page.evaluate(() => new Promise((resolve) => {
+			const done = () => requestAnimationFrame(() => requestAnimationFrame(() => resolve()));
+			if (document.fonts && document.fonts.ready) document.fonts.ready.then(done, done); else done();
+		}));
+	}
+
+	async captureOne({ baseUrl, route, vp, outDir }) {
+		const started = Date.now();
+		let page = null;
+		try {
+			page = await this.pool.acquire();
+			await page.setViewport({ width: vp.width, height: vp.height, deviceScaleFactor: 1 });
+			const url = baseUrl.replace(/\/$/, '') + route;
+			await page.goto(url, { waitUntil: 'networkidle2', timeout: 30000 });
+			const loaded = Date.now();
+			await this.settle(page);
+			const safeRoute = route.replace(/[^a-z0-9]/gi, '_');
+			const file = path.join(outDir, `${safeRoute}_${vp.name}.png`);
+			await page.screenshot({ path: file, fullPage: true });
+			return { route, viewport: vp.name, file, ms: Date.now() - started, load_ms: loaded - started };
+		} catch (e) {
+			return { route, viewport: vp.name, error: String(e && e.message || e), ms: Date.now() - started };
+		} finally {
+			if (page) this.pool.release(page);
+		}
+	}
+
+	async capture({ baseUrl = 'http://localhost:3000', routes = ['/'], outDir = 'screenshots', viewports = DEFAULT_VIEWPORTS }) {
+		const started = Date.now();
+		await this.ensureBrowser();
+		const launched = Date.now();
+		fs.mkdirSync(outDir, { recursive: true });
+		const tasks = [];
+		for (const route of routes) {
+			for (const vp of viewports) tasks.push(this.captureOne({ baseUrl, route, vp, outDir }));
+		}
+		const results = await Promise.all(tasks);
+		return { results, timings: { total_ms: Date.now() - started, browser_ms: launched - started, pool_size: this.poolSize } };
+	}
+
+	async close() {
+		if (this.pool) await this.pool.close();
+		if (this.browser) await this.browser.close().catch(() => {});
+		this.browser = null;
+		this.pool = null;
+	}
+}
+
+async function handle(session, msg) {
+	switch (msg.cmd) {
+		case 'ping':
+			return { ok: true, warm: Boolean(session.browser) };
+		case 'capture':
+			try {
+				require.resolve('puppeteer');
+			} catch (e) {
+				return { ok: false, error: 'puppeteer_not_installed' };
+			}
+			return { ok: true, ...(await session.capture(msg)) };
+		case 'shutdown':
+			await session.close();
+			return { ok: true };
+		default:
+			return { ok: false, error: `unknown_command: ${msg.cmd}` };
+	}
+}
+
+function serve({ poolSize } = {}) {
+	const session = new CaptureSession({ poolSize });
+	const rl = readline.createInterface({ input: process.stdin });
+	const write = (obj) => process.stdout.write(JSON.stringify(obj) + '\n');
+	rl.on('line', async (line) => {
+		if (!line.trim()) return;
+		let msg;
+		try { msg = JSON.parse(line); } catch (e) { return write({ ok: false, error: 'invalid_json' }); }
+		let res;
+		try { res = await handle(session, msg); } catch (e) { res = { ok: false, error: String(e && e.message || e) }; }
+		write({ id: msg.id, ...res });
+		if (msg.cmd === 'shutdown') process.exit(0);
+	});
+	rl.on('close', async () => {
+		await session.close();
+		process.exit(0);
+	});
+}
+
+if (require.main === module) {
+	const idx = process.argv.indexOf('--pool-size');
+	serve({ poolSize: idx >= 0 ? Number(process.argv[idx + 1]) : 4 });
+}
+
+module.exports = { CaptureSession, PagePool, serve, DEFAULT_VIEWPORTS };
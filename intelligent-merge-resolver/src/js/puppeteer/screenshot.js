@@ -1,41 +1,36 @@
-const fs = require('fs');
-const path = require('path');
+const { CaptureSession, DEFAULT_VIEWPORTS } = require('./capture-daemon');
 
-async function captureScreenshots({ projectPath = '.', baseUrl = 'http://localhost:3000', routes = ['/'], outDir = 'screenshots', viewports = [{ width: 1280, height: 800, name: 'desktop' }, { width: 375, height: 812, name: 'mobile' }] }) {
-	let puppeteer;
+async function captureScreenshots({ projectPath = '.', baseUrl = 'http://localhost:3000', routes = ['/'], outDir = 'screenshots', viewports = DEFAULT_VIEWPORTS, poolSize = 4 }) {
 	try {
-		puppeteer = require('puppeteer');
+		require.resolve('puppeteer');
 	} catch (e) {
 		return { error: 'puppeteer_not_installed' };
 	}
-	fs.mkdirSync(outDir, { recursive: true });
-	const browser = await puppeteer.launch({ headless: 'new' });
+	const session = new CaptureSession({ poolSize });
 	try {
-		const results = [];
-		for (const route of routes) {
-			for (const vp of viewports) {
-				const page = await browser.newPage();
-				await page.setViewport({ width: vp.width, height: vp.height, deviceScaleFactor: 1 });
-				const url = baseUrl.replace(/\/$/, '') + route;
-				await page.goto(url, { waitUntil: 'networkidle2', timeout: 30000 });
-				await page.waitForTimeout(500);
-				const safeRoute = route.replace(/[^a-z0-9]/gi, '_');
-				const file = path.join(outDir, `${safeRoute}_${vp.name}.png`);
-				await page.screenshot({ path: file, fullPage: true });
-				await page.close();
-				results.push({ route, viewport: vp.name, file });
-			}
-		}
-		return { results };
+		return await session.capture({ baseUrl, routes, outDir, viewports });
 	} finally {
-		await browser.close();
+		await session.close();
 	}
 }
 
+function readStdin() {
+	return new Promise((resolve) => {
+		if (process.stdin.isTTY) return resolve('');
+		let data = '';
+		process.stdin.on('data', (chunk) => { data += chunk; });
+		process.stdin.on('end', () => resolve(data));
+	});
+}
+
 if (require.main === module) {
 	(async () => {
 		try {
-			const args = JSON.parse(process.argv[2] || '{}');
+			const raw = process.argv[2] || (await readStdin()) || '{}';
+			const args = JSON.parse(raw);
+			// Accept the Python bridge's snake_case payload as well
+			if (args.output_dir && !args.outDir) args.outDir = args.output_dir;
+			if (args.base_url && !args.baseUrl) args.baseUrl = args.base_url;
 			const res = await captureScreenshots(args);
 			process.stdout.write(JSON.stringify(res));
 			process.exit(0);
@@ -46,4 +41,4 @@ if (require.main === module) {
 	})();
 }
 
-module.exports = { captureScreenshots };
\ No newline at end of file
+module.exports = { captureScreenshots };
@@ -1,6 +1,14 @@
 from __future__ import annotations
 import ast
 import typing as t
+from dataclasses import dataclass
+
+@dataclass
+class Segment:
+	key: str
+	kind: str
+	text: str
+	node: t.Optional[ast.stmt] = None
 
 class CodeAnalyzer:
 	def summarize(self, code: str) -> t.Dict[str, t.Any]:
@@ -14,4 +22,46 @@ class CodeAnalyzer:
 					result["classes"] += 1
 		except Exception:
 			result["error"] = "parse_failed"
-		return result
\ No newline at end of file
+		return result
+
+	def top_level_segments(self, code: str) -> t.Optional[t.List[Segment]]:
+		"""
+		Split a module into top-level segments that together reproduce the source exactly.
+		Comments and blank lines above a statement belong to that statement's segment.
+		Returns None when the code does not parse.
+		"""
+		try:
+			module = ast.parse(code)
+		except (SyntaxError, ValueError):
+			return None
+		lines = code.splitlines(keepends=True)
+		segments: t.List[Segment] = []
+		seen: t.Dict[str, int] = {}
+		start = 0
+		for node in module.body:
+			end = getattr(node, "end_lineno", None) or node.lineno
+			key, kind = self._segment_key(node, lines)
+			count = seen.get(key, 0)
+			seen[key] = count + 1
+			if count:
+				key = f"{key}#{count}"
+			segments.append(Segment(key=key, kind=kind, text="".join(lines[start:end]), node=node))
+			start = end
+		if start < len(lines):
+			segments.append(Segment(key="<tail>", kind="tail", text="".join(lines[start:])))
+		return segments
+
+	def _segment_key(self, node: ast.stmt, lines: t.List[str]) -> t.Tuple[str, str]:
+		if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+			return f"def:{node.name}", "function"
+		if isinstance(node, ast.ClassDef):
+			return f"class:{node.name}", "class"
+		if isinstance(node, (ast.Import, ast.ImportFrom)):
+			return "<imports>", "import"
+		if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+			return f"assign:{node.targets[0].id}", "assign"
+		if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+			return f"assign:{node.target.id}", "assign"
+		if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+			return "<docstring>", "docstring"
+		return f"stmt:{lines[node.lineno - 1].strip()}", "statement"
@@ -1,6 +1,10 @@
 from __future__ import annotations
 import os
+import json
+import atexit
+import hashlib
 import typing as t
+from concurrent.futures import ProcessPoolExecutor
 
 try:
 	import cv2
@@ -12,9 +16,105 @@ try:
 except Exception:  # pragma: no cover
 	pytesseract = None
 
+try:
+	import numpy as np
+except Exception:  # pragma: no cover
+	np = None  # type: ignore
+
+Box = t.Tuple[int, int, int, int]  # x, y, w, h in source pixels
+
+
+def _init_worker() -> None:
+	# Each worker already owns a core; keep Tesseract from spawning its own threads
+	os.environ['OMP_THREAD_LIMIT'] = '1'
+
+
+def _tiles(height: int, tile_height: int, overlap: int) -> t.List[t.Tuple[int, int]]:
+	if height <= tile_height:
+		return [(0, height)]
+	spans = []
+	y = 0
+	while y < height:
+		spans.append((y, min(height, y + tile_height)))
+		if y + tile_height >= height:
+			break
+		y += tile_height - overlap
+	return spans
+
+
+def _ocr_image(image_path: str, regions: t.Optional[t.List[Box]], max_width: int, tile_height: int, overlap: int) -> t.Dict[str, t.Any]:
+	"""Worker body: decode once, crop to regions, downscale, OCR tall crops strip by strip."""
+	img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+	if img is None:
+		return {"error": "image_load_failed"}
+	h, w = img.shape[:2]
+	crops = []
+	for (x, y, bw, bh) in (regions or [(0, 0, w, h)]):
+		x0, y0 = max(0, int(x)), max(0, int(y))
+		x1, y1 = min(w, int(x + bw)), min(h, int(y + bh))
+		if x1 > x0 and y1 > y0:
+			crops.append(((x0, y0, x1 - x0, y1 - y0), img[y0:y1, x0:x1]))
+	texts: t.List[str] = []
+	out_regions: t.List[t.Dict[str, t.Any]] = []
+	for box, crop in crops:
+		if crop.shape[1] > max_width:
+			scale = max_width / crop.shape[1]
+			crop = cv2.resize(crop, (max_width, max(1, int(crop.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+		parts = []
+		for y0, y1 in _tiles(crop.shape[0], tile_height, overlap):
+			strip = cv2.threshold(crop[y0:y1], 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+			part = pytesseract.image_to_string(strip).strip()
+			if part:
+				parts.append(part)
+		text = '\n'.join(parts)
+		out_regions.append({"box": list(box), "text": text})
+		if text:
+			texts.append(text)
+	return {"text": '\n'.join(texts), "confidence": None, "regions": out_regions}
+
+
+def _ocr_job(image_path: str, regions: t.Optional[t.List[Box]], max_width: int, tile_height: int, overlap: int) -> t.Dict[str, t.Any]:
+	try:
+		return _ocr_image(image_path, regions, max_width, tile_height, overlap)
+	except Exception as e:
+		return {"error": str(e)}
+
+
+def mask_to_regions(mask, pad: int = 8, min_area: int = 16) -> t.List[Box]:
+	"""Bounding boxes (padded) of the connected non-zero areas of a diff mask."""
+	if cv2 is None or np is None:
+		return []
+	binary = (np.asarray(mask) > 0).astype(np.uint8)
+	if pad:
+		binary = cv2.dilate(binary, np.ones((2 * pad + 1, 2 * pad + 1), np.uint8))
+	n, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+	boxes: t.List[Box] = []
+	for i in range(1, n):
+		x, y, w, h, area = (int(v) for v in stats[i])
+		if area >= min_area:
+			boxes.append((x, y, w, h))
+	return boxes
+
+
 class OCRAnalyzer:
-	def __init__(self) -> None:
+	"""
+	Tesseract OCR over screenshots. analyze_batch fans images out over a process pool,
+	restricts work to changed regions when a diff mask or boxes are given, and caches
+	results under .imr/ocr keyed by image content and OCR parameters. The least recently
+	used results are evicted once the cache exceeds max_bytes.
+	"""
+
+	def __init__(self, cache_dir: str = os.path.join('.imr', 'ocr'), max_workers: t.Optional[int] = None, max_width: int = 1600, tile_height: int = 1200, overlap: int = 40, max_bytes: int = 32 * 1024 * 1024) -> None:
 		self.available = cv2 is not None and pytesseract is not None
+		self.cache_dir = cache_dir
+		self.max_bytes = max_bytes
+		# Bytes under cache_dir, counted on the first write and corrected by every eviction scan
+		self._cache_bytes: t.Optional[int] = None
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self.max_width = max_width
+		self.tile_height = tile_height
+		self.overlap = overlap
+		self._pool: t.Optional[ProcessPoolExecutor] = None
 
 	def preprocess(self, image_path: str):
 		if not cv2:
@@ -26,12 +126,136 @@ class OCRAnalyzer:
 		th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
 		return th
 
-	def analyze(self, image_path: str) -> t.Dict[str, t.Any]:
+	def _cache_key(self, image_path: str, regions: t.Optional[t.List[Box]]) -> t.Optional[str]:
+		h = hashlib.sha1()
+		try:
+			with open(image_path, 'rb') as f:
+				for chunk in iter(lambda: f.read(1 << 16), b''):
+					h.update(chunk)
+		except OSError:
+			return None
+		params = [self.max_width, self.tile_height, self.overlap, sorted(list(r) for r in regions) if regions is not None else None]
+		h.update(json.dumps(params).encode('utf-8'))
+		return h.hexdigest()
+
+	def _cache_get(self, key: str) -> t.Optional[t.Dict[str, t.Any]]:
+		path = os.path.join(self.cache_dir, f'{key}.json')
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				result = json.load(f)
+			# mtime is the recency eviction goes by
+			os.utime(path)
+			return result
+		except Exception:
+			return None
+
+	def _cache_entries(self) -> t.List[t.Tuple[float, int, str]]:
+		entries = []
+		try:
+			names = os.listdir(self.cache_dir)
+		except OSError:
+			return []
+		for name in names:
+			if not name.endswith('.json'):
+				continue
+			path = os.path.join(self.cache_dir, name)
+			try:
+				st = os.stat(path)
+			except OSError:
+				continue
+			entries.append((st.st_mtime, st.st_size, path))
+		return entries
+
+	def _cache_put(self, key: str, result: t.Dict[str, t.Any]) -> None:
+		path = os.path.join(self.cache_dir, f'{key}.json')
+		try:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			if self._cache_bytes is None:
+				self._cache_bytes = sum(size for _m, size, _p in self._cache_entries())
+			with open(path, 'w', encoding='utf-8') as f:
+				json.dump(result, f)
+			self._cache_bytes += os.path.getsize(path)
+		except OSError:
+			return
+		if self._cache_bytes > self.max_bytes:
+			self.evict()
+
+	def evict(self) -> int:
+		"""Remove the least recently used results until the cache fits in max_bytes."""
+		entries = sorted(self._cache_entries())
+		total = sum(size for _m, size, _p in entries)
+		removed = 0
+		for _mtime, size, path in entries:
+			if total <= self.max_bytes:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				continue
+			total -= size
+			removed += 1
+		self._cache_bytes = total
+		return removed
+
+	def _executor(self) -> ProcessPoolExecutor:
+		if self._pool is None:
+			self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+			atexit.register(self.close)
+		return self._pool
+
+	def close(self) -> None:
+		if self._pool is not None:
+			self._pool.shutdown(wait=False, cancel_futures=True)
+			self._pool = None
+
+	def analyze(self, image_path: str, regions: t.Optional[t.List[Box]] = None) -> t.Dict[str, t.Any]:
+		return self.analyze_batch([image_path], {image_path: regions} if regions is not None else None)[image_path]
+
+	def analyze_batch(self, image_paths: t.Sequence[str], regions: t.Optional[t.Mapping[str, t.Any]] = None) -> t.Dict[str, t.Dict[str, t.Any]]:
+		"""
+		OCR several screenshots at once. `regions` maps a path to either a list of
+		(x, y, w, h) boxes or a diff mask array; an empty box list means nothing changed.
+		"""
 		if not self.available:
-			return {"error": "ocr_unavailable"}
-		img = self.preprocess(image_path)
-		if img is None:
-			return {"error": "image_load_failed"}
-		# pytesseract expects PIL or raw image; use temporary conversion via cv2 to file
-		text = pytesseract.image_to_string(img)
-		return {"text": text, "confidence": None}
\ No newline at end of file
+			return {p: {"error": "ocr_unavailable"} for p in image_paths}
+		results: t.Dict[str, t.Dict[str, t.Any]] = {}
+		pending: t.List[t.Tuple[str, t.Optional[t.List[Box]], t.Optional[str]]] = []
+		for p in dict.fromkeys(image_paths):
+			spec = (regions or {}).get(p)
+			boxes: t.Optional[t.List[Box]]
+			if spec is None:
+				boxes = None
+			elif np is not None and isinstance(spec, np.ndarray):
+				boxes = mask_to_regions(spec)
+			else:
+				boxes = [tuple(int(v) for v in b) for b in spec]  # type: ignore
+			if boxes is not None and not boxes:
+				results[p] = {"text": "", "confidence": None, "regions": []}
+				continue
+			key = self._cache_key(p, boxes)
+			if key is None:
+				results[p] = {"error": "image_load_failed"}
+				continue
+			cached = self._cache_get(key)
+			if cached is not None:
+				results[p] = cached
+				continue
+			pending.append((p, boxes, key))
+		if len(pending) == 1 or self.max_workers == 1:
+			outputs = [_ocr_job(p, boxes, self.max_width, self.tile_height, self.overlap) for p, boxes, _ in pending]
+		elif pending:
+			pool = self._executor()
+			futures = [pool.submit(_ocr_job, p, boxes, self.max_width, self.tile_height, self.overlap) for p, boxes, _ in pending]
+			outputs = []
+			for fut in futures:
+				try:
+					outputs.append(fut.result())
+				except Exception as e:  # worker died
+					outputs.append({"error": str(e)})
+		else:
+			outputs = []
+		for (p, _, key), res in zip(pending, outputs):
+			if 'error' not in res and key:
+				self._cache_put(key, res)
+			results[p] = res
+		return results
@@ -0,0 +1,138 @@
+from __future__ import annotations
+import os
+import json
+import time
+import typing as t
+
+try:
+	import cv2
+	import numpy as np
+except Exception:  # pragma: no cover
+	cv2 = None
+	np = None  # type: ignore
+
+HASH_KINDS = ('ahash', 'dhash', 'phash')
+
+
+def _gray(image):
+	if isinstance(image, str):
+		return cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+	img = np.asarray(image)
+	return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+
+def _pack(bits) -> int:
+	return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), 'big')
+
+
+def _dct_matrix(n: int):
+	k = np.arange(n)[:, None]
+	x = np.arange(n)[None, :]
+	m = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+	m[0] /= np.sqrt(2.0)
+	return m
+
+
+_DCT32 = None
+
+
+def ahash(gray) -> int:
+	small = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+	return _pack(small > small.mean())
+
+
+def dhash(gray) -> int:
+	small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+	return _pack(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray) -> int:
+	global _DCT32
+	if _DCT32 is None:
+		_DCT32 = _dct_matrix(32)
+	small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float64)
+	low = (_DCT32 @ small @ _DCT32.T)[:8, :8]
+	return _pack(low > np.median(low.ravel()[1:]))
+
+
+def image_hashes(image) -> t.Optional[t.Dict[str, int]]:
+	"""aHash, dHash and pHash (64-bit each) for an image path or array; None if unreadable."""
+	if cv2 is None or np is None:
+		return None
+	gray = _gray(image)
+	if gray is None or gray.size == 0:
+		return None
+	return {'ahash': ahash(gray), 'dhash': dhash(gray), 'phash': phash(gray)}
+
+
+def hamming(a: int, b: int) -> int:
+	return bin(a ^ b).count('1')
+
+
+def hash_distance(a: t.Mapping[str, int], b: t.Mapping[str, int], kinds: t.Sequence[str] = ('dhash', 'phash')) -> int:
+	"""Worst-case Hamming distance over the given hash kinds."""
+	return max(hamming(int(a[k]), int(b[k])) for k in kinds)
+
+
+def _popcount64(x):
+	if hasattr(np, 'bitwise_count'):
+		return np.bitwise_count(x)
+	return np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class HashIndex:
+	"""
+	Perceptual hashes of past captures in .imr/phash_index.json. Lookups XOR the query
+	against every stored hash at once, so finding the closest previous render stays cheap.
+	"""
+
+	def __init__(self, repo_path: str, max_entries: int = 5000) -> None:
+		self.path = os.path.join(os.path.abspath(repo_path), '.imr', 'phash_index.json')
+		self.max_entries = max_entries
+		self.entries: t.List[t.Dict[str, t.Any]] = []
+		try:
+			with open(self.path, 'r', encoding='utf-8') as f:
+				self.entries = json.load(f).get('entries', [])
+		except Exception:
+			self.entries = []
+		self._arrays: t.Optional[t.Dict[str, t.Any]] = None
+
+	def _columns(self) -> t.Dict[str, t.Any]:
+		if self._arrays is None:
+			self._arrays = {k: np.array([int(e[k], 16) for e in self.entries], dtype=np.uint64) for k in ('dhash', 'phash')}
+		return self._arrays
+
+	def add(self, hashes: t.Mapping[str, int], **meta: t.Any) -> t.Dict[str, t.Any]:
+		entry = {k: format(int(hashes[k]), '016x') for k in HASH_KINDS if k in hashes}
+		entry.update(meta)
+		entry['ts'] = time.time()
+		self.entries.append(entry)
+		if len(self.entries) > self.max_entries:
+			self.entries = self.entries[-self.max_entries:]
+		self._arrays = None
+		return entry
+
+	def nearest(self, hashes: t.Mapping[str, int], max_distance: int = 4, where: t.Optional[t.Callable[[t.Dict[str, t.Any]], bool]] = None) -> t.Optional[t.Tuple[int, t.Dict[str, t.Any]]]:
+		"""Closest stored entry (distance = max of dHash and pHash distances) within max_distance."""
+		if not self.entries or np is None:
+			return None
+		cols = self._columns()
+		dist = np.maximum(
+			_popcount64(cols['dhash'] ^ np.uint64(int(hashes['dhash']))),
+			_popcount64(cols['phash'] ^ np.uint64(int(hashes['phash']))),
+		)
+		# nearest first; among equal distances the most recent capture wins
+		for i in np.lexsort((-np.arange(len(dist)), dist)):
+			d = int(dist[i])
+			if d > max_distance:
+				break
+			if where is None or where(self.entries[i]):
+				return d, self.entries[i]
+		return None
+
+	def save(self) -> None:
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		tmp = self.path + '.tmp'
+		with open(tmp, 'w', encoding='utf-8') as f:
+			json.dump({'entries': self.entries}, f)
+		os.replace(tmp, self.path)
@@ -5,19 +5,158 @@ import typing as t
 try:
 	import cv2
 	import numpy as np
-	from skimage.metrics import structural_similarity as ssim  # type: ignore
 except Exception:  # pragma: no cover
 	cv2 = None
-	ssim = None
+	np = None  # type: ignore
 
-def compare_images(img_path_a: str, img_path_b: str) -> t.Dict[str, t.Any]:
-	if not cv2 or not ssim:
+from .perceptual_hash import image_hashes, hash_distance
+
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def _load_gray(path: str):
+	img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+	return None if img is None else img
+
+
+def normalize_pair(a, b, pad_value: int = 255):
+	"""Scale both images to the narrower width (keeping aspect), then pad the shorter one at the bottom."""
+	width = min(a.shape[1], b.shape[1])
+
+	def fit(img):
+		if img.shape[1] == width:
+			return img
+		h = max(1, round(img.shape[0] * width / img.shape[1]))
+		return cv2.resize(img, (width, h), interpolation=cv2.INTER_AREA)
+
+	a, b = fit(a), fit(b)
+	height = max(a.shape[0], b.shape[0])
+
+	def pad(img):
+		if img.shape[0] == height:
+			return img
+		return np.pad(img, ((0, height - img.shape[0]), (0, 0)), constant_values=pad_value)
+
+	return pad(a), pad(b)
+
+
+def _blocks(img, tile: int):
+	"""View an (H, W) image as (rows, cols, tile, tile) after padding to a tile multiple."""
+	h, w = img.shape
+	ph, pw = -h % tile, -w % tile
+	if ph or pw:
+		img = np.pad(img, ((0, ph), (0, pw)), mode='edge')
+	rows, cols = img.shape[0] // tile, img.shape[1] // tile
+	return img.reshape(rows, tile, cols, tile).swapaxes(1, 2)
+
+
+def _downscale(img):
+	h, w = img.shape[0] // 2 * 2, img.shape[1] // 2 * 2
+	img = img[:h, :w].astype(np.float32)
+	return (img[0::2, 0::2] + img[1::2, 0::2] + img[0::2, 1::2] + img[1::2, 1::2]) * 0.25
+
+
+def _box_mean(x, win: int):
+	"""Mean over win x win windows ('valid' positions) for a stack of tiles, via summed-area tables."""
+	s = np.cumsum(np.cumsum(x, axis=1), axis=2)
+	s = np.pad(s, ((0, 0), (1, 0), (1, 0)))
+	total = s[:, win:, win:] - s[:, :-win, win:] - s[:, win:, :-win] + s[:, :-win, :-win]
+	return total / float(win * win)
+
+
+def tile_ssim(a_tiles, b_tiles, win: int = 7):
+	"""Mean SSIM per tile for stacks of equal-shaped tiles, (k, T, T) -> (k,)."""
+	x = a_tiles.astype(np.float64)
+	y = b_tiles.astype(np.float64)
+	win = min(win, x.shape[1], x.shape[2])
+	mx, my = _box_mean(x, win), _box_mean(y, win)
+	vx = _box_mean(x * x, win) - mx * mx
+	vy = _box_mean(y * y, win) - my * my
+	cxy = _box_mean(x * y, win) - mx * my
+	num = (2 * mx * my + _C1) * (2 * cxy + _C2)
+	den = (mx * mx + my * my + _C1) * (vx + vy + _C2)
+	return (num / den).mean(axis=(1, 2))
+
+
+def _changed_boxes(changed, tile: int, shape: t.Tuple[int, int]) -> t.List[t.List[int]]:
+	n, _, stats, _ = cv2.connectedComponentsWithStats(changed.astype(np.uint8), connectivity=8)
+	h, w = shape
+	boxes = []
+	for i in range(1, n):
+		c, r, cw, ch = (int(v) for v in stats[i][:4])
+		x, y = c * tile, r * tile
+		boxes.append([x, y, min(w, (c + cw) * tile) - x, min(h, (r + ch) * tile) - y])
+	return boxes
+
+
+def compare_arrays(a, b, tile: int = 64, levels: int = 2, tile_threshold: float = 0.98) -> t.Dict[str, t.Any]:
+	"""
+	Tile-wise comparison of two grayscale arrays. Differing tiles are found on a downscaled
+	pyramid first (any coarse difference is a real difference); tiles that look identical at
+	the coarsest level are confirmed with an exact check, and SSIM runs only on tiles that differ.
+	"""
+	if a.shape != b.shape:
+		a, b = normalize_pair(a, b)
+	if np.array_equal(a, b):
+		return {"ssim": 1.0, "identical": True, "regions": [], "tiles_compared": 0, "size": [a.shape[1], a.shape[0]]}
+	levels = max(0, min(levels, int(np.log2(tile))))
+	shape = a.shape
+	ph, pw = -a.shape[0] % tile, -a.shape[1] % tile
+	if ph or pw:
+		a = np.pad(a, ((0, ph), (0, pw)), mode='edge')
+		b = np.pad(b, ((0, ph), (0, pw)), mode='edge')
+	ca, cb = a, b
+	for _ in range(levels):
+		ca, cb = _downscale(ca), _downscale(cb)
+	coarse_tile = tile >> levels
+	ba, bb = _blocks(a, tile), _blocks(b, tile)
+	rows, cols = ba.shape[:2]
+	coarse = np.abs(_blocks(np.asarray(ca, np.float32), coarse_tile) - _blocks(np.asarray(cb, np.float32), coarse_tile)).max(axis=(2, 3)) > 0
+	differs = coarse.copy()
+	unknown = np.argwhere(~coarse)
+	if len(unknown):
+		r, c = unknown[:, 0], unknown[:, 1]
+		differs[r, c] = np.any(ba[r, c] != bb[r, c], axis=(1, 2))
+	scores = np.ones((rows, cols), np.float64)
+	idx = np.argwhere(differs)
+	if len(idx):
+		r, c = idx[:, 0], idx[:, 1]
+		scores[r, c] = tile_ssim(ba[r, c], bb[r, c])
+	changed = scores < tile_threshold
+	return {
+		"ssim": float(scores.mean()),
+		"identical": False,
+		"regions": _changed_boxes(changed, tile, shape),
+		"tiles_compared": int(len(idx)),
+		"tiles_total": int(rows * cols),
+		"size": [shape[1], shape[0]],
+	}
+
+
+def compare_images(img_path_a: str, img_path_b: str, tile: int = 64, levels: int = 2, tile_threshold: float = 0.98, hash_threshold: t.Optional[int] = None) -> t.Dict[str, t.Any]:
+	"""
+	Compare two captures. With hash_threshold set, renders whose dHash and pHash are within
+	that many bits are reported as effectively identical without running SSIM.
+	"""
+	if not cv2 or np is None:
 		return {"error": "ssim_unavailable"}
-	imgA = cv2.imread(img_path_a)
-	imgB = cv2.imread(img_path_b)
+	imgA = _load_gray(img_path_a)
+	imgB = _load_gray(img_path_b)
 	if imgA is None or imgB is None:
 		return {"error": "load_failed"}
-	imgA = cv2.cvtColor(imgA, cv2.COLOR_BGR2GRAY)
-	imgB = cv2.cvtColor(imgB, cv2.COLOR_BGR2GRAY)
-	score, _ = ssim(imgA, imgB, full=True)
-	return {"ssim": float(score)}
\ No newline at end of file
+	if hash_threshold is not None:
+		distance = hash_distance(image_hashes(imgA), image_hashes(imgB))
+		if distance <= hash_threshold:
+			return {"ssim": 1.0 - distance / 64.0, "identical": True, "regions": [], "tiles_compared": 0, "hash_distance": distance, "size": [imgA.shape[1], imgA.shape[0]]}
+	return compare_arrays(imgA, imgB, tile=tile, levels=levels, tile_threshold=tile_threshold)
+
+
+def compare_renders(current: t.Mapping[str, str], incoming: t.Mapping[str, str], **kwargs: t.Any) -> t.Dict[str, t.Dict[str, t.Any]]:
+	"""Compare current vs incoming captures of the same viewport: {viewport: result}."""
+	out: t.Dict[str, t.Dict[str, t.Any]] = {}
+	for vp, path in current.items():
+		other = incoming.get(vp)
+		if other and os.path.isfile(path) and os.path.isfile(other):
+			out[vp] = compare_images(path, other, **kwargs)
+	return out
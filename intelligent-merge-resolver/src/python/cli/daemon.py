@@ -0,0 +1,353 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import tempfile
+import threading
+import subprocess
+import socketserver
+import typing as t
+
+# AF_UNIX paths are limited to ~104-108 bytes depending on the platform
+_MAX_SOCKET_PATH = 100
+
+
+def socket_path(repo_path: str) -> str:
+	"""`.imr/daemon.sock` in the repo, or a per-repo path in the temp dir when that is too long."""
+	repo = os.path.abspath(repo_path)
+	path = os.path.join(repo, ".imr", "daemon.sock")
+	if len(path) <= _MAX_SOCKET_PATH:
+		return path
+	digest = hashlib.sha1(repo.encode("utf-8")).hexdigest()[:12]
+	return os.path.join(tempfile.gettempdir(), f"imr-{digest}.sock")
+
+
+class DaemonClient:
+	"""
+	One JSON line per request and per response over the daemon's Unix socket, one request per
+	connection. `request` returns None when no daemon is listening so callers fall back to
+	in-process work.
+	"""
+
+	def __init__(self, repo_path: str = ".", connect_timeout: float = 0.5) -> None:
+		self.path = socket_path(repo_path)
+		self.connect_timeout = connect_timeout
+
+	def request(self, cmd: str, timeout: t.Optional[float] = None, **payload: t.Any) -> t.Optional[t.Dict[str, t.Any]]:
+		if not hasattr(socket, "AF_UNIX") or not os.path.exists(self.path):
+			return None
+		sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			sock.settimeout(self.connect_timeout)
+			try:
+				sock.connect(self.path)
+			except OSError:
+				return None
+			# Resolution can run the full reasoning chain; wait as long as it takes unless told otherwise
+			sock.settimeout(timeout)
+			sock.sendall((json.dumps({"cmd": cmd, **payload}) + "\n").encode("utf-8"))
+			buf = b""
+			while not buf.endswith(b"\n"):
+				chunk = sock.recv(65536)
+				if not chunk:
+					break
+				buf += chunk
+		except OSError as e:
+			return {"ok": False, "error": f"daemon_io: {e}"}
+		finally:
+			sock.close()
+		if not buf:
+			return {"ok": False, "error": "daemon_died"}
+		try:
+			return json.loads(buf)
+		except Exception:
+			return {"ok": False, "error": "invalid_response"}
+
+	def running(self) -> bool:
+		resp = self.request("ping", timeout=2.0)
+		return bool(resp and resp.get("ok"))
+
+
+class RepoWatcher(threading.Thread):
+	"""
+	Polls file mtimes (no inotify dependency) and reports changed and removed paths.
+	`.git/index` and `.git/HEAD` are checked every poll; the full tree is re-walked every
+	`rescan_every` polls to pick up new files.
+	"""
+
+	def __init__(self, repo_path: str, scan: t.Callable[[], t.List[str]], on_change: t.Callable[[t.List[str], t.List[str], bool], None], interval: float = 1.0, rescan_every: int = 30) -> None:
+		super().__init__(daemon=True, name="imr-watcher")
+		self.repo_path = repo_path
+		self.scan = scan
+		self.on_change = on_change
+		self.interval = interval
+		self.rescan_every = rescan_every
+		self._stop_event = threading.Event()
+		self._mtimes: t.Dict[str, float] = {}
+		self._git_state: t.Tuple[float, ...] = ()
+		self.polls = 0
+
+	def _stat_all(self, paths: t.Iterable[str]) -> t.Dict[str, float]:
+		out: t.Dict[str, float] = {}
+		for p in paths:
+			try:
+				out[p] = os.stat(p).st_mtime
+			except OSError:
+				continue
+		return out
+
+	def _git_mtimes(self) -> t.Tuple[float, ...]:
+		vals = []
+		for name in ("index", "HEAD", "MERGE_HEAD"):
+			try:
+				vals.append(os.stat(os.path.join(self.repo_path, ".git", name)).st_mtime)
+			except OSError:
+				vals.append(0.0)
+		return tuple(vals)
+
+	def prime(self) -> None:
+		self._mtimes = self._stat_all(self.scan())
+		self._git_state = self._git_mtimes()
+
+	def poll(self) -> None:
+		self.polls += 1
+		paths = self.scan() if self.polls % self.rescan_every == 0 else list(self._mtimes)
+		current = self._stat_all(paths)
+		changed = [p for p, m in current.items() if self._mtimes.get(p) != m]
+		removed = [p for p in self._mtimes if p not in current]
+		git_state = self._git_mtimes()
+		git_changed = git_state != self._git_state
+		self._mtimes = current
+		self._git_state = git_state
+		if changed or removed or git_changed:
+			self.on_change(changed, removed, git_changed)
+
+	def run(self) -> None:
+		while not self._stop_event.wait(self.interval):
+			try:
+				self.poll()
+			except Exception:
+				continue
+
+	def stop(self) -> None:
+		self._stop_event.set()
+
+
+class ResolverDaemon:
+	"""
+	Keeps the reasoning engine (and with it the Gemini client, OCR pool and screenshot caches),
+	the fast-path model and the repo's context index in memory, and serves `analyze`, `resolve`,
+	`hook`, `context`, `status` and `shutdown` over a Unix socket. Only `context` reads the
+	index, so it is built on the first such request rather than at warm-up. Commands that touch the
+	worktree run one at a time; their console output is captured and sent back for the CLI
+	to print.
+	"""
+
+	def __init__(self, repo_path: str = ".", idle_timeout: float = 1800.0, poll_interval: float = 1.0) -> None:
+		self.repo_path = os.path.abspath(repo_path)
+		self.path = socket_path(self.repo_path)
+		self.idle_timeout = idle_timeout
+		self.poll_interval = poll_interval
+		self.started_at = time.time()
+		self.last_request = time.time()
+		self.requests: t.Dict[str, int] = {}
+		self.changes = 0
+		self._work_lock = threading.Lock()
+		self._state_lock = threading.Lock()
+		self.server: t.Optional[socketserver.ThreadingUnixStreamServer] = None
+		self.watcher: t.Optional[RepoWatcher] = None
+		self.context_manager: t.Any = None
+		self.context_indexed = False
+		self.model: t.Any = None
+
+	def warm(self) -> t.Dict[str, float]:
+		"""Build everything a request would otherwise build; returns seconds spent per part."""
+		from . import main as cli_main
+		from ..context.codebase_manager import CodebaseContextManager
+		from ..integrations.gemini_client import get_gemini_client
+		from src.core.learned_resolver import LearnedResolver
+		timings: t.Dict[str, float] = {}
+		t0 = time.perf_counter()
+		cli_main._reasoning_engine()
+		timings["engine_s"] = time.perf_counter() - t0
+		t0 = time.perf_counter()
+		get_gemini_client()._resolve()
+		timings["model_client_s"] = time.perf_counter() - t0
+		# Cheap: the shard layout is read (or detected) when the watcher first scans
+		self.context_manager = CodebaseContextManager(self.repo_path)
+		t0 = time.perf_counter()
+		self.model = LearnedResolver.load(self.repo_path)
+		timings["fast_path_model_s"] = time.perf_counter() - t0
+		return {k: round(v, 4) for k, v in timings.items()}
+
+	def _on_change(self, changed: t.List[str], removed: t.List[str], git_changed: bool) -> None:
+		from ..context.shard_index import MANIFESTS
+		with self._state_lock:
+			self.changes += len(changed) + len(removed) + int(git_changed)
+			if self.context_manager is None:
+				return
+			if self.context_indexed:
+				self.context_manager.refresh(changed, removed)
+			elif any(os.path.basename(p) in MANIFESTS for p in changed + removed):
+				# Keep the watched layout current; documents are indexed on the first `context` request
+				self.context_manager.vector_db.detect_layout()
+
+	def _captured(self, fn: t.Callable[[], None]) -> t.Dict[str, t.Any]:
+		from . import main as cli_main
+		with self._work_lock:
+			with cli_main.console.capture() as cap:
+				fn()
+		return {"ok": True, "output": cap.get()}
+
+	def handle(self, req: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+		from . import main as cli_main
+		from src.core.learned_resolver import LearnedResolver
+		cmd = req.get("cmd")
+		self.last_request = time.time()
+		self.requests[str(cmd)] = self.requests.get(str(cmd), 0) + 1
+		if cmd == "ping":
+			return {"ok": True, "pid": os.getpid()}
+		if cmd == "status":
+			return {"ok": True, **self.status()}
+		if cmd == "shutdown":
+			threading.Thread(target=self.shutdown, daemon=True).start()
+			return {"ok": True}
+		gi = cli_main.GitIntegration(self.repo_path)
+		if cmd == "analyze":
+			return self._captured(lambda: cli_main._run_analyze(gi, req.get("file_path")))
+		if cmd == "resolve":
+			threshold = float(req.get("confidence_threshold", 0.85))
+			if self.model is not None and self.model.threshold != threshold:
+				# The fast path's precision stats only hold for the threshold they were scored at
+				self.model = LearnedResolver.load(self.repo_path, threshold)
+			elif self.model is not None:
+				# Decisions logged since the last request (by any process) train the warm model
+				if self.model.sync(LearnedResolver.history_path(self.repo_path)):
+					self.model.save(self.repo_path)
+			return self._captured(lambda: cli_main._run_resolve(
+				gi,
+				cli_main.LearningManager(self.repo_path),
+				bool(req.get("auto")),
+				threshold,
+				str(req.get("choice", "current")),
+				bool(req.get("fast_path", True)),
+				model=self.model,
+				sequence=bool(req.get("sequence", True)),
+				max_calls=req.get("max_calls"),
+				max_tokens=req.get("max_tokens"),
+				max_seconds=req.get("max_seconds"),
+				over_budget=req.get("over_budget", "manual"),
+				choice_explicit=bool(req.get("choice_explicit")),
+			))
+		if cmd == "hook":
+			from .hooks import run_hook
+			with self._work_lock:
+				report = run_hook(gi, str(req.get("hook")), float(req.get("budget_ms", 1500.0)))
+			return {"ok": True, "report": report}
+		if cmd == "context":
+			import asyncio
+			file_path = os.path.abspath(str(req.get("file_path", "")))
+			with self._state_lock:
+				if not self.context_indexed:
+					self.context_manager.index_repo()
+					self.context_indexed = True
+				ctx = asyncio.run(self.context_manager.get_relevant_context(file_path, int(req.get("max_size", 50000))))
+			return {"ok": True, **ctx}
+		return {"ok": False, "error": f"unknown_command: {cmd}"}
+
+	def status(self) -> t.Dict[str, t.Any]:
+		cm = self.context_manager
+		return {
+			"pid": os.getpid(),
+			"repo": self.repo_path,
+			"socket": self.path,
+			"uptime_s": round(time.time() - self.started_at, 1),
+			"idle_s": round(time.time() - self.last_request, 1),
+			"requests": dict(self.requests),
+			"context_indexed": self.context_indexed,
+			"indexed_files": len(cm.vector_db) if cm is not None else 0,
+			"context_cache": cm.cached_context.cache_info()._asdict() if cm is not None else {},
+			"changes_seen": self.changes,
+			"watch_polls": self.watcher.polls if self.watcher else 0,
+		}
+
+	def _make_server(self) -> socketserver.ThreadingUnixStreamServer:
+		daemon = self
+
+		class Handler(socketserver.StreamRequestHandler):
+			def handle(self) -> None:
+				line = self.rfile.readline()
+				if not line:
+					return
+				try:
+					resp = daemon.handle(json.loads(line))
+				except Exception as e:
+					resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+				self.wfile.write((json.dumps(resp, default=str) + "\n").encode("utf-8"))
+
+		if os.path.exists(self.path):
+			if DaemonClient(self.repo_path).running():
+				raise RuntimeError(f"a daemon is already serving {self.repo_path} on {self.path}")
+			os.unlink(self.path)
+		os.makedirs(os.path.dirname(self.path), exist_ok=True)
+		server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+		server.daemon_threads = True
+		os.chmod(self.path, 0o600)
+		return server
+
+	def serve(self) -> None:
+		# CLI code paths use the repo-relative '.' throughout
+		os.chdir(self.repo_path)
+		self.server = self._make_server()
+		# Watch what the shards own, so every package of a monorepo is covered (no flat file cap)
+		self.watcher = RepoWatcher(self.repo_path, self.context_manager.vector_db.owned_files if self.context_manager else (lambda: []), self._on_change, self.poll_interval)
+		self.watcher.prime()
+		self.watcher.start()
+		threading.Thread(target=self._idle_reaper, daemon=True).start()
+		try:
+			self.server.serve_forever(poll_interval=0.2)
+		finally:
+			self.watcher.stop()
+			self.server.server_close()
+			try:
+				os.unlink(self.path)
+			except OSError:
+				pass
+
+	def _idle_reaper(self) -> None:
+		while self.server is not None:
+			time.sleep(min(30.0, max(1.0, self.idle_timeout / 10)))
+			if self.idle_timeout > 0 and time.time() - self.last_request > self.idle_timeout:
+				self.shutdown()
+				return
+
+	def shutdown(self) -> None:
+		if self.server is not None:
+			self.server.shutdown()
+
+
+def spawn_daemon(repo_path: str, idle_timeout: float, wait: float = 30.0) -> t.Optional[int]:
+	"""Start `imr daemon run` detached from this terminal and wait until it answers."""
+	log = os.path.join(os.path.abspath(repo_path), ".imr", "daemon.log")
+	os.makedirs(os.path.dirname(log), exist_ok=True)
+	with open(log, "ab") as out:
+		proc = subprocess.Popen(
+			[sys.executable, "-m", __package__ + ".main", "daemon", "run", "--idle-timeout", str(idle_timeout)],
+			cwd=repo_path,
+			stdin=subprocess.DEVNULL,
+			stdout=out,
+			stderr=subprocess.STDOUT,
+			start_new_session=True,
+		)
+	client = DaemonClient(repo_path)
+	deadline = time.time() + wait
+	while time.time() < deadline:
+		if proc.poll() is not None:
+			return None
+		if client.running():
+			return proc.pid
+		time.sleep(0.1)
+	return None
@@ -0,0 +1,143 @@
+from __future__ import annotations
+import os
+import time
+import subprocess
+import typing as t
+
+from ..integrations.git_integration import GitIntegration
+from src.core.conflict_analyzer import ConflictAnalyzer
+from src.core.merge_detector import extract_conflicts
+from src.core.resolution import apply_hunk_resolutions
+from src.core.local_tiers import resolve_hunks_locally
+from src.core.learned_resolver import LearnedResolver
+from src.core.backup import BackupManager, DecisionLogger, PendingHunks
+from src.core.tracing import span
+
+HOOKS = ("pre-merge-commit", "post-merge")
+DEFAULT_BUDGET_MS = 1500.0
+# (ours, theirs) for GitIntegration.merge_sides: MERGE_HEAD before the merge commit exists, its parents after
+_SIDES = {"pre-merge-commit": ("HEAD", "MERGE_HEAD"), "post-merge": ("HEAD^1", "HEAD^2")}
+_MAX_FILE_BYTES = 2 * 1024 * 1024
+
+
+def load_budget_ms(repo_path: str = ".") -> float:
+	"""`hooks.budget_ms` from .merge-resolver.yaml, else DEFAULT_BUDGET_MS."""
+	cfg_path = os.path.join(repo_path, '.merge-resolver.yaml')
+	if os.path.isfile(cfg_path):
+		try:
+			import yaml  # type: ignore
+			with open(cfg_path, 'r', encoding='utf-8') as f:
+				cfg = yaml.safe_load(f) or {}
+				return float(cfg.get('hooks', {}).get('budget_ms', DEFAULT_BUDGET_MS))
+		except Exception:
+			return DEFAULT_BUDGET_MS
+	return DEFAULT_BUDGET_MS
+
+
+def has_markers(path: str) -> bool:
+	try:
+		if os.path.getsize(path) > _MAX_FILE_BYTES:
+			return False
+		with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+			return any(line.startswith("<<<<<<< ") for line in f)
+	except OSError:
+		return False
+
+
+def _merge_files(gi: GitIntegration, hook: str) -> t.List[str]:
+	"""
+	Files the merge brought in. Git runs neither hook while a merge is stopped on conflicts,
+	so besides unmerged paths the hooks look for markers that made it into these files.
+	"""
+	if hook == "pre-merge-commit":
+		args = ["diff", "--cached", "--name-only", "--diff-filter=AM"]
+	else:
+		args = ["diff", "--name-only", "--diff-filter=AM", "ORIG_HEAD", "HEAD"]
+	cp = subprocess.run(["git", *args], cwd=gi.repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+	return [p for p in cp.stdout.splitlines() if p] if cp.returncode == 0 else []
+
+
+def run_hook(gi: GitIntegration, hook: str, budget_ms: float) -> t.Dict[str, t.Any]:
+	"""
+	Detect conflicts and resolve what the local tiers can (structural merges, trivial rules,
+	learned fast path) until the wall-clock budget runs out; the budget is checked per hunk.
+	Once git has recorded the merge the index stages are gone, so structural merges of such
+	files read base, ours and theirs from the merge's commits. Never calls the reasoning chain
+	or the network. Fully resolved files are rewritten (and staged for pre-merge-commit);
+	everything else is recorded in PendingHunks for `imr resolve --auto`.
+	"""
+	from .main import _structural_merge
+	t0 = time.perf_counter()
+	deadline = t0 + budget_ms / 1000.0
+	report: t.Dict[str, t.Any] = {"hook": hook, "budget_ms": budget_ms, "files": 0, "resolved_files": [], "hunks": 0, "resolved_hunks": 0, "pending": {}, "over_budget": False}
+	with span("hook.detect"):
+		targets = [c.file_path for c in gi.detect_conflicts()]
+		unmerged = set(targets)
+		for p in _merge_files(gi, hook):
+			if p not in targets and has_markers(os.path.join(gi.repo_path, p)):
+				targets.append(p)
+	report["files"] = len(targets)
+	if targets:
+		analyzer = ConflictAnalyzer()
+		bm = BackupManager(gi.repo_path)
+		dl = DecisionLogger(gi.repo_path)
+		with span("model.load"):
+			model = LearnedResolver.load(gi.repo_path)
+		with span("hook.sides"):
+			revs = gi.merge_sides(*_SIDES[hook])
+		pending: t.Dict[str, t.Dict[str, t.Any]] = report["pending"]
+		for rel in targets:
+			if time.perf_counter() >= deadline:
+				report["over_budget"] = True
+				pending[rel] = {"hunks": None, "reason": "budget", "hook": hook}
+				continue
+			with span("hook.file", file=rel):
+				# Unmerged paths still have their index stages; the rest read the merge's commits
+				_resolve_locally(gi, rel, analyzer, bm, dl, model, _structural_merge, hook, report, None if rel in unmerged else revs, deadline)
+		if hook == "pre-merge-commit" and report["resolved_files"]:
+			subprocess.run(["git", "add", "--", *report["resolved_files"]], cwd=gi.repo_path, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		store = PendingHunks(gi.repo_path)
+		store.clear(report["resolved_files"])
+		store.record(pending)
+	report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+	return report
+
+
+def _resolve_locally(gi: GitIntegration, rel: str, analyzer: ConflictAnalyzer, bm: BackupManager, dl: DecisionLogger, model: LearnedResolver, structural_merge: t.Callable[..., t.Any], hook: str, report: t.Dict[str, t.Any], revs: t.Optional[t.Dict[int, str]], deadline: float) -> None:
+	path = os.path.join(gi.repo_path, rel)
+	conflict_type = analyzer._classify_type(rel)
+	if conflict_type == 'lockfile':
+		# Lockfiles are regenerated, not merged, inside a hook
+		report["pending"][rel] = {"hunks": None, "reason": "lockfile", "hook": hook}
+		return
+	try:
+		with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+			text = f.read()
+	except OSError:
+		return
+	hunks = extract_conflicts(text)
+	report["hunks"] += len(hunks)
+	merged = None
+	if time.perf_counter() < deadline:
+		merged = structural_merge(gi, rel, conflict_type, revs)
+	if merged is not None and not merged.conflicts:
+		resolved, rec = merged.render({}), {"choice": "structural", "structural": merged.format, "auto_merged": len(merged.auto_merged)}
+		report["resolved_hunks"] += len(hunks)
+	else:
+		_features, local = resolve_hunks_locally(rel, hunks, conflict_type, model, deadline=deadline)
+		done = sum(1 for d in local if d)
+		report["resolved_hunks"] += done
+		if done < len(hunks) or not hunks:
+			out_of_time = time.perf_counter() >= deadline
+			report["over_budget"] = report["over_budget"] or out_of_time
+			report["pending"][rel] = {"hunks": [i for i, d in enumerate(local) if not d], "reason": "budget" if out_of_time else "needs_reasoning", "hook": hook}
+			return
+		rules: t.Dict[str, int] = {}
+		for d in local:
+			rules[d.source] = rules.get(d.source, 0) + 1  # type: ignore[union-attr]
+		resolved, rec = apply_hunk_resolutions(text, [d.text for d in local], choice="keep"), {"choice": "local", "local_hunks": rules}  # type: ignore[union-attr]
+	bm.backup_file(path)
+	with open(path, 'w', encoding='utf-8') as f:
+		f.write(resolved)
+	dl.log({"file": rel, "auto": True, "confidence": 1.0, "hook": hook, **rec})
+	report["resolved_files"].append(rel)
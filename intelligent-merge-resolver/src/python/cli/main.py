@@ -2,27 +2,25 @@ from __future__ import annotations
 import os
 import sys
 import json
-import asyncio
+import typing as t
+from dataclasses import dataclass, field
 import click
+from click.core import ParameterSource
 from rich.console import Console
 from rich.table import Table
 
-try:
-	from ..integrations.js_bridge import JavaScriptBridge
-except Exception:  # pragma: no cover
-	JavaScriptBridge = None  # type: ignore
-
-from ..integrations.git_integration import GitIntegration
-from ..core.conflict_analyzer import ConflictAnalyzer
-from ..core.decision_engine import MergeReasoningEngine
-from ..reasoning.contextual_reasoning import ContextualReasoning
-from ..reasoning.semantic_reasoning import SemanticReasoning
-from ..reasoning.visual_reasoning import VisualReasoning
-from ..reasoning.impact_reasoning import ImpactReasoning
-from ..reasoning.consistency_reasoning import ConsistencyReasoning
-from ..reasoning.meta_reasoning import MetaReasoning
-from ..core.resolution import resolve_conflicts_in_text
-from ..core.backup import BackupManager, DecisionLogger
+from ..integrations.git_integration import GitIntegration, Conflict
+from src.core.conflict_analyzer import ConflictAnalyzer
+from src.core.resolution import resolve_conflicts_in_text, apply_hunk_resolutions
+from src.core.merge_detector import extract_conflicts
+from src.core.learned_resolver import LearnedResolver
+from src.core.local_tiers import resolve_hunks_locally, HunkDecision
+from src.core.backup import BackupManager, DecisionLogger, PendingHunks
+from src.core.sequence_memory import SequenceMemory
+from src.core.prompt_window import conflict_payload, DEFAULT_CONTEXT_LINES, DEFAULT_MAX_HUNK_LINES
+from src.core.tracing import span, enable_tracing, get_tracer, latest_trace, load_spans, summarize
+from ..integrations.cassette import use_cassette, active_cassette
+from .hooks import HOOKS, run_hook, load_budget_ms, has_markers
 
 console = Console()
 
@@ -34,14 +32,133 @@ class LearningManager:
 		with open(self.path, 'a', encoding='utf-8') as f:
 			f.write(json.dumps(decision) + '\n')
 
+def _choice_from_result(result, fallback: str, allow_both: bool = False) -> str:
+	"""Map an engine decision to a hunk choice; 'merge_both' only applies where hunks can be concatenated."""
+	if result is None:
+		return fallback
+	if result.decision == 'merge_both':
+		return 'both' if allow_both else fallback
+	return 'current' if result.decision == 'keep_current' else ('incoming' if result.decision == 'keep_incoming' else fallback)
+
+# Layers in the chain _reasoning_engine builds; the cost model plans with it without loading them
+_CHAIN_LENGTH = 6
+
+# The reasoning layers pull in cv2, numpy and the Gemini SDK; import them only when a
+# command actually reaches the reasoning chain so `status`, `analyze` and hooks start fast.
+_engine: t.Any = None
+
+def _reasoning_engine():
+	global _engine
+	if _engine is None:
+		from src.core.decision_engine import MergeReasoningEngine
+		from ..reasoning.contextual_reasoning import ContextualReasoning
+		from ..reasoning.semantic_reasoning import SemanticReasoning
+		from ..reasoning.visual_reasoning import VisualReasoning
+		from ..reasoning.impact_reasoning import ImpactReasoning
+		from ..reasoning.consistency_reasoning import ConsistencyReasoning
+		from ..reasoning.meta_reasoning import MetaReasoning
+		layers = [ContextualReasoning(), SemanticReasoning(), VisualReasoning(), ImpactReasoning(), ConsistencyReasoning(), MetaReasoning()]
+		_engine = MergeReasoningEngine(layers, stats_path=os.path.join('.imr', 'layer_stats.json'))
+	return _engine
+
+def _reason(conflict_data: dict, threshold: float, budget: t.Any = None):
+	import asyncio
+	engine = _reasoning_engine()
+	async def _run():
+		return await engine.reason_through_merge(conflict_data, threshold=threshold, budget=budget)
+	return asyncio.run(_run())
+
+def _prompt_options() -> t.Dict[str, int]:
+	"""`prompts.context_lines` / `prompts.max_hunk_lines` from .merge-resolver.yaml."""
+	opts = {"context_lines": DEFAULT_CONTEXT_LINES, "max_hunk_lines": DEFAULT_MAX_HUNK_LINES}
+	if os.path.isfile('.merge-resolver.yaml'):
+		try:
+			import yaml  # type: ignore
+			with open('.merge-resolver.yaml', 'r', encoding='utf-8') as f:
+				section = (yaml.safe_load(f) or {}).get('prompts', {}) or {}
+			opts.update({k: int(section[k]) for k in opts if k in section})
+		except Exception:
+			pass
+	return opts
+
+def _structural_merge(gi: GitIntegration, path: str, conflict_type: str, revs: t.Optional[t.Dict[int, str]] = None):
+	"""Three-way merge of Python or config files from the index stages, or from the commits in `revs` (GitIntegration.merge_sides)."""
+	is_python = path.endswith('.py')
+	if conflict_type != 'config' and not is_python:
+		return None
+	read = (lambda stage: gi.read_rev(revs[stage], path)) if revs else (lambda stage: gi.read_stage(path, stage))
+	current_text = read(2)
+	incoming_text = read(3)
+	if current_text is None or incoming_text is None:
+		return None
+	if is_python:
+		from src.core.python_merge import merge_python_text
+		return merge_python_text(read(1), current_text, incoming_text)
+	from src.core.config_merge import merge_config_text
+	return merge_config_text(path, read(1), current_text, incoming_text)
+
+def _save_trace() -> None:
+	path = get_tracer().save('.')
+	if path:
+		console.print(f"[dim]Trace written to {path} (Chrome trace: {path[:-len('.jsonl')]}.trace.json)[/dim]")
+
+def _via_daemon(ctx, cmd: str, **payload: t.Any) -> bool:
+	"""
+	Hand the command to a running `imr daemon` for this repo. Returns False (run in-process)
+	when none is listening, or when tracing or a cassette is active, since both are per process.
+	"""
+	if ctx.obj.get('no_daemon') or get_tracer().enabled or active_cassette() is not None:
+		return False
+	from .daemon import DaemonClient
+	resp = DaemonClient('.').request(cmd, **payload)
+	if resp is None:
+		return False
+	if not resp.get('ok'):
+		console.print(f"[yellow]daemon: {resp.get('error')}; running in-process[/yellow]")
+		return False
+	sys.stdout.write(resp.get('output', ''))
+	sys.stdout.flush()
+	return True
+
+def _report_cassette() -> None:
+	cassette = active_cassette()
+	if cassette is not None:
+		st = cassette.stats()
+		console.print(f"[dim]Cassette {st['path']} ({st['mode']}): {st['hits']} replayed, {st['misses']} missed, {st['recorded']} recorded[/dim]")
+
+def _replay_latency(ctx, param, value: str) -> t.Union[str, float]:
+	if value == 'recorded':
+		return value
+	try:
+		ms = float(value)
+	except ValueError:
+		ms = -1.0
+	if not ms >= 0:
+		raise click.BadParameter("'recorded' or a number of milliseconds", ctx=ctx, param=param)
+	return ms
+
 @click.group()
 @click.version_option(version="0.1.0")
+@click.option('--trace', is_flag=True, envvar='IMR_TRACE', help='Record timing spans under .imr/traces')
+@click.option('--record', 'record_path', default=None, help='Record every model call to this cassette (JSONL)')
+@click.option('--replay', 'replay_path', default=None, help='Answer model calls from this cassette only; no network')
+@click.option('--replay-latency', default='0', callback=_replay_latency, help="Per replayed call: 'recorded' or a delay in ms")
+@click.option('--no-daemon', is_flag=True, envvar='IMR_NO_DAEMON', help='Do not hand commands to a running imr daemon')
 @click.pass_context
-def cli(ctx) -> None:
+def cli(ctx, trace: bool, record_path: str | None, replay_path: str | None, replay_latency: t.Union[str, float], no_daemon: bool) -> None:
 	"""🧠 Intelligent Merge Resolver - AI-powered conflict resolution"""
 	ctx.ensure_object(dict)
+	ctx.obj['no_daemon'] = no_daemon
 	ctx.obj['git_integration'] = GitIntegration('.')
-	ctx.obj['js_bridge'] = JavaScriptBridge() if JavaScriptBridge else None
+	if trace or get_tracer().enabled:
+		enable_tracing()
+		ctx.call_on_close(_save_trace)
+	if record_path and replay_path:
+		raise click.UsageError("--record and --replay are mutually exclusive")
+	if record_path or replay_path:
+		use_cassette(record_path or replay_path, 'record' if record_path else 'replay', replay_latency)
+	if active_cassette() is not None:
+		ctx.call_on_close(_report_cassette)
 	ctx.obj['learn'] = LearningManager('.')
 
 @cli.command()
@@ -50,65 +167,606 @@ def cli(ctx) -> None:
 @click.pass_context
 def init(ctx, project_type: str | None, visual: bool) -> None:
 	gi: GitIntegration = ctx.obj['git_integration']
-	js: JavaScriptBridge | None = ctx.obj['js_bridge']
-	if not project_type and js:
-		project_type = js.detect_project_type()
+	if not project_type:
+		try:
+			from ..integrations.js_bridge import JavaScriptBridge
+			project_type = JavaScriptBridge().detect_project_type()
+		except Exception:
+			project_type = None
 	console.print(f"Detected project type: {project_type or 'generic'}")
 	os.makedirs('.imr', exist_ok=True)
-	gi.install_hooks()
-	console.print("Hooks installed. Done.")
+	budget = load_budget_ms('.')
+	installed = gi.install_hooks(budget_ms=budget)
+	if not installed:
+		console.print("[yellow]No hook templates found; hooks not installed.[/yellow]")
+		return
+	console.print(f"Hooks installed (local tiers only, {budget:.0f} ms budget). Done.")
 
 @cli.command()
 @click.option('--file', 'file_path', default=None, help='Specific file to analyze')
 @click.option('--confidence-threshold', default=0.8, help='Auto-resolve threshold')
 @click.pass_context
 def analyze(ctx, file_path: str | None, confidence_threshold: float) -> None:
-	analyzer = ConflictAnalyzer()
-	gi: GitIntegration = ctx.obj['git_integration']
+	if _via_daemon(ctx, 'analyze', file_path=file_path):
+		return
+	_run_analyze(ctx.obj['git_integration'], file_path)
+
+def _run_analyze(gi: GitIntegration, file_path: str | None) -> None:
 	if file_path and os.path.isfile(file_path):
-		meta = analyzer.analyze_conflict(file_path)
+		meta = ConflictAnalyzer().analyze_conflict(file_path)
 		console.print(json.dumps(meta.__dict__, indent=2))
 	else:
 		conflicts = gi.detect_conflicts()
 		console.print(json.dumps([c.__dict__ for c in conflicts], indent=2))
 
+def _side_text(hunk, choice: t.Optional[str]) -> t.Optional[str]:
+	if choice == 'current':
+		return hunk.current
+	if choice == 'incoming':
+		return hunk.incoming
+	if choice == 'both':
+		return "\n".join(x for x in (hunk.current, hunk.incoming) if x)
+	return None
+
+def _decision_source(result, auto: bool) -> t.Optional[str]:
+	"""Where a whole-file decision came from, or None when it is only the fallback and not worth reusing."""
+	if not auto:
+		return "manual"
+	if result is not None and result.decision != "manual_review":
+		return "reasoning"
+	return None
+
+def _hunk_source(result, auto: bool, choice_explicit: bool) -> str:
+	"""
+	Label for a hunk the local tiers left open. Only a model verdict for one side and a side the
+	user named on a manual run are training data; "default" marks the --choice fallback (no
+	model verdict, manual_review, merge_both, over budget).
+	"""
+	if auto and result is not None and result.decision in ('keep_current', 'keep_incoming'):
+		return "reasoning"
+	if not auto and choice_explicit:
+		return "user"
+	return "default"
+
+def _struct_key(k) -> t.Tuple[str, str, str]:
+	d = k.to_dict()
+	plain = lambda v: v if isinstance(v, str) else json.dumps(v, sort_keys=True, default=str)
+	return "struct:" + ".".join(str(p) for p in k.path), plain(d.get("current")), plain(d.get("incoming"))
+
+@dataclass
+class PreparedFile:
+	"""Everything about one conflicted file that is known before any model call, so runs can be planned and budgeted."""
+	conflict: Conflict
+	conflict_type: str
+	text: str = ""
+	merged: t.Any = None
+	reused: t.Dict[t.Any, str] = field(default_factory=dict)
+	open_conflicts: t.List[t.Any] = field(default_factory=list)
+	hunks: t.List[t.Any] = field(default_factory=list)
+	features: t.List[t.Any] = field(default_factory=list)
+	local: t.List[t.Any] = field(default_factory=list)
+	# What the reasoning chain would be sent; None when local tiers settle the file
+	payload: t.Optional[t.Dict[str, t.Any]] = None
+
+	@property
+	def path(self) -> str:
+		return self.conflict.file_path
+
+	@property
+	def route(self) -> str:
+		if self.conflict_type == 'lockfile':
+			return "lockfile"
+		if self.payload is not None:
+			return "model"
+		return "structural" if self.merged is not None else "local"
+
+	@property
+	def open_count(self) -> int:
+		if self.merged is not None:
+			return len(self.open_conflicts)
+		return sum(1 for d in self.local if d is None)
+
+def _prepare_file(c: Conflict, gi: GitIntegration, analyzer: ConflictAnalyzer, model, memory: t.Optional[SequenceMemory] = None) -> PreparedFile:
+	prep = PreparedFile(c, analyzer._classify_type(c.file_path))
+	if prep.conflict_type == 'lockfile':
+		return prep
+	with span("file.read") as sp:
+		with open(os.path.abspath(c.file_path), 'r', encoding='utf-8', errors='ignore') as f:
+			prep.text = f.read()
+		sp.set(bytes=len(prep.text))
+	with span("merge.structural", type=prep.conflict_type) as sp:
+		merged = _structural_merge(gi, c.file_path, prep.conflict_type)
+		sp.set(applied=merged is not None, overlapping=len(merged.conflicts) if merged is not None else 0)
+	if merged is not None:
+		# Disjoint edits are merged locally; only overlapping keys/definitions reach the reasoning chain
+		prep.merged = merged
+		if memory is not None:
+			for k in merged.conflicts:
+				key, cur, inc = _struct_key(k)
+				match = memory.lookup(c.file_path, cur, inc, key=key)
+				if match is not None and match.choice in ('current', 'incoming'):
+					prep.reused[k.path] = match.choice
+		prep.open_conflicts = [k for k in merged.conflicts if k.path not in prep.reused]
+		if prep.open_conflicts:
+			prep.payload = {"file": c.file_path, "structural_conflicts": [k.to_dict() for k in prep.open_conflicts]}
+		return prep
+	with span("merge.local_tiers") as sp:
+		prep.hunks = extract_conflicts(prep.text)
+		prep.features, prep.local = resolve_hunks_locally(c.file_path, prep.hunks, prep.conflict_type, model)
+		sp.set(hunks=len(prep.hunks), resolved=sum(1 for d in prep.local if d))
+	if memory is not None:
+		# Earlier stops of this rebase / cherry-pick series: same or near-same hunks keep their decision
+		with span("merge.sequence") as sp:
+			for i, h in enumerate(prep.hunks):
+				if prep.local[i] is not None:
+					continue
+				match = memory.lookup(c.file_path, h.current, h.incoming)
+				if match is None:
+					continue
+				reuse = match.text if match.text is not None else _side_text(h, match.choice)
+				if reuse is not None:
+					prep.local[i] = HunkDecision(source="sequence", text=reuse, choice=match.choice, confidence=match.confidence)
+			sp.set(reused=sum(1 for d in prep.local if d and d.source == "sequence"))
+	# Only pay for the reasoning chain when some hunk was not resolved by a local tier, and then
+	# only for those hunks, each in a small window; never the whole file
+	if prep.hunks and not all(prep.local):
+		open_hunks = [i for i, d in enumerate(prep.local) if d is None]
+		prep.payload = conflict_payload(c.file_path, prep.text, only=open_hunks, **_prompt_options())
+	return prep
+
+def _finish_file(prep: PreparedFile, gi: GitIntegration, learn: LearningManager, bm: BackupManager, dl: DecisionLogger, auto: bool, choice: str, result, memory: t.Optional[SequenceMemory] = None, step: t.Optional[int] = None, choice_explicit: bool = False) -> None:
+	c = prep.conflict
+	file_path = os.path.abspath(c.file_path)
+	with span("file.backup"):
+		bm.backup_file(file_path)
+	if prep.conflict_type == 'lockfile':
+		# Streamed entry-level merge; lockfile content never reaches the model
+		from src.core.lockfile_merge import merge_lockfile
+		with span("merge.lockfile"):
+			lock = merge_lockfile(
+				file_path,
+				lambda: gi.stream_stage(c.file_path, 2),
+				lambda: gi.stream_stage(c.file_path, 3),
+				lambda: gi.stream_stage(c.file_path, 1),
+			)
+		if lock is None or not lock.ok:
+			console.print(f"[yellow]{c.file_path}: lockfile not merged ({', '.join(lock.errors) if lock else 'unrecognised format'}); regenerate it with your package manager[/yellow]")
+			return
+		rec = {
+			"file": c.file_path,
+			"choice": "lockfile",
+			"auto": auto,
+			"confidence": 1.0,
+			"entries": lock.entries,
+			"added_from_incoming": lock.added_from_incoming,
+			"upgraded_from_incoming": lock.from_incoming,
+			"version_clashes": lock.version_clashes,
+		}
+		dl.log(rec)
+		learn.record({"decision": rec, "layers": {}})
+		return
+	merged = prep.merged
+	if merged is not None:
+		final_choice = _choice_from_result(result, choice)
+		decisions = {k.path: prep.reused.get(k.path, final_choice) for k in merged.conflicts}
+		with span("file.write"):
+			with open(file_path, 'w', encoding='utf-8') as f:
+				f.write(merged.render(decisions))
+		if memory is not None:
+			source = _decision_source(result, auto)
+			for k in merged.conflicts:
+				if k.path in prep.reused or source:
+					key, cur, inc = _struct_key(k)
+					memory.remember(c.file_path, cur, inc, decisions[k.path], None, "sequence" if k.path in prep.reused else source, result.confidence if result else 1.0, step, key=key)
+		rec = {
+			"file": c.file_path,
+			"choice": final_choice if merged.conflicts else "structural",
+			"auto": auto,
+			"confidence": result.confidence if result else (0.0 if prep.open_conflicts else 1.0),
+			"structural": merged.format,
+			"auto_merged": len(merged.auto_merged),
+			"overlapping": len(merged.conflicts),
+			"sequence_reused": len(prep.reused),
+		}
+		dl.log(rec)
+		learn.record({"decision": rec, "layers": result.context_snapshot if result else {}})
+		return
+	hunks, local = prep.hunks, prep.local
+	final_choice = _choice_from_result(result, choice, allow_both=True)
+	conf = 0.0
+	if result:
+		conf = result.confidence
+	elif hunks and all(local):
+		conf = min(d.confidence for d in local)  # type: ignore[union-attr]
+	resolved = apply_hunk_resolutions(prep.text, [d.text if d else None for d in local], choice=final_choice)
+	with span("file.write"):
+		with open(file_path, 'w', encoding='utf-8') as f:
+			f.write(resolved)
+	if memory is not None:
+		# The newest content is what the next stop will most resemble, so reused hunks are re-remembered too
+		source = _decision_source(result, auto)
+		for h, d in zip(hunks, local):
+			if d is not None:
+				memory.remember(c.file_path, h.current, h.incoming, d.choice, d.text, d.source, d.confidence, step)
+			elif source:
+				memory.remember(c.file_path, h.current, h.incoming, final_choice, None, source, conf, step)
+	rules: dict[str, int] = {}
+	for d in local:
+		if d:
+			rules[d.source] = rules.get(d.source, 0) + 1
+	rec = {"file": c.file_path, "choice": final_choice, "auto": auto, "confidence": conf, "local_hunks": rules}
+	dl.log(rec)
+	learn.record({
+		"decision": rec,
+		"layers": getattr(result, 'context_snapshot', {}) if result else {},
+		"hunks": [
+			{
+				"features": fv,
+				"choice": (d.choice if d else final_choice),
+				"source": d.source if d else _hunk_source(result, auto, choice_explicit),
+			}
+			for fv, d in zip(prep.features, local)
+		],
+	})
+
+def _defer_file(prep: PreparedFile, bm: BackupManager, dl: DecisionLogger) -> t.Dict[str, t.Any]:
+	"""Over budget: apply what the local tiers decided, keep the other hunks' markers for manual review."""
+	if prep.merged is None and any(prep.local):
+		file_path = os.path.abspath(prep.path)
+		bm.backup_file(file_path)
+		with open(file_path, 'w', encoding='utf-8') as f:
+			f.write(apply_hunk_resolutions(prep.text, [d.text if d else None for d in prep.local], choice="keep"))
+	dl.log({"file": prep.path, "choice": "manual_review", "auto": True, "confidence": 0.0, "reason": "budget"})
+	return {"hunks": None, "reason": "budget", "open": prep.open_count}
+
+def _cost_model():
+	"""Chain cost from the scheduler's recorded layer stats; reading them does not load the layers."""
+	from src.core.decision_engine import LayerStatsStore
+	from src.core.budget import CostModel
+	return CostModel.from_stats(LayerStatsStore(os.path.join('.imr', 'layer_stats.json')), _CHAIN_LENGTH)
+
+def _collect_conflicts(gi: GitIntegration, pending: PendingHunks, prune: bool = True) -> t.List[Conflict]:
+	with span("git.detect_conflicts"):
+		conflicts = gi.detect_conflicts()
+	# Files a git hook left for this pass; markers may already be committed, so they are not unmerged
+	known = {c.file_path for c in conflicts}
+	stale = []
+	for rel in pending.load():
+		if rel in known:
+			continue
+		if has_markers(rel):
+			conflicts.append(Conflict(file_path=rel, status="pending"))
+		else:
+			stale.append(rel)
+	if prune:
+		pending.clear(stale)
+	return conflicts
+
+def _schedule(prepared: t.List[PreparedFile], cost, budget) -> t.Tuple[t.List[t.Tuple[PreparedFile, t.Any]], t.List[t.Tuple[PreparedFile, t.Any]]]:
+	"""
+	Files that need the model, most open hunks per estimated token first, split into those the
+	budget can pay for and those it cannot (greedy: a file that does not fit is passed over for
+	cheaper ones further down).
+	"""
+	from src.core.budget import by_value, Estimate
+	needing = [(p, cost.chain(p.payload)) for p in prepared if p.payload is not None]
+	estimates = {id(p): est for p, est in needing}
+	# A generated / minified file's chain sees no content, so it is worth the least
+	order = by_value([(p, 0.0 if p.payload.get("skipped") else float(p.open_count), est) for p, est in needing])
+	run: t.List[t.Tuple[PreparedFile, t.Any]] = []
+	over: t.List[t.Tuple[PreparedFile, t.Any]] = []
+	planned = Estimate()
+	for p in order:
+		est = estimates[id(p)]
+		if budget is not None and budget.limited and not budget.fits(planned + est):
+			over.append((p, est))
+			continue
+		planned = planned + est
+		run.append((p, est))
+	return run, over
+
 @cli.command()
 @click.option('--auto', is_flag=True, help='Attempt auto resolution using reasoning engine')
 @click.option('--confidence-threshold', default=0.85, help='Threshold for auto merge')
 @click.option('--choice', type=click.Choice(['current', 'incoming']), default='current', help='Fallback resolution choice')
+@click.option('--fast-path/--no-fast-path', default=True, help='Resolve confidently predicted hunks with the learned model')
+@click.option('--sequence/--no-sequence', default=True, help='During a rebase or cherry-pick series, reuse decisions from earlier stops')
+@click.option('--max-calls', type=int, default=None, help='Model call budget (default: the local server\'s remaining credits)')
+@click.option('--max-tokens', type=int, default=None, help='Approximate token budget (prompt + response)')
+@click.option('--max-seconds', type=float, default=None, help='Wall-clock budget for model calls')
+@click.option('--over-budget', type=click.Choice(['manual', 'fallback']), default='manual', help='Files the budget cannot pay for: leave for manual review, or take the fallback choice')
 @click.pass_context
-def resolve(ctx, auto: bool, confidence_threshold: float, choice: str) -> None:
-	gi: GitIntegration = ctx.obj['git_integration']
-	learn: LearningManager = ctx.obj['learn']
-	conflicts = gi.detect_conflicts()
+def resolve(ctx, auto: bool, confidence_threshold: float, choice: str, fast_path: bool, sequence: bool, max_calls: int | None, max_tokens: int | None, max_seconds: float | None, over_budget: str) -> None:
+	limits = {"max_calls": max_calls, "max_tokens": max_tokens, "max_seconds": max_seconds, "over_budget": over_budget}
+	# A side the user asked for is a label worth learning from; the option's default is not
+	choice_explicit = ctx.get_parameter_source('choice') in (ParameterSource.COMMANDLINE, ParameterSource.ENVIRONMENT)
+	if _via_daemon(ctx, 'resolve', auto=auto, confidence_threshold=confidence_threshold, choice=choice, choice_explicit=choice_explicit, fast_path=fast_path, sequence=sequence, **limits):
+		return
+	_run_resolve(ctx.obj['git_integration'], ctx.obj['learn'], auto, confidence_threshold, choice, fast_path, sequence=sequence, choice_explicit=choice_explicit, **limits)
+
+def _run_resolve(gi: GitIntegration, learn: LearningManager, auto: bool, confidence_threshold: float, choice: str, fast_path: bool, model: t.Any = None, sequence: bool = True, max_calls: t.Optional[int] = None, max_tokens: t.Optional[int] = None, max_seconds: t.Optional[float] = None, over_budget: str = 'manual', choice_explicit: bool = False) -> None:
+	"""Resolve every conflicted file; `model` lets the daemon pass its already loaded fast-path model."""
+	pending = PendingHunks('.')
+	conflicts = _collect_conflicts(gi, pending)
 	if not conflicts:
 		console.print("No conflicts detected.")
 		return
-	layers = [ContextualReasoning(), SemanticReasoning(), VisualReasoning(), ImpactReasoning(), ConsistencyReasoning(), MetaReasoning()]
-	engine = MergeReasoningEngine(layers)
 	bm = BackupManager('.')
 	dl = DecisionLogger('.')
-	for c in conflicts:
-		file_path = os.path.abspath(c.file_path)
-		bm.backup_file(file_path)
-		with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-			text = f.read()
-		async def _run():
-			return await engine.reason_through_merge({"file": c.file_path}, threshold=confidence_threshold)
-		result = asyncio.run(_run()) if auto else None
-		final_choice = choice
-		conf = 0.0
-		if result:
-			final_choice = 'current' if result.decision == 'keep_current' else ('incoming' if result.decision == 'keep_incoming' else choice)
-			conf = result.confidence
-		resolved = resolve_conflicts_in_text(text, choice=final_choice)
-		with open(file_path, 'w', encoding='utf-8') as f:
-			f.write(resolved)
-		rec = {"file": c.file_path, "choice": final_choice, "auto": bool(result), "confidence": conf}
-		dl.log(rec)
-		learn.record({"decision": rec, "layers": getattr(result, 'context_snapshot', {}) if result else {}})
+	analyzer = ConflictAnalyzer()
+	if not (auto and fast_path):
+		model = None
+	elif model is None:
+		with span("model.load"):
+			model = LearnedResolver.load('.', confidence_threshold)
+	state = gi.sequence_state() if sequence else None
+	memory = SequenceMemory.load('.', state["session"], state["kind"]) if state else None
+	step = state["step"] if state else None
+	before = dict(memory.stats) if memory else {}
+	with span("resolve.prepare", files=len(conflicts)):
+		prepared = [_prepare_file(c, gi, analyzer, model, memory) for c in conflicts]
+	for prep in prepared:
+		if prep.payload is None or not auto:
+			with span("resolve.file", file=prep.path):
+				_finish_file(prep, gi, learn, bm, dl, auto, choice, None, memory, step, choice_explicit)
+	budget = None
+	deferred: t.Dict[str, t.Dict[str, t.Any]] = {}
+	if auto and any(p.payload is not None for p in prepared):
+		from src.core.budget import Budget
+		from ..integrations.gemini_client import get_gemini_client
+		client = get_gemini_client()
+		if max_calls is None:
+			# The local server stops answering at zero credits; plan within what it has left
+			max_calls = client.credits()
+			if max_calls is not None:
+				console.print(f"[dim]Server has {max_calls} credits left; model calls capped at {max_calls}[/dim]")
+		budget = Budget(max_calls, max_tokens, max_seconds, meter=client.usage)
+		run, over = _schedule(prepared, _cost_model(), budget)
+		for prep, _est in run:
+			with span("resolve.file", file=prep.path):
+				# An unlimited budget still meters each chain, which calibrates the token estimates
+				result = _reason(prep.payload, confidence_threshold, budget)
+				_finish_file(prep, gi, learn, bm, dl, auto, choice, result, memory, step, choice_explicit)
+		for prep, _est in over:
+			with span("resolve.file", file=prep.path, over_budget=over_budget):
+				if over_budget == 'fallback':
+					_finish_file(prep, gi, learn, bm, dl, auto, choice, None, memory, step, choice_explicit)
+				else:
+					deferred[prep.path] = _defer_file(prep, bm, dl)
+	pending.clear([c.file_path for c in conflicts])
+	pending.record(deferred)
+	if memory is not None and state is not None:
+		memory.save()
+		SequenceMemory.prune('.', keep=state["session"])
+		gained = {k: memory.stats.get(k, 0) - before.get(k, 0) for k in ("exact_hits", "fuzzy_hits", "misses")}
+		progress = f" {state['step']}/{state['total']}" if state.get("step") and state.get("total") else ""
+		console.print(
+			f"Sequence {state['kind']}{progress}: reused {gained['exact_hits'] + gained['fuzzy_hits']} earlier decisions "
+			f"({gained['exact_hits']} exact, {gained['fuzzy_hits']} fuzzy), {gained['misses']} new hunks"
+		)
+	if budget is not None and budget.limited:
+		spent = budget.spent()
+		console.print(f"Budget: {spent.calls} calls, ~{spent.tokens} tokens, {spent.seconds:.1f}s spent")
+		if deferred:
+			console.print(f"[yellow]{len(deferred)} file(s) over budget left for manual review: {', '.join(sorted(deferred))}[/yellow]")
 	console.print("Resolution complete. Backups saved under .imr/backups.")
 
+@cli.command()
+@click.option('--confidence-threshold', default=0.85, help='Threshold for auto merge')
+@click.option('--fast-path/--no-fast-path', default=True, help='Count hunks the learned model would resolve as local')
+@click.option('--sequence/--no-sequence', default=True, help='Count hunks earlier rebase / cherry-pick stops already decided as local')
+@click.option('--max-calls', type=int, default=None, help='Model call budget to plan against (default: the local server\'s remaining credits)')
+@click.option('--max-tokens', type=int, default=None, help='Approximate token budget to plan against')
+@click.option('--max-seconds', type=float, default=None, help='Wall-clock budget to plan against')
+@click.option('--json', 'as_json', is_flag=True, help='Print the plan as JSON, with per-hunk estimates')
+@click.pass_context
+def plan(ctx, confidence_threshold: float, fast_path: bool, sequence: bool, max_calls: int | None, max_tokens: int | None, max_seconds: float | None, as_json: bool) -> None:
+	"""Estimate model calls, tokens and time of `resolve --auto` without calling the model or writing files"""
+	from src.core.budget import Budget, Estimate, estimate_tokens
+	from src.core.prompt_window import hunk_windows, render_window
+	gi: GitIntegration = ctx.obj['git_integration']
+	conflicts = _collect_conflicts(gi, PendingHunks('.'), prune=False)
+	model = LearnedResolver.load('.', confidence_threshold) if fast_path else None
+	state = gi.sequence_state() if sequence else None
+	memory = SequenceMemory.load('.', state["session"], state["kind"]) if state else None
+	analyzer = ConflictAnalyzer()
+	prepared = [_prepare_file(c, gi, analyzer, model, memory) for c in conflicts]
+	credits = None
+	if any(p.payload is not None for p in prepared):
+		from ..integrations.gemini_client import get_gemini_client
+		credits = get_gemini_client().credits()
+	budget = Budget(max_calls if max_calls is not None else credits, max_tokens, max_seconds)
+	cost = _cost_model()
+	run, over = _schedule(prepared, cost, budget)
+	estimates = {id(p): est for p, est in run + over}
+	over_ids = {id(p) for p, _ in over}
+	opts = _prompt_options()
+	files = []
+	total = Estimate()
+	for p in prepared:
+		est = estimates.get(id(p), Estimate())
+		entry = {
+			"file": p.path,
+			"route": "over_budget" if id(p) in over_ids else p.route,
+			"hunks": len(p.merged.conflicts) if p.merged is not None else len(p.hunks),
+			"local": (len(p.merged.conflicts) if p.merged is not None else len(p.hunks)) - p.open_count,
+			"open": p.open_count,
+			"skipped": (p.payload or {}).get("skipped"),
+			**est.to_dict(),
+		}
+		if p.payload is not None and p.merged is None and not entry["skipped"]:
+			open_idx = [i for i, d in enumerate(p.local) if d is None]
+			entry["hunk_tokens"] = {w.index: estimate_tokens(render_window(w, opts["max_hunk_lines"])) for w in hunk_windows(p.text, opts["context_lines"], open_idx)}
+		if id(p) not in over_ids:
+			total = total + est
+		files.append(entry)
+	report = {
+		"files": files,
+		"planned": total.to_dict(),
+		"over_budget": [p.path for p, _ in over],
+		"budget": {"max_calls": budget.max_calls, "max_tokens": budget.max_tokens, "max_seconds": budget.max_seconds},
+		"server_credits": credits,
+		"cost_model": {"calls_per_chain": round(cost.calls_per_chain, 2), "seconds_per_call": round(cost.seconds_per_call, 2)},
+	}
+	if as_json:
+		click.echo(json.dumps(report, indent=2))
+		return
+	if not files:
+		console.print("No conflicts detected.")
+		return
+	table = Table(title="Resolve plan (estimates)")
+	for col in ("File", "Route", "Hunks", "Local", "Open", "Calls", "Tokens", "Seconds"):
+		table.add_column(col, no_wrap=col == "File", justify="left" if col in ("File", "Route") else "right")
+	for e in files:
+		route = e["route"] + (f" ({e['skipped']})" if e["skipped"] else "")
+		table.add_row(e["file"], route, str(e["hunks"]), str(e["local"]), str(e["open"]), f"{e['calls']:.1f}", str(e["tokens"]), f"{e['seconds']:.1f}")
+	console.print(table)
+	console.print(f"Planned: {total.calls:.1f} calls, ~{total.tokens} tokens, ~{total.seconds:.1f}s (chain ~{cost.calls_per_chain:.1f} calls at ~{cost.seconds_per_call:.2f}s)")
+	if credits is not None:
+		console.print(f"Server credits left: {credits}")
+	if over:
+		console.print(f"[yellow]Over budget ({len(over)} file(s)), left for manual review: {', '.join(p.path for p, _ in over)}[/yellow]")
+
+@cli.command()
+@click.argument('hook_name', type=click.Choice(HOOKS))
+@click.option('--budget-ms', type=float, default=None, envvar='IMR_HOOK_BUDGET_MS', help='Wall-clock budget (default: hooks.budget_ms or 1500)')
+@click.option('--strict', is_flag=True, envvar='IMR_HOOK_STRICT', help='Exit 1 while conflict markers remain')
+@click.pass_context
+def hook(ctx, hook_name: str, budget_ms: float | None, strict: bool) -> None:
+	"""Git hook entry point: local resolution tiers only, within a time budget, no network"""
+	budget = budget_ms if budget_ms is not None else load_budget_ms('.')
+	resp = None
+	if not (ctx.obj.get('no_daemon') or get_tracer().enabled):
+		from .daemon import DaemonClient
+		resp = DaemonClient('.').request('hook', hook=hook_name, budget_ms=budget, timeout=max(5.0, budget / 1000.0 * 4))
+	report = resp['report'] if resp and resp.get('ok') else run_hook(ctx.obj['git_integration'], hook_name, budget)
+	_print_hook_report(report)
+	if strict and report["pending"]:
+		sys.exit(1)
+
+def _print_hook_report(report: dict) -> None:
+	if not report["files"]:
+		console.print(f"imr {report['hook']}: no conflicts ({report['elapsed_ms']:.0f} ms)")
+		return
+	staged = " and staged" if report["hook"] == "pre-merge-commit" and report["resolved_files"] else ""
+	console.print(
+		f"imr {report['hook']}: {report['resolved_hunks']}/{report['hunks']} hunks resolved locally, "
+		f"{len(report['resolved_files'])}/{report['files']} files rewritten{staged} "
+		f"in {report['elapsed_ms']:.0f} ms (budget {report['budget_ms']:.0f} ms{', exceeded' if report['over_budget'] else ''})"
+	)
+	if report["pending"]:
+		console.print(f"[yellow]{len(report['pending'])} file(s) still have conflicts; run `imr resolve --auto`:[/yellow]")
+		for rel, entry in report["pending"].items():
+			console.print(f"  {rel} ({entry['reason']})")
+
+@cli.command()
+@click.option('--confidence-threshold', default=0.85, help='Posterior threshold used by the fast path')
+@click.pass_context
+def evaluate(ctx, confidence_threshold: float) -> None:
+	"""Replay .imr/learning.jsonl through a fresh fast-path model and report precision"""
+	report = LearnedResolver.replay(LearnedResolver.history_path('.'), threshold=confidence_threshold)
+	t = Table(title="Fast-path Replay")
+	t.add_column("Pattern")
+	t.add_column("Predicted")
+	t.add_column("Precision")
+	for pattern, stats in report["patterns"].items():
+		t.add_row(pattern, str(stats["predicted"]), f"{stats['precision']:.2f}")
+	console.print(t)
+	console.print(
+		f"samples={report['samples']} served={report['fast_path_served']} "
+		f"coverage={report['coverage']:.2%} precision={report['fast_path_precision']:.2%}"
+	)
+
+@cli.command()
+@click.option('--trace-file', default=None, help='Trace JSONL to summarise (default: latest under .imr/traces)')
+@click.option('--top', default=15, help='Number of slowest spans to list')
+@click.pass_context
+def profile(ctx, trace_file: str | None, top: int) -> None:
+	"""Summarise where a traced run (imr --trace ...) spent its time"""
+	path = trace_file or latest_trace('.')
+	if not path or not os.path.isfile(path):
+		console.print("No trace found. Run a command with --trace (or IMR_TRACE=1) first.")
+		return
+	report = summarize(load_spans(path), top=top)
+	console.print(f"{path}: {report['spans']} spans, {report['wall_us'] / 1000:.1f} ms traced")
+	by_name = Table(title="Time by Span")
+	by_name.add_column("Span", no_wrap=True)
+	for col in ("Count", "Total ms", "Self ms", "Max ms", "Cache hits", "Prompt KB", "Response KB"):
+		by_name.add_column(col)
+	for name, agg in list(report["by_name"].items())[:top]:
+		by_name.add_row(
+			name,
+			str(agg["count"]),
+			f"{agg['total_us'] / 1000:.1f}",
+			f"{agg['self_us'] / 1000:.1f}",
+			f"{agg['max_us'] / 1000:.1f}",
+			str(agg["cache_hits"]),
+			f"{agg['prompt_bytes'] / 1024:.1f}",
+			f"{agg['response_bytes'] / 1024:.1f}",
+		)
+	console.print(by_name)
+	slowest = Table(title="Slowest Spans")
+	slowest.add_column("Span", no_wrap=True)
+	for col in ("ms", "Attributes"):
+		slowest.add_column(col)
+	for s in report["slowest"]:
+		slowest.add_row(s["name"], f"{s['dur_us'] / 1000:.1f}", json.dumps(s.get("attrs", {}), default=str)[:80])
+	console.print(slowest)
+
+@cli.group()
+def daemon() -> None:
+	"""Resident resolver that keeps the index, model clients and caches warm for this repo"""
+
+@daemon.command('run')
+@click.option('--idle-timeout', default=1800.0, help='Exit after this many idle seconds (0 = never)')
+@click.option('--poll-interval', default=1.0, help='Seconds between repository change polls')
+def daemon_run(idle_timeout: float, poll_interval: float) -> None:
+	"""Serve in the foreground"""
+	from .daemon import ResolverDaemon
+	d = ResolverDaemon('.', idle_timeout=idle_timeout, poll_interval=poll_interval)
+	timings = d.warm()
+	console.print(f"[dim]imr daemon warm on {d.path}: {json.dumps(timings)}[/dim]")
+	try:
+		d.serve()
+	except RuntimeError as e:
+		console.print(f"[red]{e}[/red]")
+		sys.exit(1)
+
+@daemon.command('start')
+@click.option('--idle-timeout', default=1800.0, help='Exit after this many idle seconds (0 = never)')
+def daemon_start(idle_timeout: float) -> None:
+	"""Start in the background and wait until it is warm"""
+	from .daemon import DaemonClient, spawn_daemon
+	if DaemonClient('.').running():
+		console.print("Daemon already running.")
+		return
+	pid = spawn_daemon('.', idle_timeout)
+	if pid is None:
+		console.print("[red]Daemon failed to start; see .imr/daemon.log[/red]")
+		sys.exit(1)
+	console.print(f"Daemon started (pid {pid}).")
+
+@daemon.command('stop')
+def daemon_stop() -> None:
+	from .daemon import DaemonClient
+	resp = DaemonClient('.').request('shutdown', timeout=5.0)
+	console.print("Daemon stopped." if resp and resp.get('ok') else "No daemon running.")
+
+@daemon.command('status')
+def daemon_status() -> None:
+	from .daemon import DaemonClient
+	resp = DaemonClient('.').request('status', timeout=5.0)
+	if not resp or not resp.get('ok'):
+		console.print("No daemon running.")
+		return
+	t = Table(title="Resolver Daemon")
+	t.add_column("Metric")
+	t.add_column("Value")
+	for k, v in resp.items():
+		if k != 'ok':
+			t.add_row(k, json.dumps(v) if isinstance(v, (dict, list)) else str(v))
+	console.print(t)
+
 @cli.command()
 @click.pass_context
 def status(ctx) -> None:
@@ -3,8 +3,10 @@ import os
 import typing as t
 from functools import lru_cache
 from .context_selector import ContextSelector
-from .vector_database import InMemoryVectorDB
+from .shard_index import ShardedVectorDB, MANIFESTS
 from .context_compressor import ContextCompressor
+from src.core.lockfile_merge import lockfile_kind
+from src.core.tracing import span
 
 class VectorDatabase:
 	pass
@@ -20,7 +22,7 @@ class SemanticCodeIndex:
 class CodebaseContextManager:
 	def __init__(self, repo_path: str) -> None:
 		self.repo_path = os.path.abspath(repo_path)
-		self.vector_db = InMemoryVectorDB()
+		self.vector_db = ShardedVectorDB(self.repo_path)
 		self.code_graph = CodeDependencyGraph()
 		self.semantic_index = SemanticCodeIndex()
 		self.selector = ContextSelector(self)
@@ -32,6 +34,8 @@ class CodebaseContextManager:
 			if any(seg.startswith('.') for seg in os.path.relpath(root, self.repo_path).split(os.sep)):
 				continue
 			for fn in files:
+				if lockfile_kind(fn):
+					continue
 				p = os.path.join(root, fn)
 				if os.path.getsize(p) > 2 * 1024 * 1024:
 					continue
@@ -40,22 +44,55 @@ class CodebaseContextManager:
 					return paths
 		return paths
 
+	def index_repo(self) -> int:
+		"""Build (in parallel) and map every shard up front (the daemon does this once and keeps it warm)."""
+		with span("context.index_repo") as sp:
+			self.vector_db.detect_layout()
+			docs = self.vector_db.load_all()
+			sp.set(docs=docs, shards=len(self.vector_db.shards))
+		return docs
+
+	def nearby_files(self, conflict_file: str) -> list[str]:
+		"""Files of the conflict's own package and its closest neighbours."""
+		return self.vector_db.files(near=conflict_file)
+
+	def refresh(self, changed: t.Iterable[str], removed: t.Iterable[str] = ()) -> None:
+		"""Re-index changed files, drop removed ones and forget selections built on the old state."""
+		changed, removed = list(changed), list(removed)
+		if any(os.path.basename(p) in MANIFESTS for p in changed + removed):
+			# Packages appeared or moved: re-shard; unchanged documents are reused from disk
+			self.vector_db.detect_layout()
+		for p in removed:
+			self.vector_db.remove_document(p)
+		self.vector_db.add_files(changed)
+		self.cached_context.cache_clear()
+
 	@lru_cache(maxsize=256)
 	def cached_context(self, conflict_file: str, max_size: int) -> t.Tuple[t.Tuple[str, ...], t.Tuple[str, ...]]:
-		candidates = self.selector.select_candidates(conflict_file)
-		self.vector_db.add_files([p for p, _ in candidates])
+		with span("context.select", file=conflict_file) as sp:
+			candidates = self.selector.select_candidates(conflict_file)
+			sp.set(candidates=len(candidates))
+		with span("context.index", docs=len(candidates)):
+			self.vector_db.add_files([p for p, _ in candidates])
 		snippets: list[str] = []
 		files: list[str] = []
-		for path, _reason in candidates:
-			try:
-				with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-					snippets.append(f.read())
-					files.append(path)
-			except Exception:
-				continue
-		compressed = self.compressor.compress(snippets, max_size=max_size)
+		with span("context.read") as sp:
+			for path, _reason in candidates:
+				try:
+					with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+						snippets.append(f.read())
+						files.append(path)
+				except Exception:
+					continue
+			sp.set(files=len(files), bytes=sum(len(x) for x in snippets))
+		with span("context.compress", max_size=max_size) as sp:
+			compressed = self.compressor.compress(snippets, max_size=max_size)
+			sp.set(output_bytes=sum(len(x) for x in compressed))
 		return tuple(files), tuple(compressed)
 
 	async def get_relevant_context(self, conflict_file: str, max_size: int = 50000) -> t.Dict[str, t.Any]:
-		files, context = self.cached_context(conflict_file, max_size)
+		with span("context.get", file=conflict_file) as sp:
+			hits = self.cached_context.cache_info().hits
+			files, context = self.cached_context(conflict_file, max_size)
+			sp.set(cache_hit=self.cached_context.cache_info().hits > hits, files=len(files))
 		return {"files": list(files), "context": list(context)}
\ No newline at end of file
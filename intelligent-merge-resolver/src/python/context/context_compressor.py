@@ -1,10 +1,10 @@
 from __future__ import annotations
 import typing as t
-from ..integrations.gemini_client import GeminiClient
+from ..integrations.gemini_client import get_gemini_client
 
 class ContextCompressor:
 	def __init__(self) -> None:
-		self.gemini = GeminiClient()
+		self.gemini = get_gemini_client()
 
 	def compress(self, texts: list[str], max_size: int) -> list[str]:
 		joined = "\n\n".join(texts)
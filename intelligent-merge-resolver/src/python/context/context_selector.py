@@ -2,6 +2,8 @@ from __future__ import annotations
 import os
 import typing as t
 import subprocess
+from src.core.lockfile_merge import lockfile_kind
+from src.core.tracing import span
 
 class DirectDependencyStrategy:
 	def select(self, conflict_file: str, manager: t.Any) -> list[tuple[str, str]]:
@@ -16,18 +18,17 @@ class SemanticSimilarityStrategy:
 				text = f.read()
 		except Exception:
 			text = os.path.basename(conflict_file)
-		results = manager.vector_db.query(text, k=5)
+		results = manager.vector_db.query(text, k=5, near=conflict_file)
 		return [(r, "semantic_similarity") for r in results]
 
 class ArchitecturalPatternStrategy:
 	def select(self, conflict_file: str, manager: t.Any) -> list[tuple[str, str]]:
-		candidates: list[str] = []
 		base = os.path.basename(conflict_file)
 		name, ext = os.path.splitext(base)
-		for root, _, files in os.walk(manager.repo_path):
-			for fn in files:
-				if fn.startswith(name) and fn.endswith(ext):
-					candidates.append(os.path.join(root, fn))
+		# Only the conflict's own and neighbouring packages, not the whole monorepo, when the manager is sharded
+		nearby = getattr(manager, "nearby_files", None)
+		paths = nearby(conflict_file) if nearby else [os.path.join(root, fn) for root, _, files in os.walk(manager.repo_path) for fn in files]
+		candidates = [p for p in paths if os.path.basename(p).startswith(name) and p.endswith(ext)]
 		return [(p, "architectural_pattern") for p in candidates[:5]]
 
 class RecentChangesStrategy:
@@ -56,8 +57,12 @@ class ContextSelector:
 		seen: set[str] = set()
 		candidates: list[tuple[str, str]] = []
 		for strat in self.strategies:
-			for path, reason in strat.select(conflict_file, self.manager):
-				if path not in seen and os.path.isfile(path):
+			with span("context.strategy." + type(strat).__name__) as sp:
+				selected = strat.select(conflict_file, self.manager)
+				sp.set(candidates=len(selected))
+			for path, reason in selected:
+				# Lockfiles are huge and carry no intent; never ship them as model context
+				if path not in seen and not lockfile_kind(path) and os.path.isfile(path):
 					seen.add(path)
 					candidates.append((path, reason))
 		return candidates
\ No newline at end of file
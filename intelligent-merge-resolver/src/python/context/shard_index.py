@@ -0,0 +1,437 @@
+from __future__ import annotations
+import os
+import re
+import json
+import mmap
+import time
+import struct
+import hashlib
+import typing as t
+from collections import Counter
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+	import tomllib  # type: ignore
+except Exception:  # pragma: no cover
+	tomllib = None
+
+from .vector_database import Token, tokenize, tfidf_cosine
+from src.core.lockfile_merge import lockfile_kind
+from src.core.tracing import span
+
+# A directory holding one of these is a package / workspace root and gets its own shard
+MANIFESTS = ("package.json", "pyproject.toml", "setup.py", "setup.cfg", "Cargo.toml", "go.mod", "pom.xml", "build.gradle", "build.gradle.kts", "composer.json")
+SKIP_DIRS = frozenset({"node_modules", "__pycache__", "venv", "dist", "build", "target", "vendor"})
+MAX_FILE_BYTES = 2 * 1024 * 1024
+MAX_SHARD_FILES = 5000
+
+_MAGIC = b"IMRSHRD2"  # bumped with the tokenizer; older shards are rebuilt
+_HEAD = struct.Struct(">8sQ")
+_DEP_NAME = re.compile(r"^\s*([A-Za-z0-9_.@/-]+)")
+
+
+@dataclass
+class Shard:
+	"""One package of the repo: its root (relative, "" for the repo root), name and declared dependencies."""
+	root: str
+	name: str
+	deps: t.List[str] = field(default_factory=list)
+
+	@property
+	def shard_id(self) -> str:
+		return hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:12] if self.root else "root"
+
+	def contains(self, rel: str) -> bool:
+		return not self.root or rel == self.root or rel.startswith(self.root + "/")
+
+
+def _manifest_info(dir_path: str, names: t.Iterable[str]) -> t.Tuple[str, t.List[str]]:
+	"""Package name and dependency names from package.json / pyproject.toml; the directory name otherwise."""
+	name, deps = os.path.basename(dir_path), []
+	if "package.json" in names:
+		try:
+			with open(os.path.join(dir_path, "package.json"), "r", encoding="utf-8") as f:
+				pkg = json.load(f)
+			name = pkg.get("name") or name
+			for key in ("dependencies", "devDependencies", "peerDependencies"):
+				deps.extend((pkg.get(key) or {}).keys())
+		except Exception:
+			pass
+	elif "pyproject.toml" in names and tomllib is not None:
+		try:
+			with open(os.path.join(dir_path, "pyproject.toml"), "rb") as f:
+				proj = tomllib.load(f).get("project", {})
+			name = proj.get("name") or name
+			for spec in proj.get("dependencies", []):
+				m = _DEP_NAME.match(spec)
+				if m:
+					deps.append(m.group(1))
+		except Exception:
+			pass
+	return str(name), deps
+
+
+def _skip_dir(name: str) -> bool:
+	return name.startswith(".") or name in SKIP_DIRS
+
+
+def detect_shards(repo_path: str) -> t.List[Shard]:
+	"""Walk the directory tree once (names only) and return the repo root plus every manifest root."""
+	shards = [Shard("", *_manifest_info(repo_path, os.listdir(repo_path)))]
+	for root, dirs, files in os.walk(repo_path):
+		dirs[:] = [d for d in dirs if not _skip_dir(d)]
+		rel = os.path.relpath(root, repo_path).replace(os.sep, "/")
+		if rel != "." and any(m in files for m in MANIFESTS):
+			shards.append(Shard(rel, *_manifest_info(root, files)))
+	return shards
+
+
+def shard_files(repo_path: str, shard: Shard, nested: t.Collection[str]) -> t.List[t.Tuple[str, int, int]]:
+	"""(relative path, mtime_ns, size) of the files a shard owns; nested package roots are left to their own shards."""
+	base = os.path.join(repo_path, shard.root) if shard.root else repo_path
+	out: t.List[t.Tuple[str, int, int]] = []
+	for root, dirs, files in os.walk(base):
+		rel_root = os.path.relpath(root, repo_path).replace(os.sep, "/")
+		rel_root = "" if rel_root == "." else rel_root
+		dirs[:] = [d for d in dirs if not _skip_dir(d) and (f"{rel_root}/{d}" if rel_root else d) not in nested]
+		for fn in files:
+			if lockfile_kind(fn):
+				continue
+			try:
+				st = os.stat(os.path.join(root, fn))
+			except OSError:
+				continue
+			if st.st_size > MAX_FILE_BYTES:
+				continue
+			out.append((f"{rel_root}/{fn}" if rel_root else fn, st.st_mtime_ns, st.st_size))
+			if len(out) >= MAX_SHARD_FILES:
+				return out
+	return out
+
+
+def _encode_counts(counts: t.Mapping[Token, int]) -> bytes:
+	# Tokens never contain whitespace, so "token count" lines are unambiguous
+	return "".join(f"{tok} {n}\n" for tok, n in counts.items()).encode("utf-8")
+
+
+def _decode_counts(raw: bytes) -> t.Counter[Token]:
+	out: t.Counter[Token] = Counter()
+	for line in raw.decode("utf-8").splitlines():
+		tok, _, n = line.rpartition(" ")
+		out[tok] = int(n)
+	return out
+
+
+def build_shard(repo_path: str, shard_root: str, files: t.List[t.Tuple[str, int, int]], out_path: str) -> t.Dict[str, t.Any]:
+	"""
+	Write one shard file: magic, header length, a JSON header (documents with their stat and
+	payload offsets, document frequencies offset) and the token-count payloads. Documents whose
+	stat matches the previous shard file are copied over without re-reading the source.
+	"""
+	previous: t.Optional[MappedShard] = None
+	if os.path.isfile(out_path):
+		try:
+			previous = MappedShard(out_path)
+		except Exception:
+			previous = None
+	payload = bytearray()
+	docs: t.List[t.List[t.Any]] = []
+	df: t.Counter[Token] = Counter()
+	tokenized = reused = 0
+	for rel, mtime_ns, size in files:
+		old = previous.docs.get(rel) if previous is not None else None
+		if old is not None and old[0] == mtime_ns and old[1] == size:
+			blob = previous.raw(rel)  # type: ignore[union-attr]
+			counts = _decode_counts(blob)
+			reused += 1
+		else:
+			try:
+				with open(os.path.join(repo_path, rel), "r", encoding="utf-8", errors="ignore") as f:
+					counts = Counter(tokenize(f.read()))
+			except OSError:
+				continue
+			blob = _encode_counts(counts)
+			tokenized += 1
+		df.update(counts.keys())
+		docs.append([rel, mtime_ns, size, len(payload), len(blob)])
+		payload += blob
+	if previous is not None:
+		previous.close()
+	df_blob = _encode_counts(df)
+	header = json.dumps({"root": shard_root, "built_at": time.time(), "docs": docs, "df": [len(payload), len(df_blob)]}).encode("utf-8")
+	os.makedirs(os.path.dirname(out_path), exist_ok=True)
+	tmp = f"{out_path}.{os.getpid()}.tmp"
+	with open(tmp, "wb") as f:
+		f.write(_HEAD.pack(_MAGIC, len(header)))
+		f.write(header)
+		f.write(payload)
+		f.write(df_blob)
+	os.replace(tmp, out_path)
+	return {"root": shard_root, "docs": len(docs), "tokenized": tokenized, "reused": reused, "bytes": _HEAD.size + len(header) + len(payload) + len(df_blob)}
+
+
+def _build_worker(args: t.Tuple[str, str, t.List[t.Tuple[str, int, int]], str]) -> t.Dict[str, t.Any]:
+	return build_shard(*args)
+
+
+class MappedShard:
+	"""A shard file opened read-only through mmap; document vectors are decoded only when scored."""
+
+	def __init__(self, path: str) -> None:
+		self.path = path
+		self._file = open(path, "rb")
+		try:
+			self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+			magic, hlen = _HEAD.unpack_from(self._mm, 0)
+			if magic != _MAGIC:
+				raise ValueError(f"not a shard file: {path}")
+			header = json.loads(self._mm[_HEAD.size:_HEAD.size + hlen])
+		except Exception:
+			self._file.close()
+			raise
+		self._base = _HEAD.size + hlen
+		self.root: str = header["root"]
+		self.built_at: float = header.get("built_at", 0.0)
+		# rel -> (mtime_ns, size, offset, length)
+		self.docs: t.Dict[str, t.Tuple[int, int, int, int]] = {d[0]: (d[1], d[2], d[3], d[4]) for d in header["docs"]}
+		self._df_span = tuple(header["df"])
+		self._df: t.Optional[t.Counter[Token]] = None
+
+	def raw(self, rel: str) -> bytes:
+		_m, _s, off, length = self.docs[rel]
+		return self._mm[self._base + off:self._base + off + length]
+
+	def tokens(self, rel: str) -> t.Counter[Token]:
+		return _decode_counts(self.raw(rel))
+
+	@property
+	def df(self) -> t.Counter[Token]:
+		if self._df is None:
+			off, length = self._df_span
+			self._df = _decode_counts(self._mm[self._base + off:self._base + off + length])
+		return self._df
+
+	def is_current(self, files: t.List[t.Tuple[str, int, int]]) -> bool:
+		if len(files) != len(self.docs):
+			return False
+		return all(self.docs.get(rel, (None, None))[:2] == (mtime_ns, size) for rel, mtime_ns, size in files)
+
+	def close(self) -> None:
+		try:
+			self._mm.close()
+		finally:
+			self._file.close()
+
+
+class ShardedVectorDB:
+	"""
+	Drop-in for InMemoryVectorDB on large repos. The repo is split into shards at package /
+	workspace roots (MANIFESTS); each shard is indexed into .imr/index/<shard>.shard, built in
+	parallel on a process pool, and memory-mapped on first use. A query near a file only
+	loads that file's shard and its `neighbors` closest packages (declared dependencies
+	first, then directory distance). Documents added or removed after a shard was built live
+	in a small in-memory overlay.
+	"""
+
+	def __init__(self, repo_path: str, index_dir: t.Optional[str] = None, neighbors: int = 2, max_workers: t.Optional[int] = None) -> None:
+		self.repo_path = os.path.abspath(repo_path)
+		self.index_dir = index_dir or os.path.join(self.repo_path, ".imr", "index")
+		self.neighbors = neighbors
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self._shards: t.Optional[t.List[Shard]] = None
+		self._loaded: t.Dict[str, MappedShard] = {}
+		# shard id -> rel -> token counts (None: removed)
+		self._overlay: t.Dict[str, t.Dict[str, t.Optional[t.Counter[Token]]]] = {}
+
+	# Layout ---------------------------------------------------------------------------------
+
+	@property
+	def shards(self) -> t.List[Shard]:
+		if self._shards is None:
+			self._shards = self._load_layout()
+		return self._shards
+
+	def _layout_path(self) -> str:
+		return os.path.join(self.index_dir, "layout.json")
+
+	def _load_layout(self) -> t.List[Shard]:
+		try:
+			with open(self._layout_path(), "r", encoding="utf-8") as f:
+				shards = [Shard(**s) for s in json.load(f)["shards"]]
+			# A package root that lost its manifest means the layout is out of date
+			if all(not s.root or any(os.path.isfile(os.path.join(self.repo_path, s.root, m)) for m in MANIFESTS) for s in shards):
+				return shards
+		except Exception:
+			pass
+		return self.detect_layout()
+
+	def detect_layout(self) -> t.List[Shard]:
+		with span("context.shards.detect") as sp:
+			shards = detect_shards(self.repo_path)
+			sp.set(shards=len(shards))
+		os.makedirs(self.index_dir, exist_ok=True)
+		tmp = self._layout_path() + ".tmp"
+		with open(tmp, "w", encoding="utf-8") as f:
+			json.dump({"shards": [asdict(s) for s in shards]}, f)
+		os.replace(tmp, self._layout_path())
+		self._shards = shards
+		self.close()
+		return shards
+
+	def _rel(self, path: str) -> str:
+		return os.path.relpath(os.path.join(self.repo_path, path), self.repo_path).replace(os.sep, "/")
+
+	def shard_for(self, path: str) -> Shard:
+		"""The deepest shard whose root contains `path` (absolute or relative to the repo)."""
+		rel = self._rel(path)
+		return max((s for s in self.shards if s.contains(rel)), key=lambda s: len(s.root))
+
+	def nearby(self, path: str) -> t.List[Shard]:
+		"""`path`'s own shard followed by the `neighbors` most related other packages."""
+		own = self.shard_for(path)
+		own_parts = own.root.split("/") if own.root else []
+		deps = set(own.deps)
+
+		def distance(s: Shard) -> t.Tuple[int, int]:
+			parts = s.root.split("/") if s.root else []
+			common = 0
+			for a, b in zip(own_parts, parts):
+				if a != b:
+					break
+				common += 1
+			return (0 if s.name in deps else 1, len(own_parts) + len(parts) - 2 * common)
+
+		others = sorted((s for s in self.shards if s.root != own.root), key=distance)
+		return [own] + others[:self.neighbors]
+
+	def _nested(self, shard: Shard) -> t.Set[str]:
+		return {s.root for s in self.shards if s.root and s.root != shard.root and shard.contains(s.root)}
+
+	def owned_files(self) -> t.List[str]:
+		"""Absolute paths of every file some shard owns, i.e. what build() indexes."""
+		return [os.path.join(self.repo_path, rel) for s in self.shards for rel, _mtime, _size in shard_files(self.repo_path, s, self._nested(s))]
+
+	def _shard_path(self, shard: Shard) -> str:
+		return os.path.join(self.index_dir, f"{shard.shard_id}.shard")
+
+	# Building / loading ---------------------------------------------------------------------
+
+	def build(self, shards: t.Optional[t.Sequence[Shard]] = None) -> t.Dict[str, t.Any]:
+		"""(Re)build the given shards (default: all) that are missing or stale, in parallel."""
+		targets = list(shards) if shards is not None else self.shards
+		jobs = []
+		with span("context.shards.scan", shards=len(targets)) as sp:
+			for s in targets:
+				files = shard_files(self.repo_path, s, self._nested(s))
+				loaded = self._loaded.get(s.shard_id)
+				if loaded is None and os.path.isfile(self._shard_path(s)):
+					try:
+						loaded = MappedShard(self._shard_path(s))
+						self._loaded[s.shard_id] = loaded
+					except Exception:
+						loaded = None
+				if loaded is None or not loaded.is_current(files):
+					jobs.append((self.repo_path, s.root, files, self._shard_path(s)))
+			sp.set(stale=len(jobs))
+		results: t.List[t.Dict[str, t.Any]] = []
+		with span("context.shards.build", shards=len(jobs)) as sp:
+			if len(jobs) > 1 and self.max_workers > 1:
+				try:
+					with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+						results = list(pool.map(_build_worker, jobs))
+				except (OSError, RuntimeError):
+					results = []
+			if len(results) != len(jobs):
+				results = [_build_worker(job) for job in jobs]
+			sp.set(tokenized=sum(r["tokenized"] for r in results), reused=sum(r["reused"] for r in results))
+		for _repo, root, _files, _out in jobs:
+			stale = self._loaded.pop(Shard(root, "").shard_id, None)
+			if stale is not None:
+				stale.close()
+		return {
+			"shards": len(targets),
+			"built": len(results),
+			"docs": sum(r["docs"] for r in results),
+			"tokenized": sum(r["tokenized"] for r in results),
+			"reused": sum(r["reused"] for r in results),
+		}
+
+	def load(self, shard: Shard) -> MappedShard:
+		"""Map a shard, building or refreshing it first if its files changed on disk."""
+		mapped = self._loaded.get(shard.shard_id)
+		if mapped is not None:
+			return mapped
+		with span("context.shards.load", root=shard.root) as sp:
+			self.build([shard])
+			mapped = self._loaded.get(shard.shard_id) or MappedShard(self._shard_path(shard))
+			self._loaded[shard.shard_id] = mapped
+			sp.set(docs=len(mapped.docs))
+		return mapped
+
+	def load_all(self) -> int:
+		self.build()
+		return sum(len(self.load(s).docs) for s in self.shards)
+
+	def close(self) -> None:
+		for mapped in self._loaded.values():
+			mapped.close()
+		self._loaded.clear()
+
+	# InMemoryVectorDB interface -------------------------------------------------------------
+
+	def __len__(self) -> int:
+		return sum(len(m.docs) for m in self._loaded.values()) + sum(
+			sum(1 for v in ov.values() if v is not None) for sid, ov in self._overlay.items() if sid not in self._loaded
+		)
+
+	def add_document(self, doc_id: str, text: str) -> None:
+		self._overlay.setdefault(self.shard_for(doc_id).shard_id, {})[self._rel(doc_id)] = Counter(tokenize(text))
+
+	def remove_document(self, doc_id: str) -> None:
+		self._overlay.setdefault(self.shard_for(doc_id).shard_id, {})[self._rel(doc_id)] = None
+
+	def add_files(self, paths: t.List[str]) -> None:
+		for p in paths:
+			rel = self._rel(p)
+			mapped = self._loaded.get(self.shard_for(p).shard_id)
+			try:
+				st = os.stat(os.path.join(self.repo_path, rel))
+				# Already indexed as it is on disk
+				if mapped is not None and mapped.docs.get(rel, (None, None))[:2] == (st.st_mtime_ns, st.st_size):
+					continue
+				with open(os.path.join(self.repo_path, rel), "r", encoding="utf-8", errors="ignore") as f:
+					self.add_document(p, f.read())
+			except Exception:
+				continue
+
+	def files(self, near: t.Optional[str] = None) -> t.List[str]:
+		"""Absolute paths indexed in the shards a query near `near` would search."""
+		out: t.List[str] = []
+		for s in (self.nearby(near) if near else self.shards):
+			overlay = self._overlay.get(s.shard_id, {})
+			rels = set(self.load(s).docs) | {r for r, v in overlay.items() if v is not None}
+			out.extend(os.path.join(self.repo_path, r) for r in sorted(rels) if overlay.get(r, True) is not None)
+		return out
+
+	def query(self, text: str, k: int = 5, near: t.Optional[str] = None) -> t.List[str]:
+		q = Counter(tokenize(text))
+		targets = self.nearby(near) if near else self.shards
+		with span("context.shards.query", shards=len(targets)) as sp:
+			docs: t.List[t.Tuple[str, t.Callable[[], t.Counter[Token]]]] = []
+			df: t.Counter[Token] = Counter()
+			for s in targets:
+				mapped = self.load(s)
+				overlay = self._overlay.get(s.shard_id, {})
+				df.update(mapped.df)
+				for rel, counts in overlay.items():
+					if rel in mapped.docs:
+						df.subtract(mapped.tokens(rel).keys())
+					if counts is not None:
+						df.update(counts.keys())
+						docs.append((rel, (lambda c=counts: c)))
+				docs.extend((rel, (lambda r=rel, m=mapped: m.tokens(r))) for rel in mapped.docs if rel not in overlay)
+			scores = [(rel, tfidf_cosine(q, get(), df)) for rel, get in docs]
+			scores.sort(key=lambda x: x[1], reverse=True)
+			sp.set(docs=len(docs))
+		return [os.path.join(self.repo_path, rel) for rel, _ in scores[:k]]
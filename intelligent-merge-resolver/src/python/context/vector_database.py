@@ -1,24 +1,144 @@
 from __future__ import annotations
-import os
+import re
+import sys
 import math
 import typing as t
-from collections import Counter, defaultdict
+from array import array
+from collections import Counter
+
+try:
+	import numpy as np
+except Exception:  # pragma: no cover
+	np = None  # type: ignore
 
 Token = str
 
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_SUBWORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+def tokenize(text: str) -> list[Token]:
+	"""
+	Identifier-aware tokens: punctuation is dropped and compound identifiers are split, so
+	`getUserName(user_id)` yields getusername, get, user, name, user_id, user, id. Single
+	characters and bare numbers say nothing about the topic and are skipped.
+	"""
+	out: list[Token] = []
+	for word in _WORD.findall(text):
+		whole = word.lower()
+		parts = [p.lower() for piece in word.split("_") for p in _SUBWORD.findall(piece)]
+		parts = [p for p in parts if len(p) > 1 and not p.isdigit()]
+		if (len(parts) != 1 or parts[0] != whole) and len(whole) > 1 and not whole.isdigit():
+			out.append(whole)
+		out.extend(parts)
+	return out
+
+def tfidf_cosine(a: t.Mapping[Token, float], b: t.Mapping[Token, float], df: t.Mapping[Token, int]) -> float:
+	# tf-idf weighting (idf = 1/df)
+	common = set(a.keys()) | set(b.keys())
+	wa = {}
+	wb = {}
+	for tkn in common:
+		idf = 1.0 / float(df.get(tkn, 1) or 1)
+		wa[tkn] = a.get(tkn, 0.0) * idf
+		wb[tkn] = b.get(tkn, 0.0) * idf
+	num = sum(wa[t]*wb[t] for t in common)
+	da = math.sqrt(sum(v*v for v in wa.values()))
+	db = math.sqrt(sum(v*v for v in wb.values()))
+	if da == 0 or db == 0:
+		return 0.0
+	return num / (da * db)
+
+class TokenInterner:
+	"""Dense integer ids for tokens; each distinct token string is stored once."""
+
+	def __init__(self) -> None:
+		self.ids: dict[Token, int] = {}
+		self.tokens: list[Token] = []
+
+	def __len__(self) -> int:
+		return len(self.tokens)
+
+	def intern(self, token: Token) -> int:
+		tid = self.ids.get(token)
+		if tid is None:
+			tid = len(self.tokens)
+			token = sys.intern(token)
+			self.ids[token] = tid
+			self.tokens.append(token)
+		return tid
+
+	def get(self, token: Token) -> t.Optional[int]:
+		return self.ids.get(token)
+
 class InMemoryVectorDB:
+	"""
+	tf-idf index over interned tokens. All documents' postings share two flat arrays (term id,
+	term frequency) and each document owns one contiguous run of them; document frequencies are
+	an array indexed by term id. Removing or replacing a document leaves a hole that is
+	compacted away once holes outnumber live postings. Queries are vectorised with NumPy when
+	it is installed.
+	"""
+
 	def __init__(self) -> None:
-		self.doc_id_to_tokens: dict[str, Counter[Token]] = {}
-		self.token_to_df: Counter[Token] = Counter()
+		self.vocab = TokenInterner()
+		self.doc_ids: list[t.Optional[str]] = []  # slot -> doc id, None once removed
+		self.slots: dict[str, int] = {}
+		self.starts = array('Q')
+		self.lengths = array('I')
+		self.terms = array('I')
+		self.tfs = array('I')
+		self.df = array('I')
+		self._dead = 0
+
+	def __len__(self) -> int:
+		return len(self.slots)
 
 	def _tokenize(self, text: str) -> list[Token]:
-		return [tok.lower() for tok in (text.replace('\n', ' ').replace('\t', ' ')).split() if tok]
+		return tokenize(text)
 
 	def add_document(self, doc_id: str, text: str) -> None:
-		tokens = Counter(self._tokenize(text))
-		self.doc_id_to_tokens[doc_id] = tokens
-		for tkn in tokens.keys():
-			self.token_to_df[tkn] += 1
+		# Re-adding a document replaces it instead of counting its terms twice
+		self.remove_document(doc_id)
+		counts = Counter(self.vocab.intern(tok) for tok in self._tokenize(text))
+		if len(self.df) < len(self.vocab):
+			self.df.extend([0] * (len(self.vocab) - len(self.df)))
+		ids = sorted(counts)
+		self.slots[doc_id] = len(self.doc_ids)
+		self.doc_ids.append(doc_id)
+		self.starts.append(len(self.terms))
+		self.lengths.append(len(ids))
+		self.terms.extend(ids)
+		self.tfs.extend(counts[i] for i in ids)
+		for i in ids:
+			self.df[i] += 1
+
+	def remove_document(self, doc_id: str) -> None:
+		slot = self.slots.pop(doc_id, None)
+		if slot is None:
+			return
+		start, length = self.starts[slot], self.lengths[slot]
+		for i in self.terms[start:start + length]:
+			self.df[i] -= 1
+		self.doc_ids[slot] = None
+		self._dead += length
+		if self._dead > len(self.terms) - self._dead:
+			self._compact()
+
+	def _compact(self) -> None:
+		doc_ids: list[t.Optional[str]] = []
+		starts, lengths, terms, tfs = array('Q'), array('I'), array('I'), array('I')
+		for slot, doc_id in enumerate(self.doc_ids):
+			if doc_id is None:
+				continue
+			start, length = self.starts[slot], self.lengths[slot]
+			self.slots[doc_id] = len(doc_ids)
+			doc_ids.append(doc_id)
+			starts.append(len(terms))
+			lengths.append(length)
+			terms.extend(self.terms[start:start + length])
+			tfs.extend(self.tfs[start:start + length])
+		self.doc_ids, self.starts, self.lengths, self.terms, self.tfs = doc_ids, starts, lengths, terms, tfs
+		self._dead = 0
 
 	def add_files(self, paths: list[str]) -> None:
 		for p in paths:
@@ -28,27 +148,75 @@ class InMemoryVectorDB:
 			except Exception:
 				continue
 
+	def tokens(self, doc_id: str) -> Counter[Token]:
+		"""Term frequencies of one document, by token."""
+		slot = self.slots.get(doc_id)
+		if slot is None:
+			return Counter()
+		start, length = self.starts[slot], self.lengths[slot]
+		return Counter({self.vocab.tokens[i]: tf for i, tf in zip(self.terms[start:start + length], self.tfs[start:start + length])})
+
+	def stats(self) -> t.Dict[str, int]:
+		"""Documents, vocabulary and postings, with the bytes held by the columns and the vocabulary."""
+		columns = sum(a.itemsize * len(a) for a in (self.starts, self.lengths, self.terms, self.tfs, self.df))
+		vocab = sys.getsizeof(self.vocab.ids) + sys.getsizeof(self.vocab.tokens) + sum(sys.getsizeof(tok) for tok in self.vocab.tokens)
+		return {"docs": len(self), "vocab": len(self.vocab), "postings": len(self.terms) - self._dead, "column_bytes": columns, "vocab_bytes": vocab}
+
 	def _cosine(self, a: Counter[Token], b: Counter[Token]) -> float:
-		# tf-idf weighting (idf = 1/df)
-		common = set(a.keys()) | set(b.keys())
-		wa = {}
-		wb = {}
-		for tkn in common:
-			idf = 1.0 / float(self.token_to_df.get(tkn, 1))
-			wa[tkn] = a.get(tkn, 0.0) * idf
-			wb[tkn] = b.get(tkn, 0.0) * idf
-		num = sum(wa[t]*wb[t] for t in common)
-		da = math.sqrt(sum(v*v for v in wa.values()))
-		db = math.sqrt(sum(v*v for v in wb.values()))
-		if da == 0 or db == 0:
-			return 0.0
-		return num / (da * db)
-
-	def query(self, text: str, k: int = 5) -> list[str]:
-		q = Counter(self._tokenize(text))
-		scores: list[tuple[str, float]] = []
-		for doc_id, tokens in self.doc_id_to_tokens.items():
-			s = self._cosine(q, tokens)
-			scores.append((doc_id, s))
-		scores.sort(key=lambda x: x[1], reverse=True)
-		return [doc for doc, _ in scores[:k]]
\ No newline at end of file
+		df = {tok: self.df[i] for tok in set(a) | set(b) if (i := self.vocab.get(tok)) is not None}
+		return tfidf_cosine(a, b, df)
+
+	def _query_weights(self, text: str) -> t.Tuple[dict[int, float], float]:
+		"""Query weights by term id and the query norm; tokens the index has never seen count with idf 1."""
+		weights: dict[int, float] = {}
+		norm = 0.0
+		for tok, tf in Counter(self._tokenize(text)).items():
+			tid = self.vocab.get(tok)
+			df = self.df[tid] if tid is not None else 0
+			w = tf / float(df or 1)
+			norm += w * w
+			if df:
+				weights[tid] = w  # type: ignore[index]
+		return weights, math.sqrt(norm)
+
+	def query(self, text: str, k: int = 5, near: t.Optional[str] = None) -> list[str]:
+		if not self.slots:
+			return []
+		weights, qnorm = self._query_weights(text)
+		scores = self._scores_numpy(weights, qnorm) if np is not None else self._scores_python(weights, qnorm)
+		ranked = sorted((s for s in scores if self.doc_ids[s[0]] is not None), key=lambda x: x[1], reverse=True)
+		return [self.doc_ids[slot] for slot, _ in ranked[:k]]  # type: ignore[misc]
+
+	def _scores_numpy(self, weights: dict[int, float], qnorm: float) -> list[tuple[int, float]]:
+		terms = np.frombuffer(self.terms, dtype=np.uint32) if len(self.terms) else np.zeros(0, dtype=np.uint32)
+		tfs = np.frombuffer(self.tfs, dtype=np.uint32) if len(self.tfs) else np.zeros(0, dtype=np.uint32)
+		df = np.frombuffer(self.df, dtype=np.uint32).astype(np.float64) if len(self.df) else np.zeros(0)
+		df[df == 0] = 1.0
+		w = tfs / df[terms]
+		q = np.zeros(len(df))
+		if weights:
+			q[np.fromiter(weights.keys(), dtype=np.int64)] = np.fromiter(weights.values(), dtype=np.float64)
+		n = len(self.doc_ids)
+		owner = np.repeat(np.arange(n), np.frombuffer(self.lengths, dtype=np.uint32))
+		num = np.bincount(owner, weights=w * q[terms], minlength=n)
+		denom = np.sqrt(np.bincount(owner, weights=w * w, minlength=n)) * qnorm
+		score = np.divide(num, denom, out=np.zeros(n), where=denom > 0)
+		return list(enumerate(score.tolist()))
+
+	def _scores_python(self, weights: dict[int, float], qnorm: float) -> list[tuple[int, float]]:
+		out: list[tuple[int, float]] = []
+		df = self.df
+		for slot, doc_id in enumerate(self.doc_ids):
+			if doc_id is None:
+				continue
+			start, length = self.starts[slot], self.lengths[slot]
+			num = 0.0
+			dsq = 0.0
+			for i, tf in zip(self.terms[start:start + length], self.tfs[start:start + length]):
+				w = tf / float(df[i] or 1)
+				dsq += w * w
+				qw = weights.get(i)
+				if qw is not None:
+					num += w * qw
+			out.append((slot, num / (math.sqrt(dsq) * qnorm) if dsq and qnorm else 0.0))
+		return out
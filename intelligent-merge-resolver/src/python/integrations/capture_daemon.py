@@ -0,0 +1,139 @@
+from __future__ import annotations
+import os
+import json
+import math
+import queue
+import atexit
+import threading
+import subprocess
+import typing as t
+from pathlib import Path
+
+DAEMON_SCRIPT = Path(__file__).parent.parent.parent / 'js' / 'puppeteer' / 'capture-daemon.js'
+# capture-daemon.js gives page.goto 30 s; settling and the screenshot get a little more
+PAGE_TIMEOUT_S = 35.0
+DEFAULT_VIEWPORTS = 2
+
+
+def _pump(stream: t.IO[str], lines: "queue.Queue[str]") -> None:
+	"""Move the child's stdout lines onto a queue; '' marks end of stream."""
+	try:
+		for line in stream:
+			lines.put(line)
+	except (OSError, ValueError):
+		pass
+	lines.put('')
+
+
+class CaptureDaemon:
+	"""
+	Long-lived Node process holding a warm Chromium and a page pool.
+	Speaks JSON lines over stdin/stdout: one request object per line, one response per line.
+	A response that does not arrive within the deadline kills the child; the next request starts
+	a new one. The child's stderr goes to `.imr/capture-daemon.log`.
+	"""
+
+	def __init__(self, node_cmd: str = 'node', pool_size: int = 4, timeout: float = 60.0, log_path: t.Optional[str] = None) -> None:
+		self.node_cmd = node_cmd
+		self.pool_size = pool_size
+		self.timeout = timeout
+		self.log_path = log_path or os.path.join(os.getcwd(), '.imr', 'capture-daemon.log')
+		self._proc: t.Optional[subprocess.Popen] = None
+		self._lines: t.Optional["queue.Queue[str]"] = None
+		self._lock = threading.Lock()
+		self._next_id = 0
+
+	def _ensure(self) -> subprocess.Popen:
+		if self._proc is None or self._proc.poll() is not None:
+			os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+			with open(self.log_path, 'ab') as log:
+				self._proc = subprocess.Popen(
+					[self.node_cmd, str(DAEMON_SCRIPT), '--pool-size', str(self.pool_size)],
+					stdin=subprocess.PIPE,
+					stdout=subprocess.PIPE,
+					stderr=log,
+					text=True,
+					bufsize=1,
+				)
+			# stdout is read on a thread so responses can be awaited with a deadline
+			self._lines = queue.Queue()
+			threading.Thread(target=_pump, args=(self._proc.stdout, self._lines), daemon=True, name='imr-capture-reader').start()
+		return self._proc
+
+	def _kill(self) -> None:
+		proc, self._proc = self._proc, None
+		if proc is not None and proc.poll() is None:
+			proc.kill()
+			try:
+				proc.wait(timeout=5)
+			except subprocess.TimeoutExpired:
+				pass
+
+	def request(self, cmd: str, timeout: t.Optional[float] = None, **payload: t.Any) -> t.Dict[str, t.Any]:
+		with self._lock:
+			try:
+				proc = self._ensure()
+			except OSError:
+				return {'ok': False, 'error': 'node_not_found'}
+			self._next_id += 1
+			msg = {'id': self._next_id, 'cmd': cmd, **payload}
+			assert proc.stdin is not None and self._lines is not None
+			try:
+				proc.stdin.write(json.dumps(msg) + '\n')
+				proc.stdin.flush()
+			except (BrokenPipeError, OSError):
+				self._proc = None
+				return {'ok': False, 'error': 'daemon_died'}
+			try:
+				# Requests are serialised by the lock, so the next line is our response
+				line = self._lines.get(timeout=timeout or self.timeout)
+			except queue.Empty:
+				# A hung page must not block the visual layer (and the daemon's work lock) forever
+				self._kill()
+				return {'ok': False, 'error': 'timeout', 'log': self.log_path}
+			if not line:
+				self._proc = None
+				return {'ok': False, 'error': 'daemon_died'}
+			try:
+				return json.loads(line)
+			except Exception:
+				return {'ok': False, 'error': 'invalid_response', 'raw': line}
+
+	def capture(self, base_url: str, routes: t.List[str], out_dir: str, viewports: t.Optional[t.List[dict]] = None) -> t.Dict[str, t.Any]:
+		payload: t.Dict[str, t.Any] = {'baseUrl': base_url, 'routes': routes, 'outDir': out_dir}
+		if viewports:
+			payload['viewports'] = viewports
+		# Pages load pool_size at a time; each round may take up to PAGE_TIMEOUT_S
+		rounds = math.ceil(len(routes) * len(viewports or range(DEFAULT_VIEWPORTS)) / max(1, self.pool_size))
+		return self.request('capture', timeout=self.timeout + rounds * PAGE_TIMEOUT_S, **payload)
+
+	def close(self) -> None:
+		proc = self._proc
+		if proc is not None and proc.poll() is None:
+			try:
+				self.request('shutdown', timeout=10.0)
+				proc.wait(timeout=5)
+			except Exception:
+				proc.kill()
+		self._proc = None
+
+
+def screens_by_route(results: t.List[t.Dict[str, t.Any]]) -> t.Dict[str, t.Dict[str, str]]:
+	"""Reshape daemon results into {route: {viewport: file}} as VisualReasoning consumes them."""
+	screens: t.Dict[str, t.Dict[str, str]] = {}
+	for r in results:
+		if r.get('file'):
+			screens.setdefault(r['route'], {})[r['viewport']] = r['file']
+	return screens
+
+
+_shared: t.Optional[CaptureDaemon] = None
+
+
+def get_capture_daemon(node_cmd: str = 'node') -> CaptureDaemon:
+	"""Process-wide daemon so every layer and file reuses one warm browser."""
+	global _shared
+	if _shared is None:
+		_shared = CaptureDaemon(node_cmd)
+		atexit.register(_shared.close)
+	return _shared
@@ -0,0 +1,160 @@
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import typing as t
+
+MODES = ("record", "replay", "auto")
+
+_WS = re.compile(r"\s+")
+_ISO_TS = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+_SHA = re.compile(r"\b[0-9a-f]{40}\b")
+
+
+def normalize_prompt(prompt: str, repo_path: t.Optional[str] = None) -> str:
+	"""
+	Strip what changes between otherwise identical runs: the absolute repo location,
+	timestamps, commit hashes and whitespace layout.
+	"""
+	root = os.path.abspath(repo_path or os.getcwd())
+	text = prompt.replace(root + os.sep, "").replace(root, ".")
+	text = _ISO_TS.sub("<ts>", text)
+	text = _SHA.sub("<sha>", text)
+	return _WS.sub(" ", text).strip()
+
+
+def prompt_key(kind: str, prompt: str, system_instruction: t.Optional[str] = None, images: t.Sequence[str] = (), repo_path: t.Optional[str] = None) -> str:
+	h = hashlib.sha256()
+	for part in (kind, normalize_prompt(prompt, repo_path), normalize_prompt(system_instruction or "", repo_path)):
+		h.update(part.encode("utf-8"))
+		h.update(b"\0")
+	# Images are keyed by name only; re-rendered screenshots never match byte for byte
+	for p in images:
+		h.update(os.path.basename(p).encode("utf-8"))
+		h.update(b"\0")
+	return h.hexdigest()
+
+
+class Cassette:
+	"""
+	Prompt/response pairs in a JSONL file, one record per line, keyed by `prompt_key`.
+
+	record: every call goes to the model and new keys are appended with their latency.
+	replay: calls are answered from the file only; a miss returns an error dict and never
+	touches the network. `latency` sleeps per hit: "recorded", a number of ms, or 0.
+	auto: replay hits, record misses. GeminiClient does the lookup/record around each call.
+	"""
+
+	def __init__(self, path: str, mode: str = "replay", latency: t.Union[str, float] = 0) -> None:
+		if mode not in MODES:
+			raise ValueError(f"unknown cassette mode {mode!r} (expected one of {', '.join(MODES)})")
+		self.path = path
+		self.mode = mode
+		self.latency = latency
+		self.entries: t.Dict[str, t.Dict[str, t.Any]] = {}
+		self.hits = 0
+		self.misses = 0
+		self.recorded = 0
+		self._lock = threading.Lock()
+		self._load()
+
+	def _load(self) -> None:
+		if not os.path.isfile(self.path):
+			return
+		with open(self.path, "r", encoding="utf-8") as f:
+			for line in f:
+				line = line.strip()
+				if not line:
+					continue
+				try:
+					rec = json.loads(line)
+				except Exception:
+					continue
+				# First recording wins so replays stay stable when a file is appended to
+				self.entries.setdefault(rec.get("key"), rec)
+
+	def _sleep(self, rec: t.Dict[str, t.Any]) -> None:
+		if self.latency == "recorded":
+			delay = float(rec.get("latency_ms", 0.0))
+		else:
+			delay = float(self.latency or 0.0)
+		if delay > 0:
+			time.sleep(delay / 1000.0)
+
+	def lookup(self, key: str) -> t.Optional[t.Dict[str, t.Any]]:
+		if self.mode == "record":
+			return None
+		rec = self.entries.get(key)
+		with self._lock:
+			if rec is None:
+				self.misses += 1
+			else:
+				self.hits += 1
+		if rec is None:
+			return None
+		self._sleep(rec)
+		# Returned exactly as recorded: layers feed responses into later prompts, so any
+		# marker added here would change every downstream key
+		return json.loads(json.dumps(rec["response"]))
+
+	def miss_response(self, key: str) -> t.Dict[str, t.Any]:
+		return {"error": "cassette_miss", "key": key, "cassette": self.path}
+
+	def record(self, key: str, kind: str, prompt: str, response: t.Dict[str, t.Any], latency_ms: float) -> None:
+		# Transport failures are not worth replaying
+		if self.mode == "replay" or not isinstance(response, dict) or response.get("error"):
+			return
+		rec = {
+			"key": key,
+			"kind": kind,
+			"prompt_sha": hashlib.sha1(prompt.encode("utf-8")).hexdigest(),
+			"prompt_preview": prompt[:200],
+			"latency_ms": round(latency_ms, 1),
+			"response": response,
+			"recorded_at": time.time(),
+		}
+		with self._lock:
+			if key in self.entries:
+				return
+			self.entries[key] = rec
+			self.recorded += 1
+			os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+			with open(self.path, "a", encoding="utf-8") as f:
+				f.write(json.dumps(rec, default=str) + "\n")
+
+	def stats(self) -> t.Dict[str, t.Any]:
+		return {"path": self.path, "mode": self.mode, "entries": len(self.entries), "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+def _parse_latency(value: t.Optional[str]) -> t.Union[str, float]:
+	if not value:
+		return 0
+	if value == "recorded":
+		return value
+	return float(value)
+
+
+_active: t.Optional[Cassette] = None
+_configured = False
+
+
+def use_cassette(path: str, mode: str = "replay", latency: t.Union[str, float] = 0) -> Cassette:
+	"""Make `path` the process-wide cassette consulted by every GeminiClient."""
+	global _active, _configured
+	_active = Cassette(path, mode, latency)
+	_configured = True
+	return _active
+
+
+def active_cassette() -> t.Optional[Cassette]:
+	"""The configured cassette, falling back to IMR_CASSETTE / IMR_CASSETTE_MODE / IMR_REPLAY_LATENCY."""
+	global _active, _configured
+	if not _configured:
+		_configured = True
+		path = os.getenv("IMR_CASSETTE")
+		if path:
+			_active = Cassette(path, os.getenv("IMR_CASSETTE_MODE", "replay"), _parse_latency(os.getenv("IMR_REPLAY_LATENCY")))
+	return _active
@@ -2,16 +2,32 @@ from __future__ import annotations
 import os
 import json
 import time
+import threading
 import typing as t
 from dataclasses import dataclass
+from functools import lru_cache
 
-try:
-	import google.generativeai as genai
-except Exception:  # pragma: no cover
-	genai = None
-
+import urllib.error
 import urllib.request
 
+from src.core.tracing import span
+from .cassette import active_cassette, prompt_key
+
+_UNSET = object()
+_genai: t.Any = _UNSET
+
+
+def _load_genai():
+	"""Import google.generativeai on first use; it is slow to import and most runs never need it."""
+	global _genai
+	if _genai is _UNSET:
+		try:
+			import google.generativeai as genai  # type: ignore
+		except Exception:  # pragma: no cover
+			genai = None
+		_genai = genai
+	return _genai
+
 
 @dataclass
 class GeminiConfig:
@@ -23,9 +39,13 @@ class GeminiConfig:
 def _load_key_from_env_local() -> t.Optional[str]:
 	"""
 	Load GEMINI_API_KEY from a .env.local file in the current working directory.
-	Simple KEY=VALUE parser with support for quoted values.
+	Simple KEY=VALUE parser with support for quoted values. Read once per directory.
 	"""
-	path = os.path.join(os.getcwd(), ".env.local")
+	return _read_env_local(os.path.join(os.getcwd(), ".env.local"))
+
+
+@lru_cache(maxsize=None)
+def _read_env_local(path: str) -> t.Optional[str]:
 	if not os.path.isfile(path):
 		return None
 	try:
@@ -46,27 +66,125 @@ def _load_key_from_env_local() -> t.Optional[str]:
 	return None
 
 
+# A server that answered is trusted this long; a miss is never cached, so one started later is found
+_SERVER_TTL_S = 30.0
+# How often a client without a server probes again
+_REPROBE_S = 10.0
+_server_seen: t.Dict[str, float] = {}
+
+
 def _detect_local_server(default_url: str = "http://127.0.0.1:3939") -> t.Optional[str]:
+	seen = _server_seen.get(default_url)
+	if seen is not None and time.monotonic() - seen < _SERVER_TTL_S:
+		return default_url
 	try:
 		with urllib.request.urlopen(default_url.rstrip("/") + "/status", timeout=0.3) as resp:
 			if resp.status == 200:
+				_server_seen[default_url] = time.monotonic()
 				return default_url
 	except Exception:
 		pass
+	_server_seen.pop(default_url, None)
 	return None
 
 
+def _parse_model_text(text: str) -> t.Dict[str, t.Any]:
+	"""Model output as a dict: fenced or bare JSON is parsed, anything else comes back as {"raw": text}."""
+	body = (text or "").strip()
+	if body.startswith("```"):
+		body = body.split("\n", 1)[1] if "\n" in body else ""
+		if body.rstrip().endswith("```"):
+			body = body.rstrip()[:-3]
+	try:
+		value = json.loads(body)
+	except Exception:
+		return {"raw": text}
+	return value if isinstance(value, dict) else {"raw": text}
+
+
+def _unreachable(e: BaseException) -> bool:
+	"""Whether a server call failed because nothing is listening any more (not an HTTP error or a slow answer)."""
+	if isinstance(e, urllib.error.HTTPError):
+		return False
+	reason = e.reason if isinstance(e, urllib.error.URLError) else e
+	return isinstance(reason, ConnectionError)
+
+
 class GeminiClient:
+	"""
+	Key lookup, local server probe and SDK import all happen on the first request,
+	so constructing a client is free for runs that never reach the model.
+	"""
+
 	def __init__(self, api_key: t.Optional[str] = None, config: t.Optional[GeminiConfig] = None) -> None:
-		# Priority: explicit arg -> env var -> .env.local
-		env_key = os.getenv("GEMINI_API_KEY")
-		file_key = _load_key_from_env_local()
-		self.api_key = api_key or env_key or file_key
+		self._explicit_key = api_key
 		self.config = config or GeminiConfig()
 		self._last_call_ts = 0.0
-		self.server_url = os.getenv("IMR_SERVER_URL") or _detect_local_server()
-		if genai and self.api_key and not self.server_url:
-			genai.configure(api_key=self.api_key)
+		self._lock = threading.Lock()
+		self._resolved = False
+		self._api_key: t.Optional[str] = None
+		self._server_url: t.Optional[str] = None
+		self._probed_at = 0.0
+		self._configured = False
+		# Calls and approximate tokens (prompt + response chars / 4) sent so far; budgets meter against this
+		self.calls = 0
+		self.tokens = 0
+
+	def usage(self) -> t.Tuple[int, int]:
+		return self.calls, self.tokens
+
+	def credits(self) -> t.Optional[int]:
+		"""Credits the local server has left, or None when calls do not go through it."""
+		if not self.server_url:
+			return None
+		try:
+			with urllib.request.urlopen(self.server_url.rstrip("/") + "/status", timeout=2) as resp:
+				value = json.loads(resp.read().decode("utf-8")).get("credits")
+			return int(value) if isinstance(value, (int, float)) else None
+		except Exception:
+			return None
+
+	def _resolve(self) -> None:
+		with self._lock:
+			if self._resolved:
+				return
+			with span("gemini.setup"):
+				# Priority: explicit arg -> env var -> .env.local
+				self._api_key = self._explicit_key or os.getenv("GEMINI_API_KEY") or _load_key_from_env_local()
+				self._server_url = os.getenv("IMR_SERVER_URL") or _detect_local_server()
+				self._probed_at = time.monotonic()
+				if self._api_key and not self._server_url:
+					self._sdk()
+			self._resolved = True
+
+	def _sdk(self) -> t.Any:
+		"""The configured SDK module, or None without the package or a key."""
+		genai = _load_genai() if self._api_key else None
+		if genai and not self._configured:
+			genai.configure(api_key=self._api_key)
+			self._configured = True
+		return genai
+
+	@property
+	def api_key(self) -> t.Optional[str]:
+		self._resolve()
+		return self._api_key
+
+	@property
+	def server_url(self) -> t.Optional[str]:
+		self._resolve()
+		# The shared client lives as long as the daemon: look again for a server started since
+		if self._server_url is None and not os.getenv("IMR_SERVER_URL") and time.monotonic() - self._probed_at >= _REPROBE_S:
+			self._probed_at = time.monotonic()
+			self._server_url = _detect_local_server()
+		return self._server_url
+
+	def _server_failed(self, e: BaseException) -> None:
+		"""Forget a detected server that stopped listening; the next call probes again or uses the SDK."""
+		if _unreachable(e) and self._server_url and not os.getenv("IMR_SERVER_URL"):
+			_server_seen.pop(self._server_url, None)
+			self._server_url = None
+			self._probed_at = 0.0
 
 	def _throttle(self) -> None:
 		if self.config.rate_limit_qps <= 0:
@@ -83,42 +201,108 @@ class GeminiClient:
 		url = self.server_url.rstrip("/") + path
 		data = json.dumps(payload).encode("utf-8")
 		req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"}, method="POST")
-		with urllib.request.urlopen(req, timeout=60) as resp:
-			text = resp.read().decode("utf-8")
-			return json.loads(text)
+		with span("http.post", path=path, request_bytes=len(data)) as sp:
+			with urllib.request.urlopen(req, timeout=60) as resp:
+				text = resp.read().decode("utf-8")
+			sp.set(response_bytes=len(text))
+		body = json.loads(text)
+		if not isinstance(body, dict) or not isinstance(body.get("raw"), str):
+			return body
+		# server.js relays the model text as {raw, credits[, cached]}; parse it like the SDK path does
+		result = _parse_model_text(body["raw"])
+		for key in ("credits", "cached"):
+			if key in body:
+				result.setdefault(key, body[key])
+		return result
+
+	def _traced(self, name: str, prompt: str, call: t.Callable[[], t.Dict[str, t.Any]], **attrs: t.Any) -> t.Dict[str, t.Any]:
+		with span(name, prompt_bytes=len(prompt.encode("utf-8")), **attrs) as sp:
+			result = call()
+			with self._lock:
+				self.calls += 1
+				self.tokens += (len(prompt) + len(json.dumps(result, default=str))) // 4
+			if isinstance(result, dict):
+				sp.set(
+					transport=self._transport(result),
+					response_bytes=len(json.dumps(result, default=str)),
+					cache_hit=bool(result.get("cached")),
+					error=result.get("error"),
+				)
+			return result
+
+	def _transport(self, result: t.Dict[str, t.Any]) -> str:
+		cassette = active_cassette()
+		# A replaying cassette answers (or misses) without resolving a server or the SDK
+		if cassette is not None and cassette.mode == "replay":
+			return "cassette"
+		return "server" if self.server_url else "sdk"
+
+	def _via_cassette(self, kind: str, prompt: str, live: t.Callable[[], t.Dict[str, t.Any]], system_instruction: t.Optional[str] = None, images: t.Sequence[str] = ()) -> t.Dict[str, t.Any]:
+		cassette = active_cassette()
+		if cassette is None:
+			return live()
+		key = prompt_key(kind, prompt, system_instruction, images)
+		with span("cassette.lookup", mode=cassette.mode) as sp:
+			hit = cassette.lookup(key)
+			sp.set(cache_hit=hit is not None)
+		if hit is not None:
+			return hit
+		if cassette.mode == "replay":
+			return cassette.miss_response(key)
+		t0 = time.perf_counter()
+		response = live()
+		cassette.record(key, kind, prompt, response, (time.perf_counter() - t0) * 1000.0)
+		return response
 
 	def generate_json(self, prompt: str, system_instruction: t.Optional[str] = None) -> t.Dict[str, t.Any]:
 		"""
 		Send a text prompt and expect a JSON-parsable response via local server when configured.
 		"""
-		self._throttle()
+		return self._traced(
+			"gemini.generate_json",
+			prompt,
+			lambda: self._via_cassette("json", prompt, lambda: self._generate_json(prompt, system_instruction), system_instruction),
+		)
+
+	def _generate_json(self, prompt: str, system_instruction: t.Optional[str]) -> t.Dict[str, t.Any]:
 		if self.server_url:
 			try:
 				return self._call_server("/ai/generate-json", {"prompt": prompt, "system_instruction": system_instruction})
 			except Exception as e:
+				self._server_failed(e)
 				return {"error": f"server_error: {e}"}
-		if not genai:
+		if not _load_genai():
 			return {"error": "google-generativeai not installed", "raw": None}
-		if not self.api_key:
+		genai = self._sdk()
+		if not genai:
 			return {"error": "GEMINI_API_KEY not configured", "raw": None}
+		# The rate limit guards the Gemini API; the local server does its own pacing
+		self._throttle()
 		model = genai.GenerativeModel(self.config.model, system_instruction=system_instruction)
 		resp = model.generate_content(prompt)
 		text = getattr(resp, "text", None) or (resp.candidates[0].content.parts[0].text if getattr(resp, "candidates", None) else "")
-		try:
-			return json.loads(text)
-		except Exception:
-			return {"raw": text}
+		return _parse_model_text(text)
 
 	def generate_multimodal_json(self, prompt: str, image_paths: list[str]) -> t.Dict[str, t.Any]:
-		self._throttle()
+		return self._traced(
+			"gemini.generate_multimodal_json",
+			prompt,
+			lambda: self._via_cassette("multimodal", prompt, lambda: self._generate_multimodal_json(prompt, image_paths), images=image_paths),
+			images=len(image_paths),
+		)
+
+	def _generate_multimodal_json(self, prompt: str, image_paths: list[str]) -> t.Dict[str, t.Any]:
 		if self.server_url:
 			# For brevity, route to text endpoint with prompt only
 			try:
 				return self._call_server("/ai/generate-json", {"prompt": prompt})
 			except Exception as e:
+				self._server_failed(e)
 				return {"error": f"server_error: {e}"}
-		if not genai or not self.api_key:
+		genai = self._sdk() if self.api_key else None
+		if not genai:
 			return {"error": "gemini_unavailable"}
+		self._throttle()
 		model = genai.GenerativeModel(self.config.model)
 		parts: list[t.Any] = [prompt]
 		for p in image_paths:
@@ -128,7 +312,15 @@ class GeminiClient:
 				continue
 		resp = model.generate_content(parts)
 		text = getattr(resp, "text", None) or ""
-		try:
-			return json.loads(text)
-		except Exception:
-			return {"raw": text}
\ No newline at end of file
+		return _parse_model_text(text)
+
+
+_shared: t.Optional[GeminiClient] = None
+
+
+def get_gemini_client() -> GeminiClient:
+	"""Process-wide client so every reasoning layer shares one configuration, probe and rate limit."""
+	global _shared
+	if _shared is None:
+		_shared = GeminiClient()
+	return _shared
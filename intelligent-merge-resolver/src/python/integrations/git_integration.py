@@ -1,8 +1,11 @@
 from __future__ import annotations
 import os
+import io
+import hashlib
 import subprocess
 import typing as t
 from dataclasses import dataclass
+from src.core.tracing import span
 
 @dataclass
 class Conflict:
@@ -15,24 +18,89 @@ class GitIntegration:
 		self.repo_path = repo_path
 
 	def _run(self, *args: str) -> str:
-		cp = subprocess.run(["git", *args], cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+		with span("git." + args[0], args=" ".join(args[1:])):
+			cp = subprocess.run(["git", *args], cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 		if cp.returncode != 0:
 			raise RuntimeError(cp.stderr.strip())
 		return cp.stdout
 
-	def install_hooks(self, repo_path: t.Optional[str] = None) -> None:
+	def install_hooks(self, repo_path: t.Optional[str] = None, budget_ms: float = 1500.0) -> t.List[str]:
+		"""
+		Install the imr hooks with the wall-clock budget filled in. A hook that is not ours is
+		kept as `<name>.pre-imr` and run first by the imr hook. Returns the installed paths.
+		"""
 		repo = repo_path or self.repo_path
-		hooks_src = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "hooks")
+		# <project>/hooks, three levels above src/python/integrations
+		hooks_src = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "..", "hooks")
 		hooks_src = os.path.abspath(hooks_src)
 		hooks_dest = os.path.join(repo, ".git", "hooks")
 		os.makedirs(hooks_dest, exist_ok=True)
+		installed: t.List[str] = []
 		for name in ("pre-merge-commit", "post-merge"):
 			src = os.path.join(hooks_src, name)
 			dst = os.path.join(hooks_dest, name)
-			if os.path.isfile(src):
-				with open(src, "rb") as rf, open(dst, "wb") as wf:
-					wf.write(rf.read())
-				os.chmod(dst, 0o755)
+			if not os.path.isfile(src):
+				continue
+			if os.path.isfile(dst):
+				with open(dst, "r", encoding="utf-8", errors="ignore") as f:
+					if "Intelligent Merge Resolver" not in f.read():
+						os.replace(dst, dst + ".pre-imr")
+			with open(src, "r", encoding="utf-8") as rf:
+				script = rf.read().replace("@IMR_BUDGET_MS@", str(int(budget_ms)))
+			with open(dst, "w", encoding="utf-8") as wf:
+				wf.write(script)
+			os.chmod(dst, 0o755)
+			installed.append(dst)
+		return installed
+
+	def git_dir(self) -> t.Optional[str]:
+		try:
+			path = self._run("rev-parse", "--git-dir").strip()
+		except RuntimeError:
+			return None
+		return path if os.path.isabs(path) else os.path.join(self.repo_path, path)
+
+	def sequence_state(self) -> t.Optional[t.Dict[str, t.Any]]:
+		"""
+		The rebase, cherry-pick or revert in progress, if any: kind, a session id that stays the
+		same across its stops, the step (rebase only) and the commit being replayed.
+		"""
+		gd = self.git_dir()
+		if not gd:
+			return None
+
+		def read(*parts: str) -> str:
+			try:
+				with open(os.path.join(gd, *parts), "r", encoding="utf-8") as f:
+					return f.read().strip()
+			except OSError:
+				return ""
+
+		for sub in ("rebase-merge", "rebase-apply"):
+			if os.path.isdir(os.path.join(gd, sub)):
+				step = read(sub, "msgnum") or read(sub, "next")
+				total = read(sub, "end") or read(sub, "last")
+				session_src = "rebase:" + read(sub, "onto") + ":" + read(sub, "orig-head")
+				return {
+					"kind": "rebase",
+					"session": hashlib.sha1(session_src.encode("utf-8")).hexdigest()[:16],
+					"step": int(step) if step.isdigit() else None,
+					"total": int(total) if total.isdigit() else None,
+					"commit": read(sub, "stopped-sha") or read("REBASE_HEAD"),
+				}
+		for kind, head in (("cherry-pick", "CHERRY_PICK_HEAD"), ("revert", "REVERT_HEAD")):
+			commit = read(head)
+			if commit:
+				# A series keeps its starting HEAD in sequencer/head; a single pick is its own session
+				origin = read("sequencer", "head") or commit
+				return {
+					"kind": kind,
+					"session": hashlib.sha1(f"{kind}:{origin}".encode("utf-8")).hexdigest()[:16],
+					"step": None,
+					"total": None,
+					"commit": commit,
+				}
+		return None
 
 	def detect_conflicts(self) -> t.List[Conflict]:
 		out = self._run("status", "--porcelain")
@@ -41,4 +109,47 @@ class GitIntegration:
 			if line.startswith("UU ") or line.startswith("AA ") or line.startswith("DD "):
 				path = line[3:]
 				conflicts.append(Conflict(file_path=path, status=line[:2].strip()))
-		return conflicts
\ No newline at end of file
+		return conflicts
+
+	def read_stage(self, file_path: str, stage: int) -> t.Optional[str]:
+		"""Content of an index stage during a merge: 1=base, 2=current (ours), 3=incoming (theirs)."""
+		with span("git.read_stage", file=file_path, stage=stage) as sp:
+			cp = subprocess.run(["git", "show", f":{stage}:{file_path}"], cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+			sp.set(bytes=len(cp.stdout))
+		if cp.returncode != 0:
+			return None
+		return cp.stdout.decode("utf-8", errors="ignore")
+
+	def read_rev(self, rev: str, file_path: str) -> t.Optional[str]:
+		"""Content of a file at a commit, or None where it does not exist."""
+		with span("git.read_rev", file=file_path, rev=rev) as sp:
+			cp = subprocess.run(["git", "show", f"{rev}:{file_path}"], cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+			sp.set(bytes=len(cp.stdout))
+		if cp.returncode != 0:
+			return None
+		return cp.stdout.decode("utf-8", errors="ignore")
+
+	def merge_sides(self, ours: str, theirs: str) -> t.Optional[t.Dict[int, str]]:
+		"""
+		Commits standing in for the index stages once a merge no longer has them:
+		{1: merge base, 2: ours, 3: theirs}, or None when either side does not resolve.
+		"""
+		try:
+			revs = {2: self._run("rev-parse", "--verify", ours + "^{commit}").strip(), 3: self._run("rev-parse", "--verify", theirs + "^{commit}").strip()}
+			revs[1] = self._run("merge-base", revs[2], revs[3]).strip()
+		except RuntimeError:
+			return None
+		return revs
+
+	def stream_stage(self, file_path: str, stage: int) -> t.Iterator[str]:
+		"""Like read_stage but yields lines as git produces them, for files too large to hold."""
+		proc = subprocess.Popen(["git", "show", f":{stage}:{file_path}"], cwd=self.repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+		assert proc.stdout is not None
+		try:
+			for line in io.TextIOWrapper(proc.stdout, encoding="utf-8", errors="ignore", newline=""):
+				yield line
+		finally:
+			proc.stdout.close()
+			code = proc.wait()
+		if code != 0:
+			raise ValueError(f"git show :{stage}:{file_path} failed")
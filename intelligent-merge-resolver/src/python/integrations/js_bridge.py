@@ -4,13 +4,21 @@ import json
 import subprocess
 from pathlib import Path
 from typing import Dict, List, Any
+from .capture_daemon import get_capture_daemon
 
 class JavaScriptBridge:
 	"""Bridge for communicating with JavaScript utilities"""
 
 	def __init__(self) -> None:
 		self.js_dir = Path(__file__).parent.parent.parent / 'js'
-		self.node_cmd = self._find_node()
+		self._node_cmd: str | None = None
+
+	@property
+	def node_cmd(self) -> str:
+		# Probed on first use so constructing the bridge never spawns a process
+		if self._node_cmd is None:
+			self._node_cmd = self._find_node()
+		return self._node_cmd
 
 	def _find_node(self) -> str:
 		for cmd in ('node', 'nodejs'):
@@ -29,10 +37,19 @@ class JavaScriptBridge:
 		return 'generic'
 
 	def capture_screenshots(self, routes: List[str], config: Dict[str, Any]) -> Dict[str, Any]:
+		out_dir = config.get('output_dir', 'screenshots')
+		base_url = config.get('base_url', 'http://localhost:3000')
+		if config.get('daemon', True):
+			res = get_capture_daemon(self.node_cmd).capture(base_url, routes, out_dir, config.get('viewports'))
+			if res.get('ok'):
+				return {'results': res.get('results', []), 'timings': res.get('timings', {})}
+			if res.get('error') not in ('daemon_died', 'invalid_response'):
+				return {'error': res.get('error', 'capture_failed')}
 		script = self.js_dir / 'puppeteer' / 'screenshot.js'
 		payload = json.dumps({
 			'routes': routes,
-			'output_dir': config.get('output_dir', 'screenshots'),
+			'output_dir': out_dir,
+			'base_url': base_url,
 		})
 		cp = subprocess.run([self.node_cmd, str(script)], input=payload, text=True, capture_output=True)
 		if cp.returncode == 0:
@@ -40,4 +57,4 @@ class JavaScriptBridge:
 				return json.loads(cp.stdout or '{}')
 			except Exception:
 				return {'raw': cp.stdout}
-		return {'error': cp.stderr or 'capture_failed'}
\ No newline at end of file
+		return {'error': cp.stderr or 'capture_failed'}
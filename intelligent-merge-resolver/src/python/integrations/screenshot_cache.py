@@ -0,0 +1,211 @@
+from __future__ import annotations
+import os
+import json
+import time
+import shutil
+import hashlib
+import typing as t
+
+UI_EXTENSIONS = {'.js', '.jsx', '.ts', '.tsx', '.vue', '.svelte', '.css', '.scss', '.sass', '.less', '.html', '.mdx', '.svg'}
+UI_MANIFESTS = {'package.json', 'next.config.js', 'next.config.mjs', 'vite.config.ts', 'vite.config.js', 'tailwind.config.js', 'tailwind.config.ts'}
+_SKIP_DIRS = {'node_modules', 'dist', 'build', 'out', 'coverage', '__pycache__'}
+# File-system routers: a file under one of these belongs to the route named by its first segment
+ROUTE_DIRS = ('src/app', 'src/pages', 'src/routes', 'app', 'pages', 'routes')
+# Files directly in a route dir that render the index route; others like _app or layout wrap every route
+_INDEX_STEMS = {'index', 'page', '+page'}
+_SHARED_STEMS = {'layout', 'template', 'loading', 'error', 'not-found', '+layout', '+error'}
+_PAGE_EXTENSIONS = {'.js', '.jsx', '.ts', '.tsx', '.vue', '.svelte', '.mdx', '.html'}
+
+
+def _route_segment(route: str) -> str:
+	"""First path segment of a route ('' for '/'), ignoring query and fragment."""
+	path = route.split('?', 1)[0].split('#', 1)[0]
+	return path.strip('/').split('/', 1)[0]
+
+
+def route_owner(rel: str) -> t.Optional[str]:
+	"""
+	The top-level route segment a UI file belongs to ('' for the index route), or None when it
+	is shared: anything outside ROUTE_DIRS, layouts and `_`-prefixed files, and dynamic
+	(`[slug]`) or grouped (`(group)`) segments that may render any route.
+	"""
+	parts = rel.replace(os.sep, '/').split('/')
+	for route_dir in ROUTE_DIRS:
+		prefix = route_dir.split('/')
+		if parts[:len(prefix)] != prefix or len(parts) == len(prefix):
+			continue
+		rest = parts[len(prefix):]
+		if len(rest) == 1:
+			stem, ext = os.path.splitext(rest[0])
+			if ext.lower() not in _PAGE_EXTENSIONS:
+				return None  # e.g. app/globals.css
+			if stem in _INDEX_STEMS:
+				return ''
+		first = rest[0] if len(rest) > 1 else os.path.splitext(rest[0])[0]
+		if first.startswith(('_', '[', '(', '@')) or first in _SHARED_STEMS:
+			return None
+		return first
+	return None
+
+
+class ScreenshotCache:
+	"""
+	Captures and their OCR/SSIM results under .imr/screenshots, keyed by route, viewport and a
+	fingerprint of the UI sources that route depends on (route_fingerprints). Least recently used entries are evicted once
+	the stored PNGs exceed max_bytes.
+	"""
+
+	def __init__(self, repo_path: str, max_bytes: int = 256 * 1024 * 1024) -> None:
+		self.repo_path = os.path.abspath(repo_path)
+		self.root = os.path.join(self.repo_path, '.imr', 'screenshots')
+		self.cache_dir = os.path.join(self.root, 'cache')
+		self.index_path = os.path.join(self.root, 'index.json')
+		self.stat_path = os.path.join(self.root, 'file_hashes.json')
+		self.summary_path = os.path.join(self.root, 'summaries.json')
+		self.max_bytes = max_bytes
+		os.makedirs(self.cache_dir, exist_ok=True)
+		self.index: t.Dict[str, t.Dict[str, t.Any]] = self._load(self.index_path)
+		self.hits = 0
+		self.misses = 0
+
+	@staticmethod
+	def _load(path: str) -> dict:
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				return json.load(f)
+		except Exception:
+			return {}
+
+	@staticmethod
+	def _dump(path: str, data: dict) -> None:
+		tmp = path + '.tmp'
+		with open(tmp, 'w', encoding='utf-8') as f:
+			json.dump(data, f)
+		os.replace(tmp, path)
+
+	# -- fingerprint --------------------------------------------------------
+	def ui_files(self) -> t.List[str]:
+		paths: t.List[str] = []
+		for root, dirs, files in os.walk(self.repo_path):
+			dirs[:] = [d for d in dirs if not d.startswith('.') and d not in _SKIP_DIRS]
+			for fn in files:
+				if fn in UI_MANIFESTS or os.path.splitext(fn)[1].lower() in UI_EXTENSIONS:
+					paths.append(os.path.join(root, fn))
+		return sorted(paths)
+
+	def _file_hashes(self, paths: t.Optional[t.Sequence[str]] = None) -> t.Dict[str, str]:
+		"""Relative path -> content hash of the UI sources; hashes are reused while size and mtime hold."""
+		known = self._load(self.stat_path)
+		fresh: t.Dict[str, t.List[t.Any]] = {}
+		for p in (paths if paths is not None else self.ui_files()):
+			try:
+				st = os.stat(p)
+			except OSError:
+				continue
+			rel = os.path.relpath(p, self.repo_path)
+			prev = known.get(rel)
+			if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns:
+				file_hash = prev[2]
+			else:
+				h = hashlib.sha1()
+				with open(p, 'rb') as f:
+					for chunk in iter(lambda: f.read(1 << 16), b''):
+						h.update(chunk)
+				file_hash = h.hexdigest()
+			fresh[rel] = [st.st_size, st.st_mtime_ns, file_hash]
+		if fresh != known:
+			self._dump(self.stat_path, fresh)
+		return {rel: v[2] for rel, v in fresh.items()}
+
+	@staticmethod
+	def _digest(hashes: t.Mapping[str, str], rels: t.Iterable[str]) -> str:
+		digest = hashlib.sha1()
+		for rel in sorted(rels):
+			digest.update(rel.encode('utf-8') + b'\0' + hashes[rel].encode('ascii'))
+		return digest.hexdigest()
+
+	def fingerprint(self, paths: t.Optional[t.Sequence[str]] = None) -> str:
+		"""Content hash over all the UI sources."""
+		hashes = self._file_hashes(paths)
+		return self._digest(hashes, hashes)
+
+	def route_fingerprints(self, routes: t.Sequence[str], paths: t.Optional[t.Sequence[str]] = None) -> t.Dict[str, str]:
+		"""
+		Per route, a content hash over the shared UI sources plus the files under that route's
+		own directory (route_owner), so editing one page leaves the other routes' captures valid.
+		"""
+		hashes = self._file_hashes(paths)
+		owners = {rel: route_owner(rel) for rel in hashes}
+		shared = [rel for rel, owner in owners.items() if owner is None]
+		out: t.Dict[str, str] = {}
+		for route in routes:
+			segment = _route_segment(route)
+			out[route] = self._digest(hashes, shared + [rel for rel, owner in owners.items() if owner == segment])
+		return out
+
+	# -- entries ------------------------------------------------------------
+	@staticmethod
+	def key(fingerprint: str, route: str, viewport: str) -> str:
+		return hashlib.sha1(f'{fingerprint}|{route}|{viewport}'.encode('utf-8')).hexdigest()
+
+	def get(self, fingerprint: str, route: str, viewport: str) -> t.Optional[t.Dict[str, t.Any]]:
+		k = self.key(fingerprint, route, viewport)
+		entry = self.index.get(k)
+		if entry is None or not os.path.isfile(entry['file']):
+			self.misses += 1
+			return None
+		self.hits += 1
+		entry['last_used'] = time.time()
+		return entry
+
+	def put(self, fingerprint: str, route: str, viewport: str, src_file: str, meta: t.Optional[dict] = None) -> t.Dict[str, t.Any]:
+		k = self.key(fingerprint, route, viewport)
+		dst = os.path.join(self.cache_dir, f'{k}.png')
+		if os.path.abspath(src_file) != dst:
+			shutil.copyfile(src_file, dst)
+		entry = {
+			'route': route,
+			'viewport': viewport,
+			'file': dst,
+			'bytes': os.path.getsize(dst),
+			'last_used': time.time(),
+			'meta': dict(meta or {}),
+		}
+		self.index[k] = entry
+		return entry
+
+	def update_meta(self, fingerprint: str, route: str, viewport: str, **meta: t.Any) -> None:
+		entry = self.index.get(self.key(fingerprint, route, viewport))
+		if entry is not None:
+			entry['meta'].update(meta)
+
+	def get_summary(self, fingerprint: str) -> t.Optional[t.Dict[str, t.Any]]:
+		return self._load(self.summary_path).get(fingerprint)
+
+	def put_summary(self, fingerprint: str, summary: t.Dict[str, t.Any], keep: int = 32) -> None:
+		summaries = self._load(self.summary_path)
+		summaries.pop(fingerprint, None)
+		summaries[fingerprint] = summary
+		# dicts keep insertion order, so the oldest fingerprints come first
+		for stale in list(summaries)[:-keep]:
+			del summaries[stale]
+		self._dump(self.summary_path, summaries)
+
+	def evict(self) -> int:
+		total = sum(e.get('bytes', 0) for e in self.index.values())
+		removed = 0
+		for k, entry in sorted(self.index.items(), key=lambda kv: kv[1].get('last_used', 0)):
+			if total <= self.max_bytes:
+				break
+			try:
+				os.remove(entry['file'])
+			except OSError:
+				pass
+			total -= entry.get('bytes', 0)
+			del self.index[k]
+			removed += 1
+		return removed
+
+	def save(self) -> None:
+		self.evict()
+		self._dump(self.index_path, self.index)
@@ -1,16 +1,18 @@
 from __future__ import annotations
 import typing as t
-from ..integrations.gemini_client import GeminiClient
+from ..integrations.gemini_client import GeminiClient, get_gemini_client
 
 class ContextualReasoning:
 	layer_name = "contextual"
 
 	def __init__(self, gemini_client: GeminiClient | None = None) -> None:
-		self.gemini = gemini_client or GeminiClient()
+		self.gemini = gemini_client or get_gemini_client()
 
 	async def analyze(self, reasoning_context):
 		prompt = f"""
 		[LAYER] REASONING PHASE: CONTEXTUAL
+		Conflict:
+		{reasoning_context.conflict_prompt()}
 		Previous Context: {reasoning_context.get_previous_reasoning()}
 		ANALYSIS TASKS:
 		1. Identify project context, change intentions, requirement alignment
@@ -20,7 +22,8 @@ class ContextualReasoning:
 		{{
 		  "contextual_analysis": {{"summary": "...", "assumptions": [], "risks": []}},
 		  "contextual_reasoning_chain": ["..."],
-		  "contextual_confidence": 0.0
+		  "contextual_confidence": 0.0,
+		  "contextual_recommendation": "current | incoming | merged"
 		}}
 		"""
 		resp = self.gemini.generate_json(prompt)
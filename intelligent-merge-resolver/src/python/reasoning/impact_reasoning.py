@@ -1,17 +1,20 @@
 from __future__ import annotations
-from ..integrations.gemini_client import GeminiClient
+from ..integrations.gemini_client import GeminiClient, get_gemini_client
 
 class ImpactReasoning:
 	layer_name = "impact"
 
 	def __init__(self, gemini_client: GeminiClient | None = None) -> None:
-		self.gemini = gemini_client or GeminiClient()
+		self.gemini = gemini_client or get_gemini_client()
 
 	async def analyze(self, reasoning_context):
 		prompt = f"""
 		[LAYER] REASONING PHASE: IMPACT
+		Conflict:
+		{reasoning_context.conflict_prompt()}
 		Previous Context: {reasoning_context.get_previous_reasoning()}
-		Respond JSON with keys: impact_analysis, impact_reasoning_chain, impact_confidence
+		Respond JSON with keys: impact_analysis, impact_reasoning_chain, impact_confidence,
+		impact_recommendation (one of "current", "incoming", "merged")
 		"""
 		resp = self.gemini.generate_json(prompt)
 		reasoning_context.add_reasoning_layer(self.layer_name, resp)
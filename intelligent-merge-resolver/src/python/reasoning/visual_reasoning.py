@@ -1,11 +1,16 @@
 from __future__ import annotations
 import os
 import json
+import hashlib
 import typing as t
+from functools import lru_cache
 
-from ..integrations.gemini_client import GeminiClient
+from ..integrations.gemini_client import GeminiClient, get_gemini_client
 from ..analyzers.ocr_analyzer import OCRAnalyzer
-from ..analyzers.ui_comparator import compare_images
+from ..analyzers.ui_comparator import compare_images, compare_renders
+from ..analyzers.perceptual_hash import HashIndex, image_hashes
+from ..integrations.capture_daemon import screens_by_route
+from ..integrations.screenshot_cache import ScreenshotCache
 
 try:
 	from ..integrations.js_bridge import JavaScriptBridge
@@ -17,36 +22,106 @@ try:
 except Exception:  # pragma: no cover
 	yaml = None  # type: ignore
 
+DEFAULT_CACHE_MB = 256
+DEFAULT_OCR_CACHE_MB = 32
+DEFAULT_PHASH_THRESHOLD = 2
+
+
+@lru_cache(maxsize=8)
+def _read_config(path: str, mtime_ns: int) -> t.Dict[str, t.Any]:
+	if not yaml:
+		return {}
+	try:
+		with open(path, 'r', encoding='utf-8') as f:
+			cfg = yaml.safe_load(f) or {}
+	except Exception:
+		return {}
+	return cfg if isinstance(cfg, dict) else {}
+
+
+def _section(name: str, repo_path: str = '.') -> t.Dict[str, t.Any]:
+	"""One section of .merge-resolver.yaml; the file is parsed once per modification."""
+	path = os.path.join(os.path.abspath(repo_path), '.merge-resolver.yaml')
+	try:
+		mtime_ns = os.stat(path).st_mtime_ns
+	except OSError:
+		return {}
+	value = _read_config(path, mtime_ns).get(name)
+	return value if isinstance(value, dict) else {}
+
+
+def visual_config(repo_path: str = '.') -> t.Dict[str, t.Any]:
+	"""The `visual` section of .merge-resolver.yaml (screenshot_cache_mb, ocr_cache_mb, phash_threshold)."""
+	return _section('visual', repo_path)
+
+
 class VisualReasoning:
 	layer_name = "visual"
 
 	def __init__(self, gemini_client: GeminiClient | None = None) -> None:
-		self.gemini = gemini_client or GeminiClient()
-		self.ocr = OCRAnalyzer()
+		self.gemini = gemini_client or get_gemini_client()
 		self.js = JavaScriptBridge() if JavaScriptBridge else None
+		visual = visual_config()
+		try:
+			cache_mb = float(visual.get('screenshot_cache_mb', DEFAULT_CACHE_MB))
+		except (TypeError, ValueError):
+			cache_mb = DEFAULT_CACHE_MB
+		try:
+			ocr_cache_mb = float(visual.get('ocr_cache_mb', DEFAULT_OCR_CACHE_MB))
+		except (TypeError, ValueError):
+			ocr_cache_mb = DEFAULT_OCR_CACHE_MB
+		self.ocr = OCRAnalyzer(max_bytes=int(ocr_cache_mb * 1024 * 1024))
+		try:
+			self.hash_threshold = int(visual.get('phash_threshold', DEFAULT_PHASH_THRESHOLD))
+		except (TypeError, ValueError):
+			self.hash_threshold = DEFAULT_PHASH_THRESHOLD
+		self.cache = ScreenshotCache('.', max_bytes=int(cache_mb * 1024 * 1024))
+		self.hashes = HashIndex('.')
 
 	def _load_routes(self) -> list[str]:
-		cfg_path = os.path.join(os.getcwd(), '.merge-resolver.yaml')
-		if yaml and os.path.isfile(cfg_path):
-			try:
-				with open(cfg_path, 'r', encoding='utf-8') as f:
-					cfg = yaml.safe_load(f) or {}
-					return list(cfg.get('build', {}).get('test_routes', ['/']))
-			except Exception:
-				return ['/']
-		return ['/']
+		routes = _section('build').get('test_routes', ['/'])
+		return [str(r) for r in routes] if isinstance(routes, list) else ['/']
+
+	def _load_base_url(self) -> str:
+		return str(_section('build').get('base_url', 'http://localhost:3000'))
+
+	def _load_incoming_url(self) -> t.Optional[str]:
+		# Optional second server rendering the incoming branch, for same-viewport render diffs
+		url = _section('build').get('incoming_base_url')
+		return str(url) if url else None
+
+	def _render_diff(self, routes: list[str], screens: dict[str, dict[str, str]]) -> dict[str, t.Any]:
+		"""Capture the incoming render of each route and compare it with the current one per viewport."""
+		incoming_url = self._load_incoming_url()
+		if not incoming_url or not self.js or not screens:
+			return {}
+		out_dir = os.path.join('.imr', 'screenshots', 'incoming')
+		os.makedirs(out_dir, exist_ok=True)
+		try:
+			result = self.js.capture_screenshots(routes, {'output_dir': out_dir, 'base_url': incoming_url})
+		except Exception:
+			return {}
+		if not isinstance(result, dict):
+			return {}
+		incoming = screens_by_route(result.get('results', []))
+		diffs = {route: compare_renders(screens.get(route, {}), incoming.get(route, {}), hash_threshold=self.hash_threshold) for route in routes}
+		# OCR only what changed in the incoming render
+		regions = {}
+		for route, per_vp in diffs.items():
+			for vp, comp in per_vp.items():
+				if isinstance(comp, dict) and 'regions' in comp:
+					regions[incoming[route][vp]] = comp['regions']
+		ocr = self.ocr.analyze_batch(list(regions), regions) if regions else {}
+		for route, per_vp in diffs.items():
+			for vp, comp in per_vp.items():
+				path = incoming.get(route, {}).get(vp)
+				if path in ocr:
+					comp['changed_text'] = ocr[path].get('text', '')
+		return diffs
 
 	def _alignment_from_prefs(self, ocr_texts: list[str]) -> float:
 		# Simple heuristic: if accessibility=high and OCR has text, boost score
-		cfg_path = os.path.join(os.getcwd(), '.merge-resolver.yaml')
-		acc = 'medium'
-		if yaml and os.path.isfile(cfg_path):
-			try:
-				with open(cfg_path, 'r', encoding='utf-8') as f:
-					cfg = yaml.safe_load(f) or {}
-					acc = str(cfg.get('preferences', {}).get('accessibility', 'medium')).lower()
-			except Exception:
-				pass
+		acc = str(_section('preferences').get('accessibility', 'medium')).lower()
 		text_present = sum(1 for t in ocr_texts if t and t.strip())
 		base = 0.5
 		if acc == 'high' and text_present:
@@ -54,39 +129,79 @@ class VisualReasoning:
 		return min(1.0, base)
 
 	async def analyze(self, reasoning_context):
-		# Capture screenshots using JS bridge when available
 		routes = self._load_routes()
-		out_dir = os.path.join('.imr', 'screenshots')
+		viewports = ('desktop', 'mobile')
+		out_dir = os.path.join('.imr', 'screenshots', 'latest')
 		os.makedirs(out_dir, exist_ok=True)
-		screens = {}
-		if self.js:
+		# Cached captures (and their OCR/SSIM) stay valid while the sources a route depends on are unchanged
+		fingerprints = self.cache.route_fingerprints(routes)
+		# The summary covers every route, so it is keyed by all of their fingerprints
+		fingerprint = hashlib.sha1('|'.join(f'{r}={fingerprints[r]}' for r in routes).encode('utf-8')).hexdigest()
+		entries = {(r, vp): self.cache.get(fingerprints[r], r, vp) for r in routes for vp in viewports}
+		missing = [r for r in routes if any(entries[(r, vp)] is None for vp in viewports)]
+		capture_timings: dict = {}
+		if missing and self.js:
 			try:
-				result = self.js.capture_screenshots(routes, {'output_dir': out_dir})
+				result = self.js.capture_screenshots(missing, {'output_dir': out_dir, 'base_url': self._load_base_url()})
 				if isinstance(result, dict):
-					screens = result
+					capture_timings = result.get('timings', {})
+					for shot in result.get('results', []):
+						if shot.get('file') and (shot['route'], shot['viewport']) in entries:
+							entries[(shot['route'], shot['viewport'])] = self.cache.put(fingerprints[shot['route']], shot['route'], shot['viewport'], shot['file'])
 			except Exception:
 				pass
+		screens: dict[str, dict[str, str]] = {}
+		for (route, vp), entry in entries.items():
+			if entry is not None:
+				screens.setdefault(route, {})[vp] = entry['file']
 		# OCR analysis
 		ocr_results: dict[str, dict] = {}
 		ocr_texts: list[str] = []
-		for route, files in (screens or {}).items():
-			for key in ('desktop', 'mobile'):
-				fp = files.get(key)
-				if not fp:
-					continue
-				res = self.ocr.analyze(fp)
-				ocr_results[fp] = res
-				if isinstance(res, dict) and 'text' in res and isinstance(res['text'], str):
-					ocr_texts.append(res['text'])
+		# Perceptual hashes: a new capture that looks like a previous render reuses its OCR
+		hashes: dict[tuple[str, str], dict[str, int]] = {}
+		for (route, vp), entry in entries.items():
+			if entry is None or 'ocr' in entry['meta']:
+				continue
+			h = image_hashes(entry['file'])
+			if h is None:
+				continue
+			hashes[(route, vp)] = h
+			match = self.hashes.nearest(h, self.hash_threshold, where=lambda e: 'ocr' in e)
+			if match is not None:
+				entry['meta'].update(ocr=match[1]['ocr'], phash_match=match[1].get('file'), phash_distance=match[0])
+		todo = [entry['file'] for entry in entries.values() if entry is not None and 'ocr' not in entry['meta']]
+		fresh = self.ocr.analyze_batch(todo) if todo else {}
+		for (route, vp), entry in entries.items():
+			if entry is None:
+				continue
+			res = entry['meta'].get('ocr')
+			if res is None:
+				res = fresh.get(entry['file'], {"error": "ocr_skipped"})
+				if isinstance(res, dict) and 'error' not in res:
+					self.cache.update_meta(fingerprints[route], route, vp, ocr=res)
+			ocr_results[entry['file']] = res
+			if (route, vp) in hashes and 'phash_match' not in entry['meta'] and isinstance(res, dict) and 'error' not in res:
+				self.hashes.add(hashes[(route, vp)], route=route, viewport=vp, file=entry['file'], ocr=res)
+			if isinstance(res, dict) and 'text' in res and isinstance(res['text'], str):
+				ocr_texts.append(res['text'])
 		# UI comparison (desktop vs mobile) SSIM if both available
 		ssim_scores: list[float] = []
-		for route, files in (screens or {}).items():
-			desktop = files.get('desktop')
-			mobile = files.get('mobile')
+		for route in routes:
+			desktop = entries.get((route, 'desktop'))
+			mobile = entries.get((route, 'mobile'))
 			if desktop and mobile:
-				comp = compare_images(desktop, mobile)
-				if isinstance(comp, dict) and 'ssim' in comp:
-					ssim_scores.append(float(comp['ssim']))
+				score = desktop['meta'].get('ssim_vs_mobile')
+				if score is None:
+					comp = compare_images(desktop['file'], mobile['file'], hash_threshold=self.hash_threshold)
+					if isinstance(comp, dict) and 'ssim' in comp:
+						score = float(comp['ssim'])
+						self.cache.update_meta(fingerprints[route], route, 'desktop', ssim_vs_mobile=score)
+				if score is not None:
+					ssim_scores.append(score)
+		self.cache.save()
+		if hashes:
+			self.hashes.save()
+		render_diff = self._render_diff(routes, screens)
 		# Aggregate visual metrics
 		avg_ssim = sum(ssim_scores) / len(ssim_scores) if ssim_scores else None
 		alignment = self._alignment_from_prefs(ocr_texts)
@@ -94,20 +209,27 @@ class VisualReasoning:
 		analysis = {
 			"routes": routes,
 			"screens": screens,
+			"capture_timings": capture_timings,
+			"cache": {"fingerprint": fingerprint, "hits": self.cache.hits, "misses": self.cache.misses},
 			"ocr_summary_count": len(ocr_texts),
 			"avg_ssim": avg_ssim,
+			"render_diff": render_diff,
 			"alignment_score": alignment,
 		}
-		# Optionally ask Gemini to summarize
-		prompt = f"""
-		Summarize the following visual analysis objectively and return JSON with fields: summary, risks.
-		Analysis: {json.dumps(analysis)[:4000]}
-		"""
-		gem = self.gemini.generate_json(prompt)
+		# Optionally ask Gemini to summarize; unchanged UI reuses the previous summary
+		gem = self.cache.get_summary(fingerprint) if not missing and not render_diff else None
+		if gem is None:
+			prompt = f"""
+			Summarize the following visual analysis objectively and return JSON with fields: summary, risks.
+			Analysis: {json.dumps(analysis)[:4000]}
+			"""
+			gem = self.gemini.generate_json(prompt)
+			if isinstance(gem, dict) and 'error' not in gem and screens and not render_diff:
+				self.cache.put_summary(fingerprint, gem)
 		payload = {
 			"visual_analysis": {"local": analysis, "ai": gem},
 			"visual_reasoning_chain": ["captured_screenshots", "ran_ocr", "computed_ssim", "computed_alignment"],
 			"visual_confidence": visual_conf,
 		}
 		reasoning_context.add_reasoning_layer(self.layer_name, payload)
-		return reasoning_context
\ No newline at end of file
+		return reasoning_context